@@ -1,27 +1,45 @@
 from flask import Flask, send_from_directory, jsonify, request
 import os
 import sys
-from keyword_matcher_new import KeywordMatcher
+from keyword_matcher_new import KeywordMatcher, MATCH_MODES
+from match_refresher import MatchRefresher
 
 app = Flask(__name__)
 
 # Корневой путь к статическим файлам фронтенда
 FRONTEND_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
 
-# Создаем экземпляр KeywordMatcher
+# Создаем экземпляр KeywordMatcher и прогреваем модель тем: из снимка, если он актуален, иначе из HTML
 matcher = KeywordMatcher()
+if not matcher.load_topics_snapshot():
+    matcher.extract_topics_from_html()
+
+# Таблица лучших статей для тем обновляется в фоне, запросы без article_id отдают ее готовой.
+# Поток запускается первым запросом, а не при импорте: иначе его запускали бы и процесс-наблюдатель
+# перезагрузчика Flask (debug=True), и любой импорт модуля, например в тестах
+refresher = MatchRefresher(matcher)
+
+@app.before_request
+def start_refresher():
+    """Запускает фоновое обновление таблицы сопоставлений при первом запросе"""
+    refresher.start()
+
+def roadmap_page():
+    """Собранный index.html или шаблон роадмапа без ссылок, пока роадмап ни разу не обновлялся"""
+    name = 'index.html' if os.path.exists(os.path.join(FRONTEND_PATH, 'index.html')) else 'index.template.html'
+    return send_from_directory(FRONTEND_PATH, name)
 
 @app.route('/')
 def index():
     """Обслуживание главной страницы"""
-    return send_from_directory(FRONTEND_PATH, 'index.html')
+    return roadmap_page()
 
 @app.route('/<path:path>')
 def serve_frontend(path):
     """Обслуживание других статических файлов"""
     if os.path.exists(os.path.join(FRONTEND_PATH, path)):
         return send_from_directory(FRONTEND_PATH, path)
-    return send_from_directory(FRONTEND_PATH, 'index.html')
+    return roadmap_page()
 
 @app.route('/api/extract-topics', methods=['GET'])
 def extract_topics():
@@ -38,31 +56,34 @@ def match_article():
     """Сопоставляет статью с темами роадмапа"""
     data = request.json
     article_id = data.get('article_id')
+    # Режим сопоставления: 'keywords' (по умолчанию) или 'semantic'
+    mode = data.get('mode', 'keywords')
+    if mode not in MATCH_MODES:
+        return jsonify({
+            "status": "error",
+            "message": f"Неизвестный режим сопоставления: {mode}"
+        }), 400
     
     # Извлекаем темы, если еще не извлечены
     if not matcher.roadmap_topics:
         matcher.extract_topics_from_html()
     
-    # Если ID статьи не указан, находим лучшие статьи для каждой темы
+    # Если ID статьи не указан, отдаем лучшие статьи для каждой темы из таблицы сопоставлений
     if article_id is None:
-        # Создаем мок-статью и получаем все статьи
-        matcher.create_mock_article()
-        matcher.get_all_articles()
-        
-        # Сопоставляем с темами
-        matches = matcher.match_article_to_topics()
+        matches = refresher.get_table().matches[mode]
         
         return jsonify({
             "status": "success",
             "matches_count": len(matches),
-            "matches": matches
+            "matches": matches,
+            **refresher.status()
         })
     else:
         # Получаем все статьи, чтобы найти нужную
-        matcher.get_all_articles()
+        matcher.sync_articles()
         
         # Сопоставляем с темами
-        matches = matcher.match_article_to_topics(article_id)
+        matches = matcher.match_article_to_topics(article_id, mode=mode)
         
         return jsonify({
             "status": "success",
@@ -76,28 +97,30 @@ def update_roadmap():
     """Обновляет HTML роадмапа, добавляя ссылки на статьи"""
     data = request.json
     article_id = data.get('article_id')
+    # Режим сопоставления: 'keywords' (по умолчанию) или 'semantic'
+    mode = data.get('mode', 'keywords')
+    if mode not in MATCH_MODES:
+        return jsonify({
+            "status": "error",
+            "message": f"Неизвестный режим сопоставления: {mode}"
+        }), 400
     
     # Извлекаем темы, если еще не извлечены
     if not matcher.roadmap_topics:
         matcher.extract_topics_from_html()
     
-    # Если ID статьи не указан, находим лучшие статьи для каждой темы
+    # Если ID статьи не указан, берем лучшие статьи для каждой темы из таблицы сопоставлений
     if article_id is None:
-        # Создаем мок-статью и получаем все статьи
-        matcher.create_mock_article()
-        matcher.get_all_articles()
-        
-        # Сопоставляем с темами без указания конкретной статьи
-        matches = matcher.match_article_to_topics()
+        matches = refresher.get_table().matches[mode]
     else:
         # Получаем все статьи, чтобы найти нужную
-        matcher.get_all_articles()
+        matcher.sync_articles()
         
         # Сопоставляем конкретную статью с темами
-        matches = matcher.match_article_to_topics(article_id)
+        matches = matcher.match_article_to_topics(article_id, mode=mode)
     
-    # Обновляем HTML
-    success = matcher.update_html_with_article_links(matches)
+    # Обновляем HTML: таблица заменяет все ссылки, сопоставление одной статьи - только ее ссылки
+    success = matcher.update_html_with_article_links(matches, replace=article_id is None, article_id=article_id)
     
     if success:
         return jsonify({
@@ -111,6 +134,23 @@ def update_roadmap():
             "message": "Не удалось обновить роадмап"
         }), 500
 
+@app.route('/api/match-table/status', methods=['GET'])
+def match_table_status():
+    """Время последнего пересчета таблицы сопоставлений и признак ее устаревания"""
+    return jsonify({
+        "status": "success",
+        **refresher.status()
+    })
+
+@app.route('/api/match-table/refresh', methods=['POST'])
+def refresh_match_table():
+    """Просит фоновый поток обновить таблицу сопоставлений, не дожидаясь интервала"""
+    refresher.trigger()
+    return jsonify({
+        "status": "success",
+        "message": "Обновление таблицы сопоставлений запрошено"
+    }), 202
+
 if __name__ == '__main__':
     print(f"Сервер запущен. Откройте http://localhost:5000 в браузере.")
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True) 
\ No newline at end of file
@@ -0,0 +1,126 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых запрос имеет смысл повторить
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Автомат разомкнут: сервис недавно отвечал ошибками, запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель: после failure_threshold ошибок подряд размыкается
+    на reset_timeout секунд, затем пропускает один пробный запрос (half-open):
+    успех замыкает автомат, ошибка снова размыкает.
+    Та же логика, что у CircuitBreaker в text_analyzer: сервисы собираются и разворачиваются отдельно
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probe_in_flight:
+                raise CircuitOpenError("Сервис временно недоступен, автомат разомкнут")
+            self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Автомат разомкнут после {self._failures} ошибок подряд")
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def record_cancelled(self):
+        """Запрос прерван, не дождавшись ответа: ошибка не засчитывается, пробный запрос освобождается"""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class ResilientSession:
+    """
+    requests.Session с пулом keep-alive соединений, таймаутами по умолчанию,
+    ограниченными повторами с экспоненциальной задержкой и разбросом и автоматическим выключателем
+    """
+
+    def __init__(self, base_url, timeout=(3.0, 10.0), pool_size=10, retries=2,
+                 backoff_base=0.2, backoff_max=2.0, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.retries + 1):
+            self.breaker.before_call()
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+                logger.warning(f"Запрос к {self.base_url}{path} не удался ({str(e)}), повтор {attempt + 1} из {self.retries}")
+            except Exception:
+                # Любая другая ошибка запроса - тоже отказ, но не повод повторять
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # KeyboardInterrupt или остановка процесса
+                self.breaker.record_cancelled()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if attempt >= self.retries:
+                    return response
+                logger.warning(f"Запрос к {self.base_url}{path} вернул {response.status_code}, повтор {attempt + 1} из {self.retries}")
+            # Полный случайный разброс задержки, чтобы повторы разных воркеров не совпадали
+            time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
@@ -1,10 +1,25 @@
 import os
 import json
-import requests
+import base64
+import hashlib
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 import re
-from bs4 import BeautifulSoup
-from lxml import etree
+from collections import deque, namedtuple
+import numpy as np
+from lxml import etree, html as lxml_html
 import logging
+from datetime import datetime, timedelta, timezone
+
+from http_client import ResilientSession
+from semantic_index import ArticleVectors, normalize_rows
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,63 +28,245 @@ logger = logging.getLogger(__name__)
 # URL для доступа к сервисам
 TEXT_ANALYZER_URL = "http://localhost:8001"  # сервис анализа текста
 
-# Путь к HTML файлу роадмапа
+# Синхронизация статей: размер страницы и перекрытие окна updated_after в секундах
+SYNC_PAGE_SIZE = 500
+SYNC_OVERLAP_SECONDS = 60
+
+# Режимы сопоставления: точное совпадение ключевых слов или косинусное сходство эмбеддингов
+MATCH_MODES = ('keywords', 'semantic')
+# Минимальное сходство темы и статьи в семантическом режиме
+SEMANTIC_MIN_SIMILARITY = 0.3
+# Сколько последних версий снимка статей помнит журнал изменений (для инкрементального пересчета таблицы)
+CHANGE_LOG_SIZE = 1000
+
+# Пути к HTML роадмапа: исходный шаблон не изменяется, ссылки на статьи выводятся в index.html
 FRONTEND_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
+ROADMAP_TEMPLATE_PATH = os.path.join(FRONTEND_PATH, 'index.template.html')
 ROADMAP_HTML_PATH = os.path.join(FRONTEND_PATH, 'index.html')
 
+# Снимок разобранной модели тем: загружается при старте, если исходный HTML не менялся
+TOPICS_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topics_snapshot.json')
+
+# Снимок статей:
+# articles - {article_id: статья}, article_keywords - {article_id: ключевые слова},
+# keyword_index - инвертированный индекс: ключевое слово (в нижнем регистре) -> {article_id: оценка},
+# article_order - порядок появления статей (при равной оценке выигрывает загруженная раньше),
+# synced_at - отметка времени text_analyzer на момент последней синхронизации,
+# vectors - эмбеддинги статей (ArticleVectors) для семантического сопоставления,
+# version - номер снимка, растет с каждой публикацией
+ArticleState = namedtuple(
+    'ArticleState', ['articles', 'article_keywords', 'keyword_index', 'article_order', 'synced_at', 'vectors', 'version']
+)
+
+# Снимок модели тем:
+# topics - {stage_id: тема и подтемы}, keywords - {stage_id: ключевые слова темы},
+# stage_index - ключевое слово темы -> stage_id, в которых оно встречается,
+# source_hash и stat - ключи кэша: sha256 содержимого и (mtime, размер) шаблона,
+# embeddings - эмбеддинги тем в порядке topics (None, пока не получены из text_analyzer)
+TopicModel = namedtuple('TopicModel', ['topics', 'keywords', 'stage_index', 'source_hash', 'stat', 'embeddings'])
+
+# Таблица сопоставлений тем со статьями:
+# matches - {режим: {stage_id: сопоставление}} в формате match_article_to_topics,
+# state и topics - снимки, по которым она посчитана (следующее обновление пересчитывает только затронутые темы),
+# refreshed_at - время пересчета (UTC), refreshed_monotonic - для возраста таблицы,
+# recomputed - {режим: сколько тем пересчитано в последний раз}
+MatchTable = namedtuple('MatchTable', ['matches', 'state', 'topics', 'refreshed_at', 'refreshed_monotonic', 'recomputed'])
+
+
 class KeywordMatcher:
+    """
+    Сопоставляет статьи text_analyzer с темами роадмапа.
+    Состояние хранится в неизменяемых снимках ArticleState и TopicModel: писатели под блокировкой
+    собирают новый снимок (копирование при записи) и подменяют ссылку на него одним присваиванием,
+    а читатели один раз берут текущий снимок и работают с ним без блокировок. Поэтому один
+    экземпляр можно использовать из нескольких потоков, а читатели не видят наполовину обновленных данных
+    """
+
     def __init__(self):
-        self.roadmap_topics = {}
-        self.roadmap_keywords = {}
-        self.articles = {}
-        self.article_keywords = {}
-        
+        self._state = ArticleState({}, {}, {}, {}, None, ArticleVectors(), 0)
+        # Журнал изменений: (version, ID статей, добавленных или замененных в этой версии)
+        self._change_log = deque(maxlen=CHANGE_LOG_SIZE)
+        self._topics = TopicModel({}, {}, {}, None, None, None)
+        # Блокировки писателей: замена снимка статей, разбор тем, синхронизация с text_analyzer
+        self._write_lock = threading.Lock()
+        self._topics_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # Таблица сопоставлений (None, пока не посчитана) и блокировка ее пересчета
+        self._match_table = None
+        self._table_lock = threading.Lock()
+        # Ошибка последней синхронизации с text_analyzer (None - успешно)
+        self.sync_error = None
+        # Ссылки, выведенные в роадмап: {stage_id: {article_id: текст ссылки}}; None - еще не прочитаны из index.html
+        self.rendered_links = None
+        # sha256 последнего записанного index.html, чтобы не перезаписывать неизменный результат
+        self._rendered_hash = None
+        self._render_lock = threading.Lock()
+        # Общая сессия с пулом соединений, таймаутами, повторами и автоматическим выключателем
+        self.http = ResilientSession(TEXT_ANALYZER_URL)
+    
+    # Текущие снимки; возвращаемые словари общие для всех потоков и не изменяются
+    @property
+    def articles(self):
+        return self._state.articles
+    
+    @property
+    def article_keywords(self):
+        return self._state.article_keywords
+    
+    @property
+    def keyword_index(self):
+        return self._state.keyword_index
+    
+    @property
+    def synced_at(self):
+        return self._state.synced_at
+    
+    @property
+    def roadmap_topics(self):
+        return self._topics.topics
+    
+    @property
+    def roadmap_keywords(self):
+        return self._topics.keywords
+    
+    @property
+    def stage_index(self):
+        return self._topics.stage_index
+    
     def extract_topics_from_html(self):
-        """Извлекает темы и подтемы из HTML файла роадмапа"""
-        logger.info(f"Извлечение тем из файла {ROADMAP_HTML_PATH}")
-        
+        """
+        Возвращает темы и подтемы роадмапа.
+        Разобранная модель тем кэшируется: файл перечитывается только при изменении mtime/размера,
+        а разбирается заново только при изменении его содержимого (sha256)
+        """
         try:
-            with open(ROADMAP_HTML_PATH, 'r', encoding='utf-8') as file:
-                html_content = file.read()
-            
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Находим все секции с этапами (stage)
-            stages = soup.find_all('div', class_='stage')
+            stat = os.stat(ROADMAP_TEMPLATE_PATH)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+            model = self._topics
+            if model.topics and stat_key == model.stat:
+                return model.topics
             
-            for stage in stages:
-                stage_id = stage.get('id', '')
-                stage_title = stage.find('h3').text.strip() if stage.find('h3') else ''
+            with self._topics_lock:
+                # Пока ждали блокировку, модель мог обновить другой поток
+                model = self._topics
+                if model.topics and stat_key == model.stat:
+                    return model.topics
                 
-                # Извлекаем все подтемы
-                subtopics = []
-                ul_element = stage.find('ul')
-                if ul_element:
-                    for li in ul_element.find_all('li', recursive=False):
-                        subtopic_text = li.text.strip()
-                        subtopics.append(subtopic_text)
+                with open(ROADMAP_TEMPLATE_PATH, 'rb') as file:
+                    raw = file.read()
+                source_hash = hashlib.sha256(raw).hexdigest()
+                if model.topics and source_hash == model.source_hash:
+                    self._topics = model._replace(stat=stat_key)
+                    return model.topics
                 
-                # Добавляем тему и подтемы в словарь
-                self.roadmap_topics[stage_id] = {
-                    'title': stage_title,
-                    'subtopics': subtopics
-                }
-                
-                # Извлекаем ключевые слова из заголовка и подтем
-                keywords = self._extract_keywords_from_text(stage_title)
-                for subtopic in subtopics:
-                    keywords.extend(self._extract_keywords_from_text(subtopic))
-                
-                # Удаляем дубликаты и сохраняем ключевые слова для темы
-                self.roadmap_keywords[stage_id] = list(set(keywords))
+                logger.info(f"Извлечение тем из файла {ROADMAP_TEMPLATE_PATH}")
+                roadmap_topics, roadmap_keywords = self._parse_topics(raw.decode('utf-8'))
+                self._set_topics(roadmap_topics, roadmap_keywords, source_hash, stat_key)
+                self.save_topics_snapshot()
                 
-            logger.info(f"Извлечено {len(self.roadmap_topics)} тем из роадмапа")
-            return self.roadmap_topics
+                logger.info(f"Извлечено {len(roadmap_topics)} тем из роадмапа")
+                return roadmap_topics
                 
         except Exception as e:
             logger.error(f"Ошибка при извлечении тем из HTML: {str(e)}")
             return {}
     
+    def _parse_topics(self, html_content):
+        """Разбирает HTML роадмапа через lxml, возвращает (темы, ключевые слова тем)"""
+        dom = lxml_html.fromstring(html_content)
+        roadmap_topics = {}
+        roadmap_keywords = {}
+        
+        # Находим все секции с этапами (stage)
+        for stage in dom.find_class('stage'):
+            if stage.tag != 'div':
+                continue
+            stage_id = stage.get('id', '')
+            h3 = stage.find('.//h3')
+            stage_title = h3.text_content().strip() if h3 is not None else ''
+            
+            # Извлекаем все подтемы
+            subtopics = []
+            ul_element = stage.find('.//ul')
+            if ul_element is not None:
+                for li in ul_element.findall('li'):
+                    subtopics.append(li.text_content().strip())
+            
+            roadmap_topics[stage_id] = {
+                'title': stage_title,
+                'subtopics': subtopics
+            }
+            
+            # Извлекаем ключевые слова из заголовка и подтем
+            keywords = self._extract_keywords_from_text(stage_title)
+            for subtopic in subtopics:
+                keywords.extend(self._extract_keywords_from_text(subtopic))
+            
+            # Удаляем дубликаты и сохраняем ключевые слова для темы
+            roadmap_keywords[stage_id] = list(set(keywords))
+        
+        return roadmap_topics, roadmap_keywords
+    
+    def _set_topics(self, roadmap_topics, roadmap_keywords, source_hash, stat=None, embeddings=None):
+        """Собирает новую модель тем с индексом ключевых слов тем и подменяет текущую"""
+        stage_index = {}
+        for stage_id, keywords in roadmap_keywords.items():
+            for keyword in keywords:
+                stage_index.setdefault(keyword, set()).add(stage_id)
+        stage_index = {keyword: frozenset(stage_ids) for keyword, stage_ids in stage_index.items()}
+        self._topics = TopicModel(roadmap_topics, roadmap_keywords, stage_index, source_hash, stat, embeddings)
+    
+    def save_topics_snapshot(self, path=None):
+        """Сохраняет разобранную модель тем в JSON вместе с хэшем исходного HTML"""
+        path = path or TOPICS_SNAPSHOT_PATH
+        if not path:
+            return False
+        try:
+            model = self._topics
+            snapshot = {
+                'source_hash': model.source_hash,
+                'topics': model.topics,
+                'keywords': model.keywords,
+                'embeddings': model.embeddings.tolist() if model.embeddings is not None else None
+            }
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(snapshot, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок тем {path}: {str(e)}")
+            return False
+    
+    def load_topics_snapshot(self, path=None):
+        """
+        Загружает модель тем из снимка, если он построен по текущему содержимому HTML роадмапа.
+        :return: True, если снимок подошел
+        """
+        path = path or TOPICS_SNAPSHOT_PATH
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                snapshot = json.load(file)
+            with open(ROADMAP_TEMPLATE_PATH, 'rb') as file:
+                source_hash = hashlib.sha256(file.read()).hexdigest()
+            if snapshot.get('source_hash') != source_hash:
+                logger.info("Снимок тем устарел, темы будут извлечены из HTML заново")
+                return False
+            stat = os.stat(ROADMAP_TEMPLATE_PATH)
+            with self._topics_lock:
+                embeddings = snapshot.get('embeddings')
+                self._set_topics(
+                    snapshot['topics'], snapshot['keywords'], source_hash, (stat.st_mtime_ns, stat.st_size),
+                    np.asarray(embeddings, dtype=np.float32) if embeddings is not None else None
+                )
+            logger.info(f"Загружено {len(self.roadmap_topics)} тем из снимка {path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить снимок тем {path}: {str(e)}")
+            return False
+    
     def _extract_keywords_from_text(self, text):
         """Извлекает ключевые слова из текста"""
         # Удаляем скобки и их содержимое
@@ -90,20 +287,14 @@ class KeywordMatcher:
     def create_mock_article(self):
         """Создаёт мок-статью через text_analyzer сервис"""
         try:
-            url = f"{TEXT_ANALYZER_URL}/mock-article"
-            response = requests.post(url)
+            response = self.http.post("/mock-article")
             if response.status_code == 200:
                 data = response.json()
                 article_id = data.get('article_id', 1)
                 logger.info(f"Создана мок-статья с ID {article_id}")
                 
                 # Сохраняем статью в локальные данные
-                self.articles[article_id] = {
-                    'id': article_id,
-                    'name': data.get('title', ''),
-                    'text': data.get('content', '')
-                }
-                self.article_keywords[article_id] = data.get('keywords', [])
+                self.add_article(article_id, data.get('title', ''), data.get('content', ''), data.get('keywords', []))
                 
                 return True
             else:
@@ -113,182 +304,548 @@ class KeywordMatcher:
             logger.error(f"Ошибка при запросе к text_analyzer для создания мок-статьи: {str(e)}")
             return False
     
+    def sync_articles(self):
+        """
+        Инкрементально синхронизирует статьи с text_analyzer.
+        Хранит отметку synced_at прошлой синхронизации и запрашивает только статьи, сохраненные
+        после нее, постранично и без текстов. Первый вызов загружает все статьи.
+        Все полученные страницы публикуются одним новым снимком.
+        :return: Список новых и измененных статей
+        """
+        # Параллельные синхронизации не нужны: вторая дождется первой и заберет только ее хвост
+        with self._sync_lock:
+            params = {'limit': SYNC_PAGE_SIZE, 'include_content': 'false', 'include_embedding': 'true'}
+            if self.synced_at is not None:
+                # Перекрытие на случай транзакций, зафиксированных уже после прошлой синхронизации
+                params['updated_after'] = (self.synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)).isoformat()
+            
+            changed = []
+            synced_at = None
+            self.sync_error = None
+            try:
+                while True:
+                    response = self.http.get("/articles", params=params)
+                    if response.status_code != 200:
+                        logger.error(f"Ошибка при получении статей: {response.status_code}")
+                        self.sync_error = f"HTTP {response.status_code}"
+                        synced_at = None
+                        break
+                    data = response.json()
+                    # Отметка первой страницы: все, что сохранено позже, попадет в следующую синхронизацию
+                    synced_at = synced_at or data.get('synced_at')
+                    changed.extend(data.get('articles', []))
+                    
+                    if data.get('next_after_id') is None:
+                        break
+                    params['after_id'] = data['next_after_id']
+            except Exception as e:
+                logger.error(f"Ошибка при запросе к text_analyzer для получения статей: {str(e)}")
+                self.sync_error = str(e)
+                synced_at = None
+            
+            # Сохраняем статьи, их ключевые слова и эмбеддинги; при ошибке отметка не сдвигается
+            self.add_articles(
+                [(article.get('id'), article.get('title', ''), article.get('content'), article.get('keywords', []))
+                 for article in changed],
+                synced_at=datetime.fromisoformat(synced_at) if synced_at else None,
+                embeddings={
+                    article['id']: np.frombuffer(base64.b64decode(article['embedding']), dtype=np.float32)
+                    for article in changed if article.get('embedding')
+                }
+            )
+        
+        logger.info(f"Получено {len(changed)} новых или измененных статей из text_analyzer (всего {len(self.articles)})")
+        return changed
+    
     def get_all_articles(self):
-        """Получает все статьи из text_analyzer"""
-        try:
-            url = f"{TEXT_ANALYZER_URL}/articles"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                articles = data.get('articles', [])
-                logger.info(f"Получено {len(articles)} статей из text_analyzer")
+        """Получает статьи из text_analyzer; загружаются только новые и измененные (см. sync_articles)"""
+        return self.sync_articles()
+    
+    def add_article(self, article_id, title, content, keywords):
+        """Сохраняет одну статью (см. add_articles)"""
+        self.add_articles([(article_id, title, content, keywords)])
+    
+    def add_articles(self, items, synced_at=None, embeddings=None):
+        """
+        Сохраняет статьи и обновляет инвертированный индекс ключевых слов, публикуя один новый снимок.
+        Копируются верхние словари и только затронутые списки статей индекса.
+        content=None сохраняет уже известный текст статьи (синхронизация идет без текстов)
+        :param items: Последовательность (article_id, title, content, keywords)
+        :param synced_at: Новая отметка синхронизации, None - оставить прежнюю
+        :param embeddings: Эмбеддинги статей {article_id: вектор}
+        """
+        with self._write_lock:
+            state = self._state
+            articles = dict(state.articles)
+            article_keywords = dict(state.article_keywords)
+            keyword_index = dict(state.keyword_index)
+            article_order = dict(state.article_order)
+            # Ключевые слова, списки статей которых уже скопированы для нового снимка
+            copied = set()
+            
+            def postings(keyword):
+                if keyword not in copied:
+                    keyword_index[keyword] = dict(keyword_index.get(keyword, {}))
+                    copied.add(keyword)
+                return keyword_index[keyword]
+            
+            embeddings = dict(embeddings or {})
+            changed = set()
+            for article_id, title, content, keywords in items:
+                if content is None:
+                    content = articles.get(article_id, {}).get('text', '')
+                if self._is_unchanged(articles, article_keywords, state.vectors, article_id, title, content,
+                                      keywords, embeddings.get(article_id)):
+                    # Повторно присланная статья (перекрытие окна синхронизации) не создает новой версии
+                    embeddings.pop(article_id, None)
+                    continue
+                changed.add(article_id)
+                articles[article_id] = {
+                    'id': article_id,
+                    'name': title,
+                    'text': content
+                }
                 
-                # Сохраняем статьи и их ключевые слова
-                for article in articles:
-                    article_id = article.get('id')
-                    self.articles[article_id] = {
-                        'id': article_id,
-                        'name': article.get('title', ''),
-                        'text': article.get('content', '')
-                    }
-                    self.article_keywords[article_id] = article.get('keywords', [])
-                    
-                return articles
-            else:
-                logger.error(f"Ошибка при получении статей: {response.status_code}")
-                return []
-        except Exception as e:
-            logger.error(f"Ошибка при запросе к text_analyzer для получения статей: {str(e)}")
-            return []
+                # Убираем из индекса ключевые слова прошлой версии статьи
+                for item in article_keywords.get(article_id, []):
+                    if item['keyword'].lower() in keyword_index:
+                        postings(item['keyword'].lower()).pop(article_id, None)
+                
+                article_keywords[article_id] = keywords
+                article_order.setdefault(article_id, len(article_order))
+                for item in keywords:
+                    postings(item['keyword'].lower())[article_id] = item.get('score', 0)
+            
+            for keyword in copied:
+                if not keyword_index[keyword]:
+                    del keyword_index[keyword]
+            
+            version = state.version + 1 if changed else state.version
+            if changed:
+                self._change_log.append((version, frozenset(changed)))
+            self._state = ArticleState(
+                articles, article_keywords, keyword_index, article_order,
+                synced_at if synced_at is not None else state.synced_at,
+                state.vectors.with_updates(embeddings), version
+            )
+    
+    def _is_unchanged(self, articles, article_keywords, vectors, article_id, title, content, keywords, embedding):
+        """Совпадает ли присланная версия статьи с уже сохраненной"""
+        article = articles.get(article_id)
+        if article is None or article['name'] != title or article['text'] != content:
+            return False
+        if article_keywords.get(article_id) != keywords:
+            return False
+        if embedding is None:
+            return True
+        stored = vectors.get(article_id)
+        return stored is not None and np.array_equal(stored, normalize_rows(embedding))
+    
+    def _count_matches(self, topic_keywords, state=None):
+        """
+        Через индекс находит статьи, у которых есть ключевые слова темы.
+        Возвращает {article_id: [совпавшие ключевые слова]}; статьи без совпадений не затрагиваются
+        """
+        keyword_index = (state or self._state).keyword_index
+        matches = {}
+        for keyword in set(topic_keywords):
+            for article_id in keyword_index.get(keyword, ()):
+                matches.setdefault(article_id, []).append(keyword)
+        return matches
+    
+    def _best_match(self, topic_keywords, state=None):
+        """Лучшая статья для темы и совпавшие ключевые слова, либо (None, [])"""
+        state = state or self._state
+        matches = self._count_matches(topic_keywords, state)
+        if not matches:
+            return None, []
+        # Наибольшее число совпадений, при равенстве - статья, загруженная раньше
+        best_article_id = max(matches, key=lambda aid: (len(matches[aid]), -state.article_order[aid]))
+        return best_article_id, matches[best_article_id]
     
     def find_article_by_keywords(self, topic_keywords):
         """Находит статью, соответствующую ключевым словам темы"""
         if not self.article_keywords:
             # Если статьи еще не загружены, получаем их
-            self.get_all_articles()
+            self.sync_articles()
         
         if not self.article_keywords:
             logger.warning("Не удалось загрузить статьи для сопоставления")
             return None
         
-        # Словарь для хранения оценок соответствия {article_id: score}
-        article_scores = {}
-        
-        for article_id, keywords in self.article_keywords.items():
-            # Преобразуем ключевые слова в нижний регистр для сравнения
-            article_kw = [item['keyword'].lower() for item in keywords]
-            
-            # Считаем количество совпадающих ключевых слов
-            matching_keywords = set(article_kw).intersection(set(topic_keywords))
-            if matching_keywords:
-                score = len(matching_keywords)
-                article_scores[article_id] = score
-        
-        # Если найдены соответствия, возвращаем ID статьи с наибольшим соответствием
-        if article_scores:
-            best_article_id = max(article_scores, key=article_scores.get)
-            logger.info(f"Найдена лучшая статья с ID {best_article_id} (оценка: {article_scores[best_article_id]})")
-            return best_article_id
-        
-        return None
+        best_article_id, matching_keywords = self._best_match(topic_keywords)
+        if best_article_id is not None:
+            logger.info(f"Найдена лучшая статья с ID {best_article_id} (оценка: {len(matching_keywords)})")
+        return best_article_id
+    
+    def _topic_embeddings(self):
+        """Модель тем с эмбеддингами тем: они запрашиваются у text_analyzer один раз на версию шаблона"""
+        model = self._topics
+        if model.embeddings is not None or not model.topics:
+            return model
+        with self._topics_lock:
+            model = self._topics
+            if model.embeddings is not None:
+                return model
+            # Тема описывается заголовком и списком подтем
+            texts = [f"{topic['title']}. {', '.join(topic['subtopics'])}" for topic in model.topics.values()]
+            try:
+                response = self.http.post("/embed", json={'texts': texts})
+                if response.status_code != 200:
+                    logger.error(f"Ошибка при получении эмбеддингов тем: {response.status_code}")
+                    return model
+                embeddings = np.asarray(response.json()['embeddings'], dtype=np.float32)
+            except Exception as e:
+                logger.error(f"Ошибка при запросе к text_analyzer для получения эмбеддингов тем: {str(e)}")
+                return model
+            model = model._replace(embeddings=embeddings)
+            self._topics = model
+            self.save_topics_snapshot()
+            logger.info(f"Получены эмбеддинги {len(texts)} тем роадмапа")
+            return model
+    
+    def semantic_top_k(self, k=5, state=None):
+        """
+        Лучшие статьи для каждой темы по косинусному сходству эмбеддингов (полный перебор одной матричной операцией)
+        :param k: Сколько статей вернуть для темы
+        :return: {stage_id: [(article_id, сходство), ...]} по убыванию сходства, не ниже SEMANTIC_MIN_SIMILARITY
+        """
+        state = state or self._state
+        model = self._topic_embeddings()
+        if model.embeddings is None or not len(state.vectors):
+            return {}
+        found = state.vectors.top_k(model.embeddings, k)
+        return {
+            stage_id: [(aid, similarity) for aid, similarity in articles if similarity >= SEMANTIC_MIN_SIMILARITY]
+            for stage_id, articles in zip(model.topics, found)
+        }
+    
+    def _keyword_matches(self, stage_ids, state, topics):
+        """Лучшая статья по ключевым словам для каждой из тем stage_ids: {stage_id: сопоставление}"""
+        matches = {}
+        # Для каждой темы находим наиболее подходящую статью: индекс отдает только статьи-кандидаты
+        for stage_id in stage_ids:
+            best_article_id, matching_keywords = self._best_match(topics.keywords[stage_id], state)
+            if best_article_id is not None:
+                # Оценка - количество совпадающих ключевых слов
+                matches[stage_id] = {
+                    'article_id': best_article_id,
+                    'score': len(matching_keywords),
+                    'matching_keywords': matching_keywords
+                }
+        return matches
+    
+    def _semantic_matches(self, stage_ids, state, topics):
+        """Лучшая статья по сходству эмбеддингов для каждой из тем stage_ids: {stage_id: сопоставление}"""
+        stage_ids = list(stage_ids)
+        if topics.embeddings is None or not len(state.vectors) or not stage_ids:
+            return {}
+        positions = {stage_id: i for i, stage_id in enumerate(topics.topics)}
+        found = state.vectors.top_k(topics.embeddings[[positions[stage_id] for stage_id in stage_ids]], 1)
+        matches = {}
+        for stage_id, articles in zip(stage_ids, found):
+            if articles and articles[0][1] >= SEMANTIC_MIN_SIMILARITY:
+                best_article_id, similarity = articles[0]
+                matches[stage_id] = {
+                    'article_id': best_article_id,
+                    'score': int(similarity * 100),
+                    'similarity': similarity,
+                    'matching_keywords': []
+                }
+        return matches
     
-    def match_article_to_topics(self, article_id=None):
+    def _semantic_match(self, article_id, state):
+        """Семантическое сопоставление одной статьи со всеми темами"""
+        model = self._topic_embeddings()
+        similarities = state.vectors.similarities(article_id, model.embeddings) if model.embeddings is not None else None
+        if similarities is None:
+            logger.warning(f"Нет эмбеддинга статьи {article_id} или тем роадмапа")
+            return {}
+        matches = {
+            stage_id: {'score': int(similarity * 100), 'similarity': float(similarity), 'matching_keywords': []}
+            for stage_id, similarity in zip(model.topics, similarities) if similarity >= SEMANTIC_MIN_SIMILARITY
+        }
+        return dict(sorted(matches.items(), key=lambda item: -item[1]['similarity']))
+    
+    def match_article_to_topics(self, article_id=None, mode='keywords'):
         """
-        Сопоставляет статью с темами на основе ключевых слов.
+        Сопоставляет статью с темами на основе ключевых слов (mode='keywords')
+        или сходства эмбеддингов (mode='semantic').
         Если article_id не указан, находит лучшую статью для каждой темы.
         """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Неизвестный режим сопоставления: {mode}")
+        
         # Если не указан конкретный ID статьи, работаем со всеми статьями
         if article_id is None:
             # Создаем мок-статью и получаем все статьи
             self.create_mock_article()
-            all_articles = self.get_all_articles()
+            self.sync_articles()
+            state = self._state
             
             # Результаты сопоставления {stage_id: {article_id, score, matching_keywords}}
-            all_matches = {}
-            
-            # Для каждой темы находим наиболее подходящую статью
-            for stage_id, keywords in self.roadmap_keywords.items():
-                best_article_id = self.find_article_by_keywords(keywords)
-                
-                if best_article_id is not None and best_article_id in self.article_keywords:
-                    article_kw = [item['keyword'].lower() for item in self.article_keywords[best_article_id]]
-                    
-                    # Количество совпадающих ключевых слов
-                    matching_keywords = set(article_kw).intersection(set(keywords))
-                    if matching_keywords:
-                        # Оценка - количество совпадающих ключевых слов
-                        score = len(matching_keywords)
-                        all_matches[stage_id] = {
-                            'article_id': best_article_id,
-                            'score': score,
-                            'matching_keywords': list(matching_keywords)
-                        }
-            
-            return all_matches
+            if mode == 'semantic':
+                topics = self._topic_embeddings()
+                return self._semantic_matches(topics.topics, state, topics)
+            topics = self._topics
+            return self._keyword_matches(topics.keywords, state, topics)
         
         # Если указан конкретный ID статьи
         else:
             # Проверяем, есть ли статья в нашем кеше
             if article_id not in self.article_keywords:
                 # Сначала пробуем получить все статьи
-                self.get_all_articles()
+                self.sync_articles()
                 
                 # Если после этого статья всё ещё не найдена, ничего не возвращаем
                 if article_id not in self.article_keywords:
                     logger.warning(f"Статья с ID {article_id} не найдена")
                     return {}
+            if mode == 'semantic':
+                return self._semantic_match(article_id, self._state)
             
-            article_kw = [item['keyword'].lower() for item in self.article_keywords[article_id]]
-            
-            # Результаты сопоставления {stage_id: score}
+            # Результаты сопоставления {stage_id: score}: по индексу тем проходим только темы с общими словами
+            topics = self._topics
             matches = {}
+            for keyword in {item['keyword'].lower() for item in self.article_keywords[article_id]}:
+                for stage_id in topics.stage_index.get(keyword, ()):
+                    matches.setdefault(stage_id, {'score': 0, 'matching_keywords': []})
+                    matches[stage_id]['score'] += 1
+                    matches[stage_id]['matching_keywords'].append(keyword)
             
-            for stage_id, keywords in self.roadmap_keywords.items():
-                # Количество совпадающих ключевых слов
-                matching_keywords = set(article_kw).intersection(set(keywords))
-                if matching_keywords:
-                    # Оценка - количество совпадающих ключевых слов
-                    score = len(matching_keywords)
-                    matches[stage_id] = {
-                        'score': score,
-                        'matching_keywords': list(matching_keywords)
-                    }
-            
-            # Сортируем по убыванию оценки
-            sorted_matches = {k: v for k, v in sorted(matches.items(), key=lambda item: item[1]['score'], reverse=True)}
+            # Сортируем по убыванию оценки, при равенстве - в порядке тем роадмапа
+            stage_order = {stage_id: i for i, stage_id in enumerate(topics.keywords)}
+            sorted_matches = {k: v for k, v in sorted(matches.items(), key=lambda item: (-item[1]['score'], stage_order[item[0]]))}
             
             return sorted_matches
     
-    def update_html_with_article_links(self, matches):
-        """Обновляет HTML файл, добавляя ссылки на статьи"""
-        if not matches or not self.articles:
+    @property
+    def match_table(self):
+        """Текущая таблица сопоставлений или None, если она еще не посчитана"""
+        return self._match_table
+    
+    def refresh_match_table(self):
+        """
+        Пересчитывает таблицу сопоставлений по текущим снимкам статей и тем и публикует новую.
+        Пересчитываются только темы, затронутые статьями, которые изменились с прошлого пересчета;
+        все темы - при первом пересчете и после изменения шаблона роадмапа.
+        :return: Новая таблица MatchTable
+        """
+        with self._table_lock:
+            table = self._match_table
+            state = self._state
+            topics = self._topic_embeddings()
+            
+            keyword_matches, keyword_stages = self._refresh_keyword_matches(table, state, topics)
+            semantic_matches, semantic_stages = self._refresh_semantic_matches(table, state, topics)
+            
+            self._match_table = MatchTable(
+                {'keywords': keyword_matches, 'semantic': semantic_matches},
+                state, topics, datetime.now(timezone.utc), time.monotonic(),
+                {'keywords': keyword_stages, 'semantic': semantic_stages}
+            )
+            logger.info(f"Таблица сопоставлений обновлена: пересчитано тем по ключевым словам {keyword_stages}, "
+                        f"по эмбеддингам {semantic_stages}")
+            return self._match_table
+    
+    def _changed_articles(self, before, after):
+        """ID статей, добавленных или замененных между двумя снимками"""
+        if before.version == after.version:
+            return []
+        log = list(self._change_log)
+        if log and log[0][0] <= before.version + 1:
+            changed = set()
+            for version, ids in log:
+                if before.version < version <= after.version:
+                    changed.update(ids)
+            return list(changed)
+        # Журнал уже не покрывает эти версии: сравниваем снимки целиком (замененная статья - новый объект)
+        return [article_id for article_id, article in after.articles.items() if before.articles.get(article_id) is not article]
+    
+    def _merge_matches(self, current, updated, affected, topics):
+        """Заменяет в таблице сопоставления затронутых тем, сохраняя порядок тем роадмапа"""
+        merged = {stage_id: match for stage_id, match in current.items() if stage_id not in affected}
+        merged.update(updated)
+        return {stage_id: merged[stage_id] for stage_id in topics.topics if stage_id in merged}
+    
+    def _refresh_keyword_matches(self, table, state, topics):
+        """Сопоставления по ключевым словам и число пересчитанных тем"""
+        if table is None or table.topics.source_hash != topics.source_hash:
+            return self._keyword_matches(topics.keywords, state, topics), len(topics.keywords)
+        
+        # Затронуты темы с ключевыми словами прежней или новой версии измененных статей
+        affected = set()
+        for article_id in self._changed_articles(table.state, state):
+            for keywords in (table.state.article_keywords.get(article_id, []), state.article_keywords[article_id]):
+                for item in keywords:
+                    affected.update(topics.stage_index.get(item['keyword'].lower(), ()))
+        
+        updated = self._keyword_matches(affected, state, topics)
+        return self._merge_matches(table.matches['keywords'], updated, affected, topics), len(affected)
+    
+    def _refresh_semantic_matches(self, table, state, topics):
+        """Сопоставления по эмбеддингам и число пересчитанных тем"""
+        if topics.embeddings is None:
+            return {}, 0
+        if table is None or table.topics.embeddings is not topics.embeddings:
+            return self._semantic_matches(topics.topics, state, topics), len(topics.topics)
+        
+        current = table.matches['semantic']
+        changed = self._changed_articles(table.state, state)
+        # Затронуты темы, лучшая статья которых изменилась, и темы, которым измененная статья подходит
+        # не хуже текущей лучшей
+        changed_ids = set(changed)
+        affected = {stage_id for stage_id, match in current.items() if match['article_id'] in changed_ids}
+        vectors = [state.vectors.get(article_id) for article_id in changed if article_id in state.vectors]
+        if vectors:
+            best = (np.stack(vectors) @ topics.embeddings.T).max(axis=0)
+            for stage_id, similarity in zip(topics.topics, best):
+                if similarity >= current.get(stage_id, {}).get('similarity', SEMANTIC_MIN_SIMILARITY):
+                    affected.add(stage_id)
+        
+        updated = self._semantic_matches([stage_id for stage_id in topics.topics if stage_id in affected], state, topics)
+        return self._merge_matches(current, updated, affected, topics), len(affected)
+    
+    def update_html_with_article_links(self, matches, replace=False, article_id=None):
+        """
+        Добавляет ссылки на статьи в роадмап.
+        index.html собирается заново из неизменного шаблона и ссылок (не более одной ссылки на статью в теме)
+        и атомарно подменяется; если результат не изменился, файл не пишется.
+        Запись сериализуется между потоками и, где доступен fcntl, между процессами
+        :param matches: {stage_id: {'article_id': ..., 'score': ...}}
+        :param replace: matches - лучшие статьи всех тем (таблица сопоставлений): ссылки строятся только по ним,
+            выведенные ранее ссылки отбрасываются
+        :param article_id: matches - все темы этой статьи: ее ссылки в других темах удаляются, ссылки
+            остальных статей сохраняются
+        """
+        articles = self.articles
+        if not matches or not articles:
             logger.warning("Нет сопоставлений для обновления HTML")
             return False
         
         try:
-            with open(ROADMAP_HTML_PATH, 'r', encoding='utf-8') as file:
-                html_content = file.read()
-            
-            dom = etree.HTML(html_content)
-            
-            for stage_id, match_data in matches.items():
-                article_id = match_data.get('article_id')
-                if not article_id and 'score' in match_data:
-                    # Это формат старого метода, используем текущий article_id
-                    article_id = list(self.articles.keys())[0] if self.articles else None
+            with self._render_lock, self._output_lock():
+                raw = self._read_output()
+                output_hash = hashlib.sha256(raw).hexdigest() if raw is not None else None
+                if replace:
+                    self.rendered_links = {}
+                elif self.rendered_links is None or output_hash != self._rendered_hash:
+                    # Первый вызов или index.html записал другой процесс: берем выведенные ссылки из файла
+                    self.rendered_links = self._parse_rendered_links(raw) if raw is not None else {}
+                self._rendered_hash = output_hash
+                if article_id is not None:
+                    # Прежние темы заново сопоставленной статьи
+                    self.rendered_links = {
+                        stage_id: {linked_id: text for linked_id, text in stage_links.items() if linked_id != article_id}
+                        for stage_id, stage_links in self.rendered_links.items()
+                    }
                 
-                if article_id and article_id in self.articles:
-                    article = self.articles[article_id]
-                    
-                    # Находим элемент ресурсов для этой темы
-                    resources_ul = dom.xpath(f'//div[@id="{stage_id}"]/div[@class="stage-content"]/div[@class="resources"]/ul')
+                for stage_id, match_data in matches.items():
+                    matched_id = match_data.get('article_id')
+                    if not matched_id and 'score' in match_data:
+                        # Это формат старого метода, используем текущий article_id
+                        matched_id = next(iter(articles))
                     
-                    if resources_ul:
-                        # Создаем новый элемент li с ссылкой на статью
-                        new_li = etree.Element("li")
-                        new_a = etree.SubElement(new_li, "a")
-                        new_a.set("href", f"#article-{article_id}")
-                        new_a.set("class", "article-link")
-                        new_a.set("data-article-id", str(article_id))
-                        
+                    if matched_id and matched_id in articles:
+                        article = articles[matched_id]
                         score = match_data.get('score', 0)
-                        new_a.text = f"{article.get('name', 'Статья')} (совпадение: {score})"
-                        
-                        # Добавляем новый элемент в ul
-                        resources_ul[0].append(new_li)
-                        
-                        logger.info(f"Добавлена ссылка на статью {article_id} в тему {stage_id}")
-            
-            # Сохраняем обновленный HTML
-            with open(ROADMAP_HTML_PATH, 'w', encoding='utf-8') as file:
-                file.write(etree.tostring(dom, pretty_print=True, method="html", encoding='unicode'))
-            
-            logger.info(f"HTML файл успешно обновлен: {ROADMAP_HTML_PATH}")
-            return True
+                        # Повторное сопоставление той же статьи с темой обновляет ссылку, а не добавляет новую
+                        self.rendered_links.setdefault(stage_id, {})[matched_id] = \
+                            f"{article.get('name', 'Статья')} (совпадение: {score})"
+                
+                html_content = self._render_html(self.rendered_links)
+                return self._write_if_changed(html_content)
             
         except Exception as e:
             logger.error(f"Ошибка при обновлении HTML: {str(e)}")
             return False
+    
+    def _resources_list(self, dom, stage_id):
+        """Список ресурсов темы в DOM роадмапа или None"""
+        resources_ul = dom.xpath(f'//div[@id="{stage_id}"]/div[@class="stage-content"]/div[@class="resources"]/ul')
+        return resources_ul[0] if resources_ul else None
+    
+    @contextmanager
+    def _output_lock(self):
+        """Межпроцессная блокировка index.html на время сборки (несколько воркеров WSGI)"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{ROADMAP_HTML_PATH}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _read_output(self):
+        """Содержимое выведенного index.html или None"""
+        try:
+            with open(ROADMAP_HTML_PATH, 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+    
+    def _parse_rendered_links(self, raw):
+        """Восстанавливает ссылки на статьи из ранее выведенного index.html (например, после перезапуска)"""
+        links = {}
+        dom = lxml_html.fromstring(raw)
+        for stage in dom.find_class('stage'):
+            stage_id = stage.get('id', '')
+            resources_ul = self._resources_list(dom, stage_id)
+            if resources_ul is None:
+                continue
+            for link in resources_ul.xpath('li/a[@class="article-link"]'):
+                article_id = link.get('data-article-id')
+                article_id = int(article_id) if article_id.isdigit() else article_id
+                links.setdefault(stage_id, {})[article_id] = link.text_content()
+        return links
+    
+    def _render_html(self, links):
+        """Собирает HTML роадмапа из шаблона и ссылок на статьи"""
+        with open(ROADMAP_TEMPLATE_PATH, 'r', encoding='utf-8') as file:
+            dom = etree.HTML(file.read())
+        
+        for stage_id, stage_links in links.items():
+            # Находим элемент ресурсов для этой темы
+            resources_ul = self._resources_list(dom, stage_id)
+            if resources_ul is None:
+                continue
+            for article_id, text in stage_links.items():
+                # Создаем новый элемент li с ссылкой на статью
+                new_li = etree.SubElement(resources_ul, "li")
+                new_a = etree.SubElement(new_li, "a")
+                new_a.set("href", f"#article-{article_id}")
+                new_a.set("class", "article-link")
+                new_a.set("data-article-id", str(article_id))
+                new_a.text = text
+        
+        return etree.tostring(dom, pretty_print=True, method="html", encoding='unicode')
+    
+    def _write_if_changed(self, html_content):
+        """Атомарно записывает index.html через временный файл, если содержимое изменилось"""
+        data = html_content.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        if content_hash == self._rendered_hash:
+            logger.info("HTML роадмапа не изменился, запись пропущена")
+            return True
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(ROADMAP_HTML_PATH), prefix='.index.', suffix='.html')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(tmp_path, 0o644)
+            # Читатели видят либо старый, либо новый файл целиком
+            os.replace(tmp_path, ROADMAP_HTML_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._rendered_hash = content_hash
+        
+        logger.info(f"HTML файл успешно обновлен: {ROADMAP_HTML_PATH}")
+        return True
 
 # Пример использования
 if __name__ == "__main__":
@@ -299,7 +856,7 @@ if __name__ == "__main__":
     
     # Создаем мок-статью и получаем все статьи
     matcher.create_mock_article()
-    matcher.get_all_articles()
+    matcher.sync_articles()
     
     # Сопоставляем статьи с темами без указания конкретной статьи
     matches = matcher.match_article_to_topics()
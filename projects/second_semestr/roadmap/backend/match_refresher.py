@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Как часто обновлять таблицу сопоставлений, секунд
+MATCH_REFRESH_INTERVAL = 30
+# Таблица старше этого считается устаревшей (например, text_analyzer недоступен), секунд
+MATCH_STALE_SECONDS = 120
+
+
+class MatchRefresher:
+    """
+    Фоновый поток, который поддерживает таблицу сопоставлений KeywordMatcher в актуальном состоянии:
+    раз в interval секунд (или сразу после trigger) забирает новые статьи и изменения шаблона
+    и пересчитывает только затронутые темы. API отдает готовую таблицу, не обращаясь к text_analyzer
+    """
+
+    def __init__(self, matcher, interval=MATCH_REFRESH_INTERVAL, stale_after=MATCH_STALE_SECONDS):
+        self.matcher = matcher
+        self.interval = interval
+        self.stale_after = stale_after
+        self.refreshes = 0
+        self.last_error = None
+        self._mock_created = False
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Запускает фоновый поток, если он еще не запущен; можно вызывать из нескольких потоков"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="match-refresher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def trigger(self):
+        """Просит поток обновить таблицу, не дожидаясь интервала"""
+        self._wake.set()
+
+    def refresh(self):
+        """Синхронизирует темы и статьи и обновляет таблицу сопоставлений"""
+        with self._refresh_lock:
+            if not self._mock_created:
+                # Мок-статья нужна один раз, а не на каждый запрос
+                self._mock_created = self.matcher.create_mock_article()
+            self.matcher.extract_topics_from_html()
+            self.matcher.sync_articles()
+            table = self.matcher.refresh_match_table()
+            self.refreshes += 1
+            self.last_error = self.matcher.sync_error
+            return table
+
+    def get_table(self):
+        """Таблица сопоставлений; при холодном старте считается синхронно один раз"""
+        table = self.matcher.match_table
+        if table is None:
+            table = self.refresh()
+        return table
+
+    def status(self):
+        """Время последнего пересчета, возраст и признак устаревания таблицы"""
+        table = self.matcher.match_table
+        age = time.monotonic() - table.refreshed_monotonic if table is not None else None
+        return {
+            'refreshed_at': table.refreshed_at.isoformat() if table is not None else None,
+            'age_seconds': round(age, 3) if age is not None else None,
+            # Таблица устарела, если ее давно не пересчитывали или последняя синхронизация не удалась
+            'stale': table is None or age > self.stale_after or self.last_error is not None,
+            'last_error': self.last_error,
+            'refreshes': self.refreshes,
+            'recomputed_stages': table.recomputed if table is not None else None,
+            'interval_seconds': self.interval
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Ошибка при обновлении таблицы сопоставлений: {str(e)}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,118 @@
+import numpy as np
+
+# Минимальная емкость буфера эмбеддингов, строк
+MIN_CAPACITY = 1024
+
+
+def normalize_rows(vectors):
+    """Нормирует строки матрицы, чтобы скалярное произведение было косинусным сходством"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+class ArticleVectors:
+    """
+    Неизменяемый снимок эмбеддингов статей для поиска ближайших статей полным перебором.
+    Эмбеддинги лежат строками в общем буфере, который растет только дописыванием: новый снимок
+    дописывает строки за концом старого (обновленная статья получает новую строку, старая помечается
+    удаленной), поэтому уже выданные снимки не меняются, а обновление не копирует всю матрицу.
+    Буфер пересоздается, только когда кончается место или удаленных строк становится больше живых.
+    Дописывать можно только в последний снимок - вызовы with_updates должны быть последовательными
+    """
+
+    def __init__(self, vectors=None, row_ids=None, rows=None, alive=None, size=0):
+        # Общие буферы (емкость, dim) и (емкость,); строки [0, size) принадлежат этому снимку
+        self._vectors = vectors
+        self._row_ids = row_ids
+        # article_id -> номер строки
+        self.rows = rows if rows is not None else {}
+        # Какие строки из [0, size) относятся к текущим версиям статей
+        self._alive = alive if alive is not None else np.zeros(0, dtype=bool)
+        self.size = size
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, article_id):
+        return article_id in self.rows
+
+    @property
+    def dim(self):
+        return self._vectors.shape[1] if self._vectors is not None else None
+
+    def get(self, article_id):
+        """Эмбеддинг статьи или None"""
+        row = self.rows.get(article_id)
+        return self._vectors[row] if row is not None else None
+
+    def with_updates(self, embeddings):
+        """
+        Новый снимок с добавленными или замененными эмбеддингами
+        :param embeddings: {article_id: вектор}
+        :return: ArticleVectors
+        """
+        if not embeddings:
+            return self
+        ids = list(embeddings)
+        new_vectors = normalize_rows(np.stack([embeddings[article_id] for article_id in ids]))
+        if self.dim is not None and new_vectors.shape[1] != self.dim:
+            raise ValueError(f"Размерность эмбеддингов изменилась: {new_vectors.shape[1]} вместо {self.dim}")
+
+        rows = dict(self.rows)
+        alive = self._alive
+        vectors, row_ids, size = self._vectors, self._row_ids, self.size
+        live_after = len(set(rows) | set(ids))
+        capacity = len(vectors) if vectors is not None else 0
+        if size + len(ids) > capacity or size - len(rows) > max(len(rows), MIN_CAPACITY):
+            # Новый буфер: переносим только живые строки, остальное - запас под дописывание
+            keep = [article_id for article_id in rows if article_id not in embeddings]
+            keep_rows = np.fromiter((rows[article_id] for article_id in keep), dtype=np.int64, count=len(keep))
+            capacity = max(MIN_CAPACITY, 2 * live_after)
+            vectors = np.empty((capacity, new_vectors.shape[1]), dtype=np.float32)
+            row_ids = np.empty(capacity, dtype=np.int64)
+            vectors[:len(keep)] = self._vectors[keep_rows] if len(keep) else 0
+            row_ids[:len(keep)] = self._row_ids[keep_rows] if len(keep) else 0
+            rows = {article_id: row for row, article_id in enumerate(keep)}
+            alive = np.ones(len(keep), dtype=bool)
+            size = len(keep)
+
+        # Старые строки обновленных статей больше не участвуют в поиске
+        alive = np.concatenate([alive, np.ones(len(ids), dtype=bool)])
+        for row, article_id in enumerate(ids, start=size):
+            old_row = rows.get(article_id)
+            if old_row is not None:
+                alive[old_row] = False
+            rows[article_id] = row
+        vectors[size:size + len(ids)] = new_vectors
+        row_ids[size:size + len(ids)] = ids
+        return ArticleVectors(vectors, row_ids, rows, alive, size + len(ids))
+
+    def top_k(self, queries, k):
+        """
+        Ближайшие статьи для каждого запроса по косинусному сходству
+        :param queries: Матрица (n_queries, dim)
+        :param k: Сколько статей вернуть на запрос
+        :return: Для каждого запроса список (article_id, сходство) по убыванию сходства
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        k = min(k, len(self.rows))
+        if k == 0:
+            return [[] for _ in queries]
+        scores = self._vectors[:self.size] @ queries.T
+        scores[~self._alive] = -np.inf
+        # argpartition находит k лучших за линейное время, сортируются только они
+        candidates = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for j in range(len(queries)):
+            rows = candidates[:, j]
+            rows = rows[np.argsort(-scores[rows, j], kind='stable')]
+            results.append([(int(self._row_ids[row]), float(scores[row, j])) for row in rows])
+        return results
+
+    def similarities(self, article_id, queries):
+        """Косинусное сходство статьи с каждым запросом или None, если эмбеддинга статьи нет"""
+        vector = self.get(article_id)
+        if vector is None:
+            return None
+        return normalize_rows(np.atleast_2d(queries)) @ vector
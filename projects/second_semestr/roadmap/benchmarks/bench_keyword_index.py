@@ -0,0 +1,87 @@
+"""
+Бенчмарк сопоставления тем роадмапа со статьями.
+
+Сравнивает прежний полный перебор (для каждой темы - все статьи и все их
+ключевые слова) с поиском по инвертированному индексу KeywordMatcher на
+синтетических корпусах. Темы берутся из frontend/index.html, сеть не нужна.
+
+Запуск из каталога roadmap: python benchmarks/bench_keyword_index.py
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from keyword_matcher_new import KeywordMatcher  # noqa: E402
+
+KEYWORDS_PER_ARTICLE = 10
+
+
+def scan_best_article(article_keywords, topic_keywords):
+    """Прежний алгоритм find_article_by_keywords: перебор всех статей"""
+    article_scores = {}
+    for article_id, keywords in article_keywords.items():
+        article_kw = [item['keyword'].lower() for item in keywords]
+        matching_keywords = set(article_kw).intersection(set(topic_keywords))
+        if matching_keywords:
+            article_scores[article_id] = len(matching_keywords)
+    if article_scores:
+        return max(article_scores, key=article_scores.get)
+    return None
+
+
+def make_corpus(matcher, n_articles, vocabulary_size, rng):
+    topic_words = sorted({kw for keywords in matcher.roadmap_keywords.values() for kw in keywords})
+    vocabulary = topic_words + [f"слово{i}" for i in range(vocabulary_size)]
+    # Частоты по закону Ципфа, как у слов в реальных текстах
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    rng.shuffle(weights)
+    for article_id in range(1, n_articles + 1):
+        words = set(rng.choices(vocabulary, weights=weights, k=KEYWORDS_PER_ARTICLE))
+        keywords = [{'keyword': word, 'score': rng.randint(0, 100)} for word in words]
+        yield article_id, keywords
+
+
+def run(n_articles, vocabulary_size, seed):
+    matcher = KeywordMatcher()
+    matcher.extract_topics_from_html()
+    corpus = list(make_corpus(matcher, n_articles, vocabulary_size, random.Random(seed)))
+
+    start = time.perf_counter()
+    matcher.add_articles([(article_id, f"Статья {article_id}", "", keywords) for article_id, keywords in corpus])
+    build = time.perf_counter() - start
+
+    # Совпадение результатов проверяет tests/test_keyword_index.py, здесь только время
+    start = time.perf_counter()
+    for kw in matcher.roadmap_keywords.values():
+        scan_best_article(matcher.article_keywords, kw)
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for kw in matcher.roadmap_keywords.values():
+        matcher._best_match(kw)
+    indexed = time.perf_counter() - start
+
+    print(f"статей={n_articles:>6} индекс строится {build * 1000:8.1f} мс | "
+          f"все темы: перебор {scan * 1000:9.1f} мс, индекс {indexed * 1000:7.2f} мс "
+          f"(x{scan / indexed:.0f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--vocabulary", type=int, default=20_000, help="слов в словаре помимо слов тем")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger("keyword_matcher_new").setLevel(logging.WARNING)
+    for size in args.sizes:
+        run(size, args.vocabulary, args.seed)
+
+
+if __name__ == "__main__":
+    main()
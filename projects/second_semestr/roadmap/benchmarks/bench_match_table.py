@@ -0,0 +1,100 @@
+"""
+Бенчмарк таблицы сопоставлений тем со статьями.
+
+Сравнивает полный пересчет лучших статей для всех тем (так раньше работал
+каждый запрос /api/match-article без article_id) с инкрементальным
+обновлением таблицы после изменения части статей и с чтением готовой таблицы.
+Эмбеддинги тем и статей случайные, сеть не нужна.
+
+Запуск из каталога roadmap: python benchmarks/bench_match_table.py
+"""
+import argparse
+import gc
+import logging
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_keyword_index import make_corpus  # noqa: E402
+from keyword_matcher_new import KeywordMatcher  # noqa: E402
+from semantic_index import normalize_rows  # noqa: E402
+
+
+def best_of(matcher, table, repeats=5):
+    """Лучшее время refresh_match_table, начиная каждый раз с таблицы table (None - полный пересчет)"""
+    timings = []
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            matcher._match_table = table
+            start = time.perf_counter()
+            matcher.refresh_match_table()
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(timings)
+
+
+def run(n_articles, changes, vocabulary_size, dim, seed):
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    matcher = KeywordMatcher()
+    matcher.extract_topics_from_html()
+    # Эмбеддинги тем не запрашиваем у text_analyzer, а генерируем
+    matcher._topics = matcher._topics._replace(
+        embeddings=normalize_rows(np_rng.standard_normal((len(matcher.roadmap_topics), dim)))
+    )
+    matcher._topic_embeddings = lambda: matcher._topics
+    corpus = list(make_corpus(matcher, n_articles, vocabulary_size, rng))
+    vectors = np_rng.standard_normal((n_articles, dim), dtype=np.float32)
+    matcher.add_articles(
+        [(article_id, f"Статья {article_id}", "", keywords) for article_id, keywords in corpus],
+        embeddings={article_id: vectors[i] for i, (article_id, _) in enumerate(corpus)}
+    )
+
+    full = best_of(matcher, None)
+    base = matcher.match_table
+
+    changed = rng.sample(corpus, changes)
+    new_ids = range(n_articles + 1, n_articles + 1 + changes)
+    updated = list(make_corpus(matcher, changes, vocabulary_size, rng))
+    items = [(article_id, "Переанализ", "", keywords) for (article_id, _), (_, keywords) in zip(changed, updated)]
+    items += [(article_id, "Новая", "", keywords) for article_id, (_, keywords) in zip(new_ids, updated)]
+    matcher.add_articles(items, embeddings={item[0]: np_rng.standard_normal(dim) for item in items})
+    incremental = best_of(matcher, base)
+    table = matcher.match_table
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        matcher.match_table.matches['keywords']
+    read = (time.perf_counter() - start) / 1000
+
+    recomputed = table.recomputed
+    print(f"статей={n_articles:>6} полный пересчет {full * 1000:8.2f} мс | "
+          f"после {2 * changes} изменений {incremental * 1000:7.2f} мс "
+          f"(тем: ключевые слова {recomputed['keywords']}, эмбеддинги {recomputed['semantic']}) | "
+          f"чтение таблицы {read * 1e6:.2f} мкс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--changes", type=int, default=50, help="переанализированных и столько же новых статей")
+    parser.add_argument("--vocabulary", type=int, default=20_000, help="слов в словаре помимо слов тем")
+    parser.add_argument("--dim", type=int, default=312, help="размерность эмбеддингов (rubert-tiny2 - 312)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger("keyword_matcher_new").setLevel(logging.WARNING)
+    for n_articles in args.sizes:
+        run(n_articles, args.changes, args.vocabulary, args.dim, args.seed)
+
+
+if __name__ == "__main__":
+    main()
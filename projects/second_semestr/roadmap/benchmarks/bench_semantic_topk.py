@@ -0,0 +1,65 @@
+"""
+Бенчмарк семантического сопоставления тем роадмапа со статьями.
+
+На случайных нормированных эмбеддингах (размерность rubert-tiny2) измеряет
+загрузку эмбеддингов в ArticleVectors, поиск k лучших статей для всех тем
+полным перебором одной матричной операцией и инкрементальное обновление
+части статей (копирование при записи не копирует всю матрицу).
+
+Запуск из каталога roadmap: python benchmarks/bench_semantic_topk.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from semantic_index import ArticleVectors, normalize_rows  # noqa: E402
+
+DIM = 312
+N_TOPICS = 8
+
+
+def run(n_articles, k, updates, seed):
+    rng = np.random.default_rng(seed)
+    vectors = normalize_rows(rng.standard_normal((n_articles, DIM)))
+    topics = normalize_rows(rng.standard_normal((N_TOPICS, DIM)))
+
+    start = time.perf_counter()
+    index = ArticleVectors().with_updates({article_id: vectors[article_id] for article_id in range(n_articles)})
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = index.top_k(topics, k)
+    search = time.perf_counter() - start
+
+    # Проверка по полной сортировке
+    expected = np.argsort(-(vectors @ topics.T), axis=0)[:k].T
+    assert [[article_id for article_id, _ in result] for result in found] == expected.tolist()
+
+    changed = {int(article_id): rng.standard_normal(DIM) for article_id in rng.choice(n_articles, updates, replace=False)}
+    start = time.perf_counter()
+    index = index.with_updates(changed)
+    update = time.perf_counter() - start
+
+    print(f"статей={n_articles:>6} загрузка {build * 1000:8.1f} мс | top-{k} для {N_TOPICS} тем {search * 1000:6.2f} мс | "
+          f"обновление {updates} статей {update * 1000:6.2f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=100, help="статей в инкрементальном обновлении")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for n_articles in args.sizes:
+        run(n_articles, args.k, args.updates, args.seed)
+
+
+if __name__ == "__main__":
+    main()
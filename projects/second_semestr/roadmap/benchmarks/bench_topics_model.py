@@ -0,0 +1,75 @@
+"""
+Бенчмарк получения модели тем роадмапа.
+
+Сравнивает прежний разбор frontend/index.template.html через BeautifulSoup (html.parser)
+при каждом вызове с разбором через lxml, загрузкой снимка и повторным вызовом
+extract_topics_from_html, который при неизменном файле отдает кэш.
+Для сравнения нужен beautifulsoup4 (в зависимости сервиса больше не входит).
+
+Запуск из каталога roadmap: python benchmarks/bench_topics_model.py
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import keyword_matcher_new  # noqa: E402
+from keyword_matcher_new import KeywordMatcher, ROADMAP_TEMPLATE_PATH  # noqa: E402
+
+
+def parse_with_bs4(html_content):
+    """Прежний разбор extract_topics_from_html"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    topics = {}
+    for stage in soup.find_all('div', class_='stage'):
+        ul_element = stage.find('ul')
+        topics[stage.get('id', '')] = {
+            'title': stage.find('h3').text.strip() if stage.find('h3') else '',
+            'subtopics': [li.text.strip() for li in ul_element.find_all('li', recursive=False)] if ul_element else []
+        }
+    return topics
+
+
+def measure(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.getLogger("keyword_matcher_new").setLevel(logging.WARNING)
+    with open(ROADMAP_TEMPLATE_PATH, 'r', encoding='utf-8') as file:
+        html_content = file.read()
+
+    matcher = KeywordMatcher()
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, 'topics_snapshot.json')
+        keyword_matcher_new.TOPICS_SNAPSHOT_PATH = snapshot_path
+        matcher._set_topics(*matcher._parse_topics(html_content), None)
+        assert parse_with_bs4(html_content) == matcher.roadmap_topics, "lxml и BeautifulSoup разобрали темы по-разному"
+
+        results = [
+            ("BeautifulSoup html.parser", measure(lambda: parse_with_bs4(html_content), args.repeat)),
+            ("lxml", measure(lambda: matcher._parse_topics(html_content), args.repeat)),
+        ]
+        matcher.extract_topics_from_html()
+        matcher.save_topics_snapshot(snapshot_path)
+        results.append(("загрузка снимка", measure(lambda: KeywordMatcher().load_topics_snapshot(snapshot_path), args.repeat)))
+        results.append(("кэш (повторный вызов)", measure(matcher.extract_topics_from_html, args.repeat)))
+
+    for name, ms in results:
+        print(f"{name:<28} {ms:8.3f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Фикстуры набора бенчмарков (pytest-benchmark): KeywordMatcher с 1k, 10k и 100k статей,
+полученных через синхронизацию с локальной заменой text_analyzer. Сеть не нужна.
+"""
+import base64
+import logging
+import os
+import random
+import shutil
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import keyword_matcher_new  # noqa: E402
+from bench_keyword_index import make_corpus  # noqa: E402
+from keyword_matcher_new import KeywordMatcher  # noqa: E402
+from semantic_index import normalize_rows  # noqa: E402
+
+# Размеры корпуса статей
+SCALES = (1_000, 10_000, 100_000)
+DIM = 312  # размерность эмбеддингов rubert-tiny2
+VOCABULARY = 20_000
+
+
+def text_vector(text):
+    """Детерминированный нормированный эмбеддинг текста вместо модели"""
+    vector = np.random.default_rng(zlib.crc32(text.encode('utf-8'))).standard_normal(DIM)
+    return vector / np.linalg.norm(vector)
+
+
+def topic_texts(matcher):
+    """Тексты тем в том же виде, в каком KeywordMatcher отправляет их в /embed"""
+    return [f"{topic['title']}. {', '.join(topic['subtopics'])}" for topic in matcher.roadmap_topics.values()]
+
+
+def make_embeddings(topic_vectors, n_articles, rng):
+    """
+    Эмбеддинги статей: каждая статья ближе к одной из тем с разной силой, поэтому сходство с темами
+    распределено от шума до почти совпадения и часть статей проходит порог SEMANTIC_MIN_SIMILARITY
+    """
+    noise = rng.standard_normal((n_articles, DIM)) / np.sqrt(DIM)
+    topics = topic_vectors[rng.integers(0, len(topic_vectors), n_articles)]
+    return normalize_rows((topics * rng.uniform(0, 1.5, (n_articles, 1)) + noise).astype(np.float32))
+
+
+class StandInResponse:
+    def __init__(self, data):
+        self.status_code = 200
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class TextAnalyzerStandIn:
+    """
+    Локальная замена text_analyzer с тем же API, что использует KeywordMatcher:
+    /articles постранично (с updated_after - только статьи, измененные позже, то есть ни одной),
+    /mock-article и /embed с детерминированными эмбеддингами
+    """
+
+    def __init__(self, corpus, embeddings):
+        self.pages = []
+        for i in range(0, len(corpus), keyword_matcher_new.SYNC_PAGE_SIZE):
+            self.pages.append([
+                {
+                    'id': article_id,
+                    'title': f"Статья {article_id}",
+                    'keywords': keywords,
+                    'embedding': base64.b64encode(embeddings[article_id - 1].tobytes()).decode('ascii'),
+                }
+                for article_id, keywords in corpus[i:i + keyword_matcher_new.SYNC_PAGE_SIZE]
+            ])
+
+    def get(self, path, params=None):
+        if params.get('updated_after'):
+            return StandInResponse({'articles': [], 'next_after_id': None, 'synced_at': '2024-01-01T00:00:00'})
+        page = int(params.get('after_id', 0)) // keyword_matcher_new.SYNC_PAGE_SIZE
+        articles = self.pages[page] if page < len(self.pages) else []
+        next_after_id = articles[-1]['id'] if page + 1 < len(self.pages) else None
+        return StandInResponse({'articles': articles, 'next_after_id': next_after_id, 'synced_at': '2024-01-01T00:00:00'})
+
+    def post(self, path, json=None, **kwargs):
+        if path == '/embed':
+            return StandInResponse({'embeddings': [text_vector(text).tolist() for text in json['texts']]})
+        return StandInResponse({'article_id': 1, 'title': "Мок", 'content': "", 'keywords': []})
+
+
+@pytest.fixture(scope="module", params=SCALES, ids=lambda n: f"{n // 1000}k")
+def matcher(request, tmp_path_factory):
+    """KeywordMatcher с request.param статьями (10 ключевых слов и эмбеддинг у каждой) и копией шаблона роадмапа"""
+    n_articles = request.param
+    # Логи каждого вызова исказили бы время
+    logging.getLogger("keyword_matcher_new").setLevel(logging.WARNING)
+    frontend = tmp_path_factory.mktemp("frontend")
+    template_path = frontend / 'index.template.html'
+    shutil.copy(keyword_matcher_new.ROADMAP_TEMPLATE_PATH, template_path)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(keyword_matcher_new, 'ROADMAP_TEMPLATE_PATH', str(template_path))
+        monkeypatch.setattr(keyword_matcher_new, 'ROADMAP_HTML_PATH', str(frontend / 'index.html'))
+        monkeypatch.setattr(keyword_matcher_new, 'TOPICS_SNAPSHOT_PATH', '')
+
+        matcher = KeywordMatcher()
+        matcher.extract_topics_from_html()
+        corpus = list(make_corpus(matcher, n_articles, VOCABULARY, random.Random(n_articles)))
+        topic_vectors = np.stack([text_vector(text) for text in topic_texts(matcher)])
+        embeddings = make_embeddings(topic_vectors, n_articles, np.random.default_rng(n_articles))
+        matcher.http = TextAnalyzerStandIn(corpus, embeddings)
+        matcher.sync_articles()
+        assert len(matcher.articles) == n_articles
+        yield matcher
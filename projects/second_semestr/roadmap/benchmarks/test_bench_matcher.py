@@ -0,0 +1,45 @@
+"""
+Бенчмарки сопоставления статей с темами и сборки роадмапа на 1k, 10k и 100k статей.
+"""
+import itertools
+import os
+
+import pytest
+
+import keyword_matcher_new
+from keyword_matcher_new import MATCH_MODES
+
+
+@pytest.mark.parametrize("mode", MATCH_MODES)
+def test_match_all_topics(benchmark, matcher, mode):
+    """Лучшая статья для каждой темы, как /api/match-article без article_id: мок-статья, синхронизация без изменений, поиск"""
+    matches = benchmark(matcher.match_article_to_topics, None, mode)
+    assert matches
+
+
+@pytest.mark.parametrize("mode", MATCH_MODES)
+def test_match_article(benchmark, matcher, mode):
+    """Темы одной статьи, как /api/match-article с article_id"""
+    ids = itertools.cycle(range(1, len(matcher.articles), max(1, len(matcher.articles) // 100)))
+    benchmark(lambda: matcher.match_article_to_topics(next(ids), mode))
+
+
+def test_update_html(benchmark, matcher):
+    """Сборка index.html из шаблона и ссылок на лучшие статьи всех тем с записью файла"""
+    matches = matcher.match_article_to_topics(None, 'keywords')
+
+    def reset():
+        # Каждый раунд собирает и записывает файл заново, а не пропускает неизменный результат
+        matcher.rendered_links = None
+        matcher._rendered_hash = None
+        if os.path.exists(keyword_matcher_new.ROADMAP_HTML_PATH):
+            os.remove(keyword_matcher_new.ROADMAP_HTML_PATH)
+
+    assert benchmark.pedantic(matcher.update_html_with_article_links, args=(matches,), setup=reset, rounds=20)
+
+
+def test_update_html_unchanged(benchmark, matcher):
+    """Повторное обновление теми же сопоставлениями: сборка без записи файла"""
+    matches = matcher.match_article_to_topics(None, 'keywords')
+    matcher.update_html_with_article_links(matches)
+    assert benchmark(matcher.update_html_with_article_links, matches)
@@ -0,0 +1,40 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_PATH)
+
+import keyword_matcher_new  # noqa: E402
+from keyword_matcher_new import KeywordMatcher  # noqa: E402
+
+
+class FakeResponse:
+    """Ответ requests с готовым JSON для заглушек text_analyzer в тестах"""
+
+    def __init__(self, data, status_code=200):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+@pytest.fixture(scope="function")
+def frontend(tmp_path, monkeypatch):
+    """Копия шаблона роадмапа во временном каталоге, чтобы тесты не трогали frontend/"""
+    template_path = tmp_path / 'index.template.html'
+    shutil.copy(keyword_matcher_new.ROADMAP_TEMPLATE_PATH, template_path)
+    monkeypatch.setattr(keyword_matcher_new, 'ROADMAP_TEMPLATE_PATH', str(template_path))
+    monkeypatch.setattr(keyword_matcher_new, 'ROADMAP_HTML_PATH', str(tmp_path / 'index.html'))
+    monkeypatch.setattr(keyword_matcher_new, 'TOPICS_SNAPSHOT_PATH', '')
+    return tmp_path
+
+
+@pytest.fixture(scope="function")
+def matcher(frontend):
+    matcher = KeywordMatcher()
+    matcher.extract_topics_from_html()
+    return matcher
@@ -0,0 +1,188 @@
+import os
+import sys
+import threading
+
+from lxml import html as lxml_html
+
+from conftest import FakeResponse
+from keyword_matcher_new import KeywordMatcher
+
+N_ARTICLES = 50
+ITERATIONS = 200
+
+
+class FakeTextAnalyzer:
+    """
+    Вместо text_analyzer: каждая синхронизация отдает все статьи нового поколения.
+    У всех статей поколения g ключевые слова gen<g>, поэтому в согласованном снимке
+    все статьи и индекс относятся к одному поколению
+    """
+
+    def __init__(self, topic_words):
+        self.topic_words = topic_words
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, params=None):
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+        articles = [
+            {
+                'id': article_id,
+                'title': f"Статья {article_id} поколения {generation}",
+                'keywords': [
+                    {'keyword': f"gen{generation}", 'score': 1},
+                    {'keyword': self.topic_words[(article_id + generation) % len(self.topic_words)], 'score': 2},
+                ],
+            }
+            for article_id in range(1, N_ARTICLES + 1)
+        ]
+        return FakeResponse({'articles': articles, 'next_after_id': None, 'synced_at': None})
+
+    def post(self, path, **kwargs):
+        return FakeResponse({'article_id': 1, 'title': "Мок", 'content': "", 'keywords': []})
+
+
+def assert_consistent(state):
+    """Снимок статей не смешивает поколения, а индекс соответствует ключевым словам статей"""
+    generations = {item['keyword'] for keywords in state.article_keywords.values()
+                   for item in keywords if item['keyword'].startswith('gen')}
+    assert len(generations) <= 1
+    assert state.articles.keys() == state.article_keywords.keys()
+    for keyword, postings in state.keyword_index.items():
+        for article_id in postings:
+            assert keyword in {item['keyword'].lower() for item in state.article_keywords[article_id]}
+    for article_id, keywords in state.article_keywords.items():
+        for item in keywords:
+            assert article_id in state.keyword_index[item['keyword'].lower()]
+
+
+def run_threads(targets):
+    errors = []
+
+    def guard(target):
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=guard, args=(target,)) for target in targets]
+    interval = sys.getswitchinterval()
+    # Частое переключение потоков, чтобы гонки проявлялись
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    if errors:
+        raise errors[0]
+
+
+def test_readers_see_consistent_snapshots_during_sync(matcher):
+    topic_words = sorted(matcher.stage_index)
+    matcher.http = FakeTextAnalyzer(topic_words)
+    matcher.sync_articles()
+
+    def writer():
+        for _ in range(ITERATIONS // 10):
+            matcher.sync_articles()
+
+    def reader():
+        for i in range(ITERATIONS):
+            assert_consistent(matcher._state)
+            article_id = i % N_ARTICLES + 1
+            assert matcher.match_article_to_topics(article_id)
+            for keywords in matcher.roadmap_keywords.values():
+                matcher._best_match(keywords)
+
+    run_threads([writer, writer] + [reader] * 4)
+    assert_consistent(matcher._state)
+    assert len(matcher.articles) == N_ARTICLES
+
+
+def test_topic_model_is_never_half_built(matcher, frontend):
+    template_path = frontend / 'index.template.html'
+    n_topics = len(matcher.roadmap_topics)
+    original = template_path.read_text(encoding='utf-8')
+    extended = original.replace(
+        '</body>', '<div class="stage" id="stage_extra"><h3>Сопрограммы</h3><ul><li>Корутины</li></ul></div></body>'
+    )
+    models = []
+
+    def editor():
+        for i in range(ITERATIONS // 4):
+            tmp_path = frontend / 'index.template.tmp'
+            tmp_path.write_text(extended if i % 2 == 0 else original, encoding='utf-8')
+            os.replace(tmp_path, template_path)
+
+    def reader():
+        for _ in range(ITERATIONS):
+            matcher.extract_topics_from_html()
+            model = matcher._topics
+            assert model.topics.keys() == model.keywords.keys()
+            for keyword, stage_ids in model.stage_index.items():
+                assert all(keyword in model.keywords[stage_id] for stage_id in stage_ids)
+            models.append(len(model.topics))
+
+    run_threads([editor] + [reader] * 4)
+    assert set(models) <= {n_topics, n_topics + 1}
+
+
+def test_concurrent_roadmap_updates_write_each_link_once(matcher, frontend):
+    template = (frontend / 'index.template.html').read_bytes()
+    stages = list(matcher.roadmap_topics)
+    matcher.add_articles([(article_id, f"Статья {article_id}", "", []) for article_id in range(1, 5)])
+
+    def updater(article_id):
+        def run():
+            for stage_id in stages:
+                assert matcher.update_html_with_article_links({stage_id: {'article_id': article_id, 'score': 1}})
+        return run
+
+    run_threads([updater(article_id) for article_id in range(1, 5)] * 2)
+
+    html = (frontend / 'index.html').read_text(encoding='utf-8')
+    assert html.count('class="article-link"') == len(stages) * 4
+    assert (frontend / 'index.template.html').read_bytes() == template
+    assert not [name for name in os.listdir(frontend) if name.startswith('.index.')]
+
+
+def test_separate_matchers_share_rendered_links(frontend):
+    """Несколько воркеров WSGI: каждый процесс со своим матчером дописывает ссылки других"""
+    workers = 2
+    matchers = [KeywordMatcher() for _ in range(workers)]
+    for i, matcher in enumerate(matchers):
+        matcher.extract_topics_from_html()
+        matcher.add_article(i + 1, f"Статья {i + 1}", "", [])
+    stage_id = next(iter(matchers[0].roadmap_topics))
+
+    for i, matcher in enumerate(matchers):
+        matcher.update_html_with_article_links({stage_id: {'article_id': i + 1, 'score': 1}})
+
+    html = (frontend / 'index.html').read_text(encoding='utf-8')
+    assert html.count('class="article-link"') == workers
+
+
+def test_roadmap_drops_stale_links(matcher, frontend):
+    first, second = list(matcher.roadmap_topics)[:2]
+    matcher.add_articles([(article_id, f"Статья {article_id}", "", []) for article_id in range(1, 4)])
+    matcher.update_html_with_article_links({first: {'article_id': 1, 'score': 1}, second: {'article_id': 2, 'score': 1}})
+
+    def links():
+        html = lxml_html.fromstring((frontend / 'index.html').read_bytes())
+        return {
+            (link.xpath('ancestor::div[@class="stage"]')[0].get('id'), link.get('data-article-id'))
+            for link in html.find_class('article-link')
+        }
+
+    # Статья сопоставлена заново: ее ссылка в прежней теме исчезает, ссылки других статей остаются
+    matcher.update_html_with_article_links({second: {'article_id': 1, 'score': 2}}, article_id=1)
+    assert links() == {(second, '1'), (second, '2')}
+
+    # Таблица сопоставлений заменяет все ссылки
+    matcher.update_html_with_article_links({first: {'article_id': 3, 'score': 1}}, replace=True)
+    assert links() == {(first, '3')}
@@ -0,0 +1,123 @@
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from http_client import CircuitBreaker, CircuitOpenError, ResilientSession
+
+
+class FlakyAdapter(BaseAdapter):
+    """Отвечает заданной последовательностью статусов; None - сетевая ошибка, исключение - оно само"""
+
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if outcome is None:
+            raise requests.ConnectionError("connection refused")
+        if isinstance(outcome, BaseException):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def make_session(outcomes, **kwargs):
+    kwargs.setdefault('backoff_base', 0)
+    session = ResilientSession("http://text-analyzer", **kwargs)
+    adapter = FlakyAdapter(outcomes)
+    session.session.mount('http://', adapter)
+    return session, adapter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("http_client.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_retries_transient_errors_and_gives_up():
+    session, adapter = make_session([None, 503, 200], retries=2)
+    assert session.get("/articles").status_code == 200
+    assert adapter.calls == 3
+
+    session, adapter = make_session([503, 503, 503], retries=2)
+    assert session.get("/articles").status_code == 503
+    assert adapter.calls == 3
+
+    session, adapter = make_session([None, None], retries=1)
+    with pytest.raises(requests.ConnectionError):
+        session.get("/articles")
+    assert adapter.calls == 2
+
+
+def test_client_errors_are_not_retried_and_close_breaker():
+    session, adapter = make_session([404], retries=2, breaker=CircuitBreaker(failure_threshold=1))
+
+    assert session.get("/articles").status_code == 404
+    assert adapter.calls == 1
+    assert session.breaker.state == 'closed'
+
+
+def test_non_retryable_errors_count_as_failures():
+    session, adapter = make_session([requests.TooManyRedirects("loop")], retries=2,
+                                    breaker=CircuitBreaker(failure_threshold=1))
+
+    with pytest.raises(requests.TooManyRedirects):
+        session.get("/articles")
+    assert adapter.calls == 1
+    assert session.breaker.state == 'open'
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    session, adapter = make_session([503, 503, None, 200], retries=0,
+                                    breaker=CircuitBreaker(failure_threshold=2, reset_timeout=10))
+
+    session.get("/a")
+    session.get("/a")
+    assert session.breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        session.get("/a")
+    assert adapter.calls == 2
+
+    # Пробный запрос не удался: автомат снова разомкнут
+    clock[0] = 11
+    assert session.breaker.state == 'half-open'
+    with pytest.raises(requests.ConnectionError):
+        session.get("/a")
+    assert session.breaker.state == 'open'
+
+    clock[0] = 22
+    assert session.get("/a").status_code == 200
+    assert session.breaker.state == 'closed'
+
+
+def test_retries_stop_when_breaker_opens():
+    session, adapter = make_session([503, 503, 503], retries=5, breaker=CircuitBreaker(failure_threshold=2))
+
+    with pytest.raises(CircuitOpenError):
+        session.get("/a")
+    assert adapter.calls == 2
+
+
+def test_interrupted_probe_does_not_count_as_failure(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    session, adapter = make_session([KeyboardInterrupt()], retries=0, breaker=breaker)
+    breaker.record_failure()
+    clock[0] = 11
+
+    with pytest.raises(KeyboardInterrupt):
+        session.get("/a")
+
+    # Прерванная проба не размыкает автомат заново, следующий запрос снова может стать пробой
+    assert breaker.state == 'half-open'
+    assert session.get("/a").status_code == 200
+    assert breaker.state == 'closed'
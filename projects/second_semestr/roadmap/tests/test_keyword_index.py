@@ -0,0 +1,63 @@
+import random
+
+
+def scan_best_article(article_keywords, topic_keywords):
+    """Прежний полный перебор всех статей, с которым должен совпадать поиск по индексу"""
+    article_scores = {}
+    for article_id, keywords in article_keywords.items():
+        article_kw = [item['keyword'].lower() for item in keywords]
+        matching_keywords = set(article_kw).intersection(set(topic_keywords))
+        if matching_keywords:
+            article_scores[article_id] = len(matching_keywords)
+    if article_scores:
+        return max(article_scores, key=article_scores.get)
+    return None
+
+
+def keywords(*words):
+    return [{'keyword': word, 'score': 50} for word in words]
+
+
+def first_stage(matcher):
+    return next(iter(matcher.roadmap_keywords.items()))
+
+
+def test_readding_article_replaces_its_index_entries(matcher):
+    _, topic_keywords = first_stage(matcher)
+    matcher.add_article(1, "Статья", "", keywords(topic_keywords[0].upper(), "слово"))
+    assert matcher._best_match(topic_keywords) == (1, [topic_keywords[0]])
+
+    matcher.add_article(1, "Статья", "", keywords("слово"))
+
+    assert matcher._best_match(topic_keywords) == (None, [])
+    assert topic_keywords[0] not in matcher.keyword_index
+    assert matcher.keyword_index["слово"] == {1: 50}
+
+
+def test_ties_go_to_article_loaded_first(matcher):
+    _, topic_keywords = first_stage(matcher)
+    matcher.add_article(2, "Вторая", "", keywords(topic_keywords[0]))
+    matcher.add_article(1, "Первая", "", keywords(topic_keywords[0]))
+    assert matcher._best_match(topic_keywords)[0] == 2
+
+    # Повторный анализ не меняет место статьи в порядке загрузки
+    matcher.add_article(2, "Вторая", "", keywords(topic_keywords[0], "слово"))
+    assert matcher._best_match(topic_keywords)[0] == 2
+
+    # Больше совпадений важнее порядка загрузки
+    if len(topic_keywords) > 1:
+        matcher.add_article(1, "Первая", "", keywords(*topic_keywords[:2]))
+        assert matcher._best_match(topic_keywords)[0] == 1
+
+
+def test_index_matches_full_scan(matcher):
+    rng = random.Random(0)
+    vocabulary = sorted(matcher.stage_index) + [f"слово{i}" for i in range(30)]
+    for step in range(300):
+        # Новые статьи и повторный анализ уже загруженных
+        article_id = rng.randint(1, 120)
+        matcher.add_article(article_id, f"Статья {article_id}", "", keywords(*rng.sample(vocabulary, 6)))
+        if step % 50 == 49:
+            for topic_keywords in matcher.roadmap_keywords.values():
+                assert matcher._best_match(topic_keywords)[0] == \
+                    scan_best_article(matcher.article_keywords, topic_keywords)
@@ -0,0 +1,130 @@
+import base64
+import random
+import threading
+
+import numpy as np
+
+from conftest import FakeResponse
+from match_refresher import MatchRefresher
+
+
+class FakeTextAnalyzer:
+    """Хранит статьи и отдает их как /articles (всегда целиком), эмбеддинги - по хэшу слов"""
+
+    DIM = 8
+
+    def __init__(self):
+        self.articles = {}
+        self.available = True
+
+    def embed(self, text):
+        vector = np.zeros(self.DIM, dtype=np.float32)
+        for word in text.lower().split():
+            vector[hash(word.strip('.,')) % self.DIM] += 1
+        return vector
+
+    def put(self, article_id, words):
+        article = {
+            'id': article_id,
+            'title': f"Статья {article_id}",
+            'keywords': [{'keyword': word, 'score': 50} for word in words],
+            'embedding': base64.b64encode(self.embed(' '.join(words)).tobytes()).decode('ascii')
+        }
+        self.articles[article_id] = article
+
+    def get(self, path, params=None):
+        if not self.available:
+            return FakeResponse({}, status_code=503)
+        return FakeResponse({'articles': list(self.articles.values()), 'next_after_id': None, 'synced_at': None})
+
+    def post(self, path, json=None, **kwargs):
+        if path == "/embed":
+            return FakeResponse({'embeddings': [self.embed(text).tolist() for text in json['texts']]})
+        return FakeResponse({}, status_code=404)
+
+
+def full_matches(matcher):
+    state, topics = matcher._state, matcher._topics
+    return {
+        'keywords': matcher._keyword_matches(topics.keywords, state, topics),
+        'semantic': matcher._semantic_matches(topics.topics, state, topics)
+    }
+
+
+def test_incremental_refresh_matches_full_recompute(matcher):
+    fake = FakeTextAnalyzer()
+    matcher.http = fake
+    rng = random.Random(0)
+    vocabulary = sorted(matcher.stage_index) + [f"слово{i}" for i in range(50)]
+    for article_id in range(1, 40):
+        fake.put(article_id, rng.sample(vocabulary, 5))
+    matcher.sync_articles()
+    table = matcher.refresh_match_table()
+    assert table.recomputed == {'keywords': len(matcher.roadmap_topics), 'semantic': len(matcher.roadmap_topics)}
+
+    for step in range(20):
+        # Новые статьи и переанализ старых
+        for article_id in rng.sample(range(1, 60), 3):
+            fake.put(article_id, rng.sample(vocabulary, 5))
+        matcher.sync_articles()
+        if step % 5 == 4:
+            # Журнал изменений переполнился: изменения находятся сравнением снимков
+            matcher._change_log.clear()
+        table = matcher.refresh_match_table()
+        assert table.matches == full_matches(matcher)
+
+
+def test_refresh_recomputes_only_affected_stages(matcher):
+    fake = FakeTextAnalyzer()
+    matcher.http = fake
+    stage_id, keywords = next(iter(matcher.roadmap_keywords.items()))
+    fake.put(1, [keywords[0]])
+    matcher.sync_articles()
+    matcher.refresh_match_table()
+
+    matcher.sync_articles()
+    unchanged = matcher.refresh_match_table()
+    fake.put(2, [keywords[0], "слово"])
+    matcher.sync_articles()
+    changed = matcher.refresh_match_table()
+
+    assert unchanged.recomputed['keywords'] == 0
+    assert stage_id in changed.matches['keywords']
+    assert 1 <= changed.recomputed['keywords'] < len(matcher.roadmap_topics)
+
+
+def test_refresher_reports_staleness(matcher):
+    fake = FakeTextAnalyzer()
+    matcher.http = fake
+    fake.put(1, list(matcher.stage_index)[:3])
+    refresher = MatchRefresher(matcher, stale_after=60)
+
+    assert refresher.status()['stale'] is True
+    table = refresher.get_table()
+    status = refresher.status()
+    assert table.matches['keywords']
+    assert status['stale'] is False and status['refreshed_at'] is not None
+
+    fake.available = False
+    refresher.refresh()
+    assert refresher.status()['stale'] is True
+    assert refresher.status()['last_error'] == "HTTP 503"
+
+
+def test_app_starts_refresher_on_first_request_not_on_import(frontend, monkeypatch):
+    import importlib
+    import sys
+
+    sys.modules.pop('app', None)
+    app = importlib.import_module('app')
+    assert app.refresher._thread is None
+
+    refreshed = threading.Event()
+    monkeypatch.setattr(app.refresher, 'refresh', refreshed.set)
+    try:
+        response = app.app.test_client().get('/api/match-table/status')
+        assert response.status_code == 200
+        assert refreshed.wait(timeout=5)
+    finally:
+        app.refresher.stop()
+        sys.modules.pop('app', None)
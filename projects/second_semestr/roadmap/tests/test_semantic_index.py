@@ -0,0 +1,90 @@
+import base64
+
+import numpy as np
+
+import semantic_index
+from conftest import FakeResponse
+from semantic_index import ArticleVectors, normalize_rows
+
+
+def random_vectors(n, dim=16, seed=0):
+    return normalize_rows(np.random.default_rng(seed).standard_normal((n, dim)))
+
+
+def test_top_k_matches_full_sort():
+    vectors = random_vectors(500)
+    queries = random_vectors(3, seed=1)
+    index = ArticleVectors().with_updates({article_id: vectors[article_id - 1] for article_id in range(1, 501)})
+
+    found = index.top_k(queries, 5)
+
+    for query, result in zip(queries, found):
+        expected = np.argsort(-(vectors @ query))[:5] + 1
+        assert [article_id for article_id, _ in result] == expected.tolist()
+
+
+def test_update_does_not_change_published_snapshot():
+    vectors = random_vectors(3)
+    first = ArticleVectors().with_updates({1: vectors[0], 2: vectors[1]})
+    second = first.with_updates({1: vectors[2], 3: vectors[2]})
+
+    assert np.allclose(first.get(1), vectors[0])
+    assert np.allclose(second.get(1), vectors[2])
+    assert 3 not in first and len(second) == 3
+    # Старая строка статьи 1 в новом снимке не участвует в поиске
+    assert sorted(article_id for article_id, _ in second.top_k(vectors[0], 10)[0]) == [1, 2, 3]
+    assert [article_id for article_id, _ in first.top_k(vectors[0], 10)[0]] == [1, 2]
+
+
+def test_compaction_keeps_live_rows(monkeypatch):
+    monkeypatch.setattr(semantic_index, 'MIN_CAPACITY', 4)
+    vectors = random_vectors(20)
+    index = ArticleVectors()
+    for step in range(10):
+        index = index.with_updates({1: vectors[step], 2: vectors[step + 10]})
+
+    assert len(index) == 2
+    assert index.size <= 2 * 4
+    assert np.allclose(index.get(1), vectors[9])
+    assert index.top_k(vectors[19], 1)[0][0][0] == 2
+
+
+class FakeTextAnalyzer:
+    """Эмбеддинг текста - вектор слова-маркера: тема про сети совпадет со статьей про сети"""
+
+    MARKERS = ['сет', 'поток']
+
+    def embed(self, text):
+        text = text.lower()
+        return np.array([float(marker in text) for marker in self.MARKERS] + [0.1], dtype=np.float32)
+
+    def post(self, path, json=None, **kwargs):
+        assert path == "/embed"
+        return FakeResponse({'embeddings': [self.embed(text).tolist() for text in json['texts']]})
+
+    def get(self, path, params=None):
+        articles = [
+            {'id': 1, 'title': "Сетевое программирование", 'keywords': [{'keyword': "беркли", 'score': 90}]},
+            {'id': 2, 'title': "Многопоточность", 'keywords': [{'keyword': "мьютекс", 'score': 90}]},
+        ]
+        for article in articles:
+            article['embedding'] = base64.b64encode(self.embed(article['title']).tobytes()).decode('ascii')
+        return FakeResponse({'articles': articles, 'next_after_id': None, 'synced_at': None})
+
+
+def test_semantic_mode_matches_without_shared_keywords(matcher):
+    matcher.http = FakeTextAnalyzer()
+    matcher.sync_articles()
+    stage_ids = list(matcher.roadmap_topics)
+    network_stage = next(
+        stage_id for stage_id, topic in matcher.roadmap_topics.items()
+        if 'сет' in topic['title'].lower() and 'поток' not in topic['title'].lower()
+    )
+
+    top = matcher.semantic_top_k(1)
+    matches = matcher.match_article_to_topics(1, mode='semantic')
+
+    assert set(top) == set(stage_ids)
+    assert top[network_stage][0][0] == 1
+    assert network_stage in matches
+    assert matcher.match_article_to_topics(1) == {}
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import keyword_matcher_new
+from conftest import FakeResponse
+
+
+class FakeTextAnalyzer:
+    """
+    /articles как в text_analyzer: страницы по возрастанию ID после after_id, updated_after - только статьи,
+    сохраненные строго позже, synced_at - момент запроса. Время задается тестом
+    """
+
+    def __init__(self):
+        self.now = datetime(2024, 1, 1, 12, 0)
+        self.articles = {}
+        self.requests = []
+        # Номер запроса /articles (с нуля), который ответит 503
+        self.fail_request = None
+
+    def put(self, article_id, words, updated_at=None):
+        self.articles[article_id] = {
+            'id': article_id,
+            'title': f"Статья {article_id}",
+            'content': f"Текст статьи {article_id}",
+            'keywords': [{'keyword': word, 'score': 50} for word in words],
+            'updated_at': updated_at or self.now,
+        }
+
+    def get(self, path, params=None):
+        self.requests.append(dict(params))
+        if len(self.requests) - 1 == self.fail_request:
+            return FakeResponse({}, status_code=503)
+        updated_after = datetime.fromisoformat(params['updated_after']) if 'updated_after' in params else None
+        selected = [
+            article for article_id, article in sorted(self.articles.items())
+            if article_id > params.get('after_id', 0)
+            and (updated_after is None or article['updated_at'] > updated_after)
+        ][:params['limit']]
+        page = []
+        for article in selected:
+            article = {key: value for key, value in article.items() if key != 'updated_at'}
+            if params.get('include_content') == 'false':
+                del article['content']
+            page.append(article)
+        return FakeResponse({
+            'articles': page,
+            'next_after_id': page[-1]['id'] if len(page) == params['limit'] else None,
+            'synced_at': self.now.isoformat(),
+        })
+
+
+@pytest.fixture
+def fake(matcher, monkeypatch):
+    monkeypatch.setattr(keyword_matcher_new, 'SYNC_PAGE_SIZE', 2)
+    fake = FakeTextAnalyzer()
+    matcher.http = fake
+    return fake
+
+
+def test_first_sync_loads_all_pages_without_content(matcher, fake):
+    for article_id in range(1, 6):
+        fake.put(article_id, [f"слово{article_id}"])
+
+    changed = matcher.sync_articles()
+
+    assert [article['id'] for article in changed] == [1, 2, 3, 4, 5]
+    assert [request.get('after_id') for request in fake.requests] == [None, 2, 4]
+    assert all(request['include_content'] == 'false' and 'updated_after' not in request for request in fake.requests)
+    assert matcher.synced_at == fake.now
+    assert matcher.articles[3]['text'] == ''
+
+
+def test_next_sync_requests_changes_since_high_water_mark_with_overlap(matcher, fake):
+    fake.put(1, ["mutex"], updated_at=fake.now - timedelta(hours=1))
+    fake.put(2, ["heap"], updated_at=fake.now - timedelta(hours=1))
+    matcher.sync_articles()
+    first_mark = fake.now
+
+    fake.now += timedelta(minutes=10)
+    fake.put(2, ["atomic"])
+    fake.put(3, ["socket"])
+    version = matcher._state.version
+    changed = matcher.sync_articles()
+
+    assert fake.requests[-1]['updated_after'] == \
+        (first_mark - timedelta(seconds=keyword_matcher_new.SYNC_OVERLAP_SECONDS)).isoformat()
+    assert [article['id'] for article in changed] == [2, 3]
+    assert matcher.synced_at == fake.now
+    # Измененная статья заменяет прежнюю версию в индексе
+    assert 'heap' not in matcher.keyword_index
+    assert matcher.keyword_index['atomic'] == {2: 50}
+    assert matcher._state.version == version + 1
+
+
+def test_article_saved_at_high_water_mark_is_not_lost(matcher, fake):
+    fake.put(1, ["mutex"])
+    matcher.sync_articles()
+
+    # Транзакция зафиксирована после чтения, но с тем же временем, что и отметка синхронизации
+    fake.put(2, ["heap"], updated_at=fake.now)
+    fake.put(3, ["stack"], updated_at=fake.now - timedelta(seconds=1))
+    fake.now += timedelta(seconds=5)
+    version = matcher._state.version
+    changed = matcher.sync_articles()
+
+    # Перекрытие присылает и уже известную статью 1, но она не создает новой версии снимка
+    assert [article['id'] for article in changed] == [1, 2, 3]
+    assert set(matcher.articles) == {1, 2, 3}
+    assert matcher._state.version == version + 1
+
+
+def test_failed_sync_keeps_high_water_mark(matcher, fake):
+    for article_id in range(1, 4):
+        fake.put(article_id, [f"слово{article_id}"])
+    matcher.sync_articles()
+    mark = matcher.synced_at
+
+    fake.now += timedelta(minutes=10)
+    fake.put(4, ["новое"])
+    fake.put(5, ["новое"])
+    fake.put(6, ["новое"])
+    fake.fail_request = len(fake.requests) + 1
+    matcher.sync_articles()
+
+    assert matcher.sync_error == "HTTP 503"
+    assert matcher.synced_at == mark
+    # Следующая синхронизация запрашивает изменения с той же отметки и получает все пропущенные статьи
+    changed = matcher.sync_articles()
+    assert fake.requests[-1]['updated_after'] == fake.requests[-2]['updated_after']
+    assert {article['id'] for article in changed} >= {4, 5, 6}
+    assert matcher.sync_error is None
+
+
+def test_sync_without_content_keeps_known_text(matcher, fake):
+    matcher.add_article(1, "Статья 1", "Полный текст", [{'keyword': 'mutex', 'score': 50}])
+    fake.put(1, ["atomic"])
+
+    matcher.sync_articles()
+
+    assert matcher.articles[1]['text'] == "Полный текст"
+    assert matcher.article_keywords[1] == [{'keyword': 'atomic', 'score': 50}]
@@ -1,15 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from pydantic import BaseModel
+import asyncio
+import base64
+import functools
+from datetime import datetime, timezone
+import json
 import logging
+import time
 import requests
 import httpx
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 
-from internal.database import get_db, init_db, save_article, SessionLocal, get_all_articles
-from internal.keyword_extractor import KeywordExtractor
+from internal.database import (
+    SessionLocal, get_db, init_db, save_article, save_articles, get_articles_page, iter_articles, find_analyses,
+    get_content_hashes, get_article, enqueue_jobs, get_job, count_jobs
+)
+from internal.keyword_extractor import MODEL_BACKENDS, MODEL_NAME, create_keyword_extractor, embedding_text, model_version
+from internal.result_cache import ResultCache, content_hash
+from internal.inference_pool import MODEL_LOAD_MODES, InferencePool, ModelNotReadyError, PoolSaturatedError
 from internal.scrapper_client import ScrapperClient
+from internal.http_client import CircuitOpenError
+from internal.article_consumer import ArticleConsumer, create_kafka_consumer
+from internal.job_worker import JobWorker
+from internal.models import JOB_DONE, JOB_FAILED
+from internal import metrics, tracing
 from config.config import get_settings
 
 logging.basicConfig(level=logging.INFO)
@@ -17,10 +37,46 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Text Analyzer Service")
 settings = get_settings()
-keyword_extractor = KeywordExtractor()
+if settings.MODEL_LOAD not in MODEL_LOAD_MODES:
+    raise ValueError(f"Неизвестный режим загрузки модели: {settings.MODEL_LOAD}")
+if settings.MODEL_BACKEND not in MODEL_BACKENDS:
+    raise ValueError(f"Неизвестный бэкенд инференса: {settings.MODEL_BACKEND}")
+# Инференс выполняется в отдельном пуле, чтобы не блокировать event loop.
+# Процессы не разделяют кэш на диске, поэтому у каждого свой кэш в памяти.
+# Модель загружается при импорте только в режиме MODEL_LOAD=eager, иначе приложение
+# сразу отвечает на /health/live, а загрузку запускает старт приложения или первый запрос
+inference_pool = InferencePool(
+    functools.partial(
+        create_keyword_extractor,
+        cache_size=settings.EMBEDDING_CACHE_SIZE,
+        cache_path=(settings.EMBEDDING_CACHE_PATH or None) if settings.INFERENCE_POOL_KIND == "thread" else None,
+        batching_max_size=settings.ENCODE_BATCH_MAX_SIZE,
+        batching_max_wait_ms=settings.ENCODE_BATCH_MAX_WAIT_MS,
+        model_path=settings.MODEL_PATH or None,
+        backend=settings.MODEL_BACKEND,
+        threads=settings.MODEL_THREADS,
+        onnx_file=settings.MODEL_ONNX_FILE or None
+    ),
+    kind=settings.INFERENCE_POOL_KIND,
+    workers=settings.INFERENCE_WORKERS,
+    max_queue=settings.INFERENCE_MAX_QUEUE,
+    lazy=settings.MODEL_LOAD != "eager",
+    warmup=settings.MODEL_WARMUP,
+    load_timeout=settings.MODEL_LOAD_TIMEOUT
+)
+# Общий пул соединений к scrapper с таймаутами, повторами и автоматическим выключателем
 scrapper_client = ScrapperClient()
-# Инициализируем базу данных напрямую, а не как генератор
-db = SessionLocal()
+# Версия анализа: модель, бэкенд и параметры, от которых зависит результат. Сохраненные результаты
+# другой версии не переиспользуются, поэтому смена любого из них ведет к повторному анализу
+ANALYSIS_VERSION = "|".join([
+    model_version(settings.MODEL_PATH or None, settings.MODEL_BACKEND, settings.MODEL_ONNX_FILE or None),
+    f"window={settings.ANALYSIS_WINDOW_SENTENCES}",
+    f"embedding={int(settings.ANALYSIS_STORE_EMBEDDINGS)}",
+    # Слова кодируются в нормализованной форме (NFC, нижний регистр) независимо от кэша эмбеддингов
+    "words=normalized"
+])
+# Недавние результаты анализа по хэшу содержимого, чтобы не читать их из базы
+result_cache = ResultCache(settings.RESULT_CACHE_SIZE) if settings.RESULT_CACHE_SIZE > 0 else None
 
 # Настройка CORS
 app.add_middleware(
@@ -31,6 +87,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def route_template(request: Request) -> str:
+    """Шаблон пути обработчика (/analyze/{article_id}), чтобы у метрик не было метки на каждый ID"""
+    for route in app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """
+    Собирает этапы запроса в трассу: время запроса и этапов уходит в метрики Prometheus,
+    а при SERVER_TIMING=true - еще и в заголовок Server-Timing ответа
+    """
+    started = time.perf_counter()
+    status = 500
+    with tracing.collect() as trace:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            # Для потоковых ответов это время до начала ответа
+            elapsed = time.perf_counter() - started
+            metrics.REQUEST_LATENCY.labels(request.method, route_template(request), str(status)).observe(elapsed)
+            metrics.observe_trace(trace)
+    if settings.SERVER_TIMING:
+        trace.add("total", elapsed)
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
 class KeywordResponse(BaseModel):
     keyword: str
     score: int
@@ -41,6 +127,17 @@ class ArticleResponse(BaseModel):
     content: str
     keywords: List[KeywordResponse]
 
+class BatchAnalyzeRequest(BaseModel):
+    article_ids: List[int]
+    force: bool = False  # анализировать заново, даже если содержимое уже анализировалось
+
+class JobsRequest(BaseModel):
+    article_ids: List[int]
+    force: bool = False  # анализировать заново, даже если содержимое уже анализировалось
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
 class MockArticleRequest(BaseModel):
     topic: str = "Многопоточное программирование"  # Опциональная тема для генерации статьи по C++, значение по умолчанию
     
@@ -49,64 +146,414 @@ class MockArticleRequest(BaseModel):
         validate_assignment = True
         extra = "ignore"
 
+# Воркер очереди анализа в процессе API (JOB_WORKER_IN_API); создается при старте, когда функции анализа уже определены
+job_worker: Optional[JobWorker] = None
+job_worker_task: Optional[asyncio.Task] = None
+# Чтение событий новых статей из Kafka (KAFKA_CONSUMER)
+article_consumer: Optional[ArticleConsumer] = None
+article_consumer_task: Optional[asyncio.Task] = None
+
+def create_job_worker() -> JobWorker:
+    """Воркер очереди анализа с настройками приложения; используется и отдельным процессом api.worker"""
+    return JobWorker(
+        analyze_articles,
+        SessionLocal,
+        batch_size=min(settings.JOB_BATCH_SIZE, settings.ANALYSIS_BATCH_MAX_ARTICLES),
+        poll_interval=settings.JOB_POLL_INTERVAL,
+        lease_seconds=settings.JOB_LEASE_SECONDS,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        transient_errors=(PoolSaturatedError, ModelNotReadyError)
+    )
+
+def create_article_consumer() -> ArticleConsumer:
+    """Чтение событий статей из Kafka с настройками приложения; используется и отдельным процессом api.worker"""
+    return ArticleConsumer(
+        create_kafka_consumer(settings.KAFKA_BROKERS, settings.KAFKA_TOPIC, settings.KAFKA_GROUP_ID),
+        analyze_articles,
+        SessionLocal,
+        batch_size=min(settings.KAFKA_BATCH_SIZE, settings.ANALYSIS_BATCH_MAX_ARTICLES),
+        batch_timeout_ms=settings.KAFKA_BATCH_TIMEOUT_MS,
+        retry_backoff=settings.KAFKA_RETRY_BACKOFF
+    )
+
 @app.on_event("startup")
 async def startup_event():
+    global job_worker, job_worker_task, article_consumer, article_consumer_task
     logger.info("Инициализация базы данных...")
     init_db()
     logger.info("База данных инициализирована")
+    if settings.MODEL_LOAD == "background":
+        logger.info("Запускаем загрузку модели в фоне...")
+        inference_pool.start_loading()
+    if settings.JOB_WORKER_IN_API:
+        job_worker = create_job_worker()
+        job_worker_task = asyncio.create_task(job_worker.run())
+    if settings.KAFKA_CONSUMER:
+        article_consumer = create_article_consumer()
+        article_consumer_task = asyncio.create_task(article_consumer.run())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if job_worker_task is not None:
+        # Текущий пакет дорабатывается, иначе его задачи вернутся в очередь только по истечении аренды
+        job_worker.stop()
+        await job_worker_task
+    if article_consumer_task is not None:
+        article_consumer.stop()
+        await article_consumer_task
+    await scrapper_client.aclose()
+    inference_pool.shutdown()
+    if inference_pool.extractor is not None:
+        inference_pool.extractor.close()
+    if inference_pool.extractor is not None and inference_pool.extractor.cache is not None:
+        logger.info("Сохраняем кэш эмбеддингов...")
+        inference_pool.extractor.cache.flush()
+
+async def fetch_article(article_id: int) -> Dict[str, Any]:
+    """Получает статью из scrapper через общий пул соединений"""
+    logger.info(f"Запрашиваем статью {article_id} из scrapper: {settings.SCRAPPER_SERVICE_URL}")
+    with tracing.span("scrapper_fetch"):
+        return await scrapper_client.aget_article(article_id)
+
+def pool_saturated(error: PoolSaturatedError) -> HTTPException:
+    """Ответ 429, когда очередь инференса заполнена"""
+    logger.warning(str(error))
+    return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": "1"})
+
+def model_not_ready(error: ModelNotReadyError) -> HTTPException:
+    """Ответ 503, пока модель загружается или если она не загрузилась"""
+    logger.warning(str(error))
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "5"})
+
+def analysis_text(text: str) -> str:
+    """Анализируем статью целиком, ограничивая только очень длинные тексты"""
+    if settings.ANALYSIS_MAX_CHARS > 0:
+        return text[:settings.ANALYSIS_MAX_CHARS]
+    return text
+
+def prepare_analysis(article: Dict[str, Any]) -> None:
+    """Добавляет статье ключ повторного использования результата: хэш содержимого и версию анализа"""
+    article["content_hash"] = content_hash(article["title"], article["content"])
+    article["model_version"] = ANALYSIS_VERSION
+    # Откуда взят готовый результат: "memory", "database" или None - статья анализируется
+    article["cache_hit"] = None
+    # Статья с этим article_id уже сохранена с тем же результатом, записывать нечего
+    article["unchanged"] = False
+
+def lookup_results(db: Session, articles: List[Dict[str, Any]]) -> None:
+    """
+    Подставляет ключевые слова и эмбеддинг статьям, содержимое которых уже анализировалось этой версией:
+    сначала из кэша процесса, затем из базы (результат мог быть сохранен под другим article_id)
+    """
+    missing = []
+    for article in articles:
+        cached = result_cache.get(article["content_hash"], ANALYSIS_VERSION) if result_cache is not None else None
+        if cached is None:
+            missing.append(article)
+            continue
+        article.update(keywords=cached.keywords, embedding=cached.embedding, cache_hit="memory")
+
+    stored = find_analyses(db, [article["content_hash"] for article in missing], ANALYSIS_VERSION)
+    for article in missing:
+        found = stored.get(article["content_hash"])
+        if found is not None:
+            keywords = [{"keyword": kw.keyword, "score": kw.score} for kw in found.keywords]
+            article.update(keywords=keywords, embedding=found.embedding, cache_hit="database")
+
+    # Кэш процесса может не знать о записях других воркеров, поэтому сохраненное состояние сверяется с базой
+    saved_hashes = get_content_hashes(db, [article["article_id"] for article in articles], ANALYSIS_VERSION)
+    for article in articles:
+        article["unchanged"] = article["cache_hit"] is not None and \
+            saved_hashes.get(article["article_id"]) == article["content_hash"]
+
+def remember_results(articles: List[Dict[str, Any]]) -> None:
+    """Кладет результаты анализа в кэш процесса"""
+    if result_cache is None:
+        return
+    for article in articles:
+        result_cache.put(article["content_hash"], ANALYSIS_VERSION, article["keywords"], article.get("embedding"))
+
+async def embed_articles(articles: List[Dict[str, Any]]) -> None:
+    """Добавляет статьям поле embedding (байты float32) по заголовку и ключевым словам"""
+    if not settings.ANALYSIS_STORE_EMBEDDINGS or not articles:
+        return
+    texts = [
+        embedding_text(article["title"], [keyword["keyword"] for keyword in article["keywords"]])
+        for article in articles
+    ]
+    embeddings, _ = await inference_pool.run("embed", texts)
+    for article, embedding in zip(articles, embeddings):
+        article["embedding"] = embedding.astype("float32").tobytes()
+
+async def analyze_articles(db: Session, article_ids: List[int], force: bool = False) -> Dict[str, Any]:
+    """
+    Пакетный анализ статей: статьи загружаются из scrapper параллельно, предложения и слова всех статей
+    кодируются общими пакетами, результаты сохраняются одной транзакцией. Общий для /analyze/batch
+    и воркеров очереди анализа
+    :param article_ids: ID статей без повторов
+    :param force: Анализировать заново, даже если содержимое уже анализировалось этой версией
+    :return: Словарь с articles (проанализированные статьи), errors (статьи, которые не удалось загрузить),
+        saved (ID сохраненных статей) и timing (время инференса или None)
+    """
+    # Ограничиваем число одновременных запросов размером пула соединений
+    semaphore = asyncio.Semaphore(settings.SCRAPPER_MAX_CONNECTIONS)
+
+    async def fetch(article_id: int) -> Dict[str, Any]:
+        async with semaphore:
+            return await fetch_article(article_id)
+
+    fetched = await asyncio.gather(*(fetch(article_id) for article_id in article_ids), return_exceptions=True)
+
+    articles = []
+    errors = []
+    for article_id, result in zip(article_ids, fetched):
+        if isinstance(result, Exception):
+            logger.error(f"Ошибка при получении статьи {article_id}: {str(result)}")
+            errors.append({"article_id": article_id, "detail": f"Ошибка при получении статьи: {str(result)}"})
+        else:
+            article = {
+                "article_id": article_id,
+                "title": result["name"],
+                "content": analysis_text(result["text"])
+            }
+            prepare_analysis(article)
+            articles.append(article)
+
+    if not force:
+        await run_in_threadpool(lookup_results, db, articles)
+    pending = [article for article in articles if article["cache_hit"] is None]
+    logger.info(f"Готовые результаты у {len(articles) - len(pending)} статей, анализируем {len(pending)}")
+
+    # Извлекаем ключевые слова сразу для всех статей без готового результата
+    timing = None
+    if pending:
+        keywords_lists, timing = await inference_pool.run(
+            "extract_keywords_batch",
+            [article["content"] for article in pending],
+            window_sentences=settings.ANALYSIS_WINDOW_SENTENCES,
+            max_group_sentences=settings.ANALYSIS_BATCH_MAX_SENTENCES
+        )
+        for article, keywords_tuples in zip(pending, keywords_lists):
+            article["keywords"] = [{"keyword": word, "score": score} for word, score in keywords_tuples]
+        await embed_articles(pending)
+
+    try:
+        changed = [article for article in articles if not article["unchanged"]]
+        with tracing.span("db_write"):
+            saved = await run_in_threadpool(save_articles, db, changed)
+        remember_results(articles)
+        logger.info(f"Сохранено {len(saved)} статей")
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении статей: {str(e)}")
+        raise
+
+    return {"articles": articles, "errors": errors, "saved": saved, "timing": timing}
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """
+    Анализирует несколько статей за один запрос: статьи загружаются из scrapper параллельно,
+    предложения и слова всех статей кодируются общими пакетами, результаты сохраняются одной транзакцией.
+    Статьи, содержимое которых уже анализировалось этой версией модели, берутся из кэша (force=true - анализировать заново)
+    """
+    article_ids = list(dict.fromkeys(request.article_ids))
+    if not article_ids:
+        raise HTTPException(status_code=400, detail="Не указаны ID статей")
+    if len(article_ids) > settings.ANALYSIS_BATCH_MAX_ARTICLES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много статей в запросе: {len(article_ids)} > {settings.ANALYSIS_BATCH_MAX_ARTICLES}"
+        )
+    logger.info(f"Начинаем пакетный анализ {len(article_ids)} статей")
+
+    try:
+        batch = await analyze_articles(db, article_ids, request.force)
+    except PoolSaturatedError as e:
+        raise pool_saturated(e)
+    except ModelNotReadyError as e:
+        raise model_not_ready(e)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при сохранении статей: {str(e)}")
+
+    articles = batch["articles"]
+    timing = batch["timing"]
+    cache_hits = sum(1 for article in articles if article["cache_hit"] is not None)
+    return {
+        "status": "success",
+        "analyzed_count": len(articles),
+        "saved_count": len(batch["saved"]),
+        "cache_hits": cache_hits,
+        "results": [
+            {
+                "article_id": article["article_id"],
+                "title": article["title"],
+                "keywords": article["keywords"],
+                "cache_hit": article["cache_hit"]
+            }
+            for article in articles
+        ],
+        "errors": batch["errors"],
+        "timings": timing.as_dict() if timing is not None else None
+    }
 
 @app.get("/analyze/{article_id}")
-async def analyze_article(article_id: int) -> Dict[str, Any]:
+async def analyze_article(article_id: int, force: bool = False, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """
+    Анализирует статью и сохраняет ключевые слова. Если это содержимое уже анализировалось этой же версией
+    модели, сохраненный результат возвращается без инференса (cache_hit); force=true анализирует заново
+    """
     try:
         logger.info(f"Начинаем анализ статьи {article_id}")
         
         # Получаем статью из scrapper
-        async with httpx.AsyncClient() as client:
-            logger.info(f"Запрашиваем статью из scrapper: {settings.SCRAPPER_SERVICE_URL}/api/v1/scrapping/article/{article_id}")
-            response = await client.get(f"{settings.SCRAPPER_SERVICE_URL}/api/v1/scrapping/article/{article_id}")
-            response.raise_for_status()
-            article_data = response.json()
-            logger.info(f"Получена статья: {article_data['name']}")
-
-        # Обрезаем текст до 200 символов для быстрого анализа (не хватает выч. ресурсов)
-        truncated_text = article_data["text"][:200]
-        logger.info(f"Обрабатываем первые 200 символов статьи: '{truncated_text}'")
-
-        # Извлекаем ключевые слова
-        logger.info("Начинаем извлечение ключевых слов")
-        keywords_tuples = keyword_extractor.extract_keywords(truncated_text)
-        keywords = [{"keyword": word, "score": score} for word, score in keywords_tuples]
-        logger.info(f"Извлечено {len(keywords)} ключевых слов")
-
-        # Сохраняем статью и ключевые слова в базу данных
-        try:
-            logger.info("Сохраняем статью в базу данных")
-            save_article(
-                db=db,
-                article_id=article_id,
-                title=article_data["name"],
-                content=truncated_text,  # Сохраняем только обрезанный текст
-                keywords=keywords
-            )
-            logger.info("Статья успешно сохранена")
-        except Exception as e:
-            if "duplicate key value violates unique constraint" in str(e):
-                logger.info("Статья уже существует в базе данных")
-            else:
+        article_data = await fetch_article(article_id)
+        logger.info(f"Получена статья: {article_data['name']}")
+
+        text = analysis_text(article_data["text"])
+        logger.info(f"Обрабатываем {len(text)} из {len(article_data['text'])} символов статьи")
+        article = {"article_id": article_id, "title": article_data["name"], "content": text}
+        prepare_analysis(article)
+        if not force:
+            await run_in_threadpool(lookup_results, db, [article])
+
+        timing = None
+        if article["cache_hit"] is not None:
+            logger.info(f"Статья уже анализировалась этой версией модели, результат взят из кэша ({article['cache_hit']})")
+        else:
+            # Извлекаем ключевые слова
+            logger.info("Начинаем извлечение ключевых слов")
+            try:
+                keywords_tuples, timing = await inference_pool.run(
+                    "extract_keywords_streaming", text, window_sentences=settings.ANALYSIS_WINDOW_SENTENCES
+                )
+                logger.info(f"Ожидание в очереди {timing.queue_wait_ms:.1f} мс, инференс {timing.inference_ms:.1f} мс")
+                article["keywords"] = [{"keyword": word, "score": score} for word, score in keywords_tuples]
+                logger.info(f"Извлечено {len(article['keywords'])} ключевых слов")
+                await embed_articles([article])
+            except PoolSaturatedError as e:
+                raise pool_saturated(e)
+            except ModelNotReadyError as e:
+                raise model_not_ready(e)
+
+        # Сохраняем статью и ключевые слова в базу данных (повторный анализ заменяет ключевые слова)
+        if not article["unchanged"]:
+            try:
+                logger.info("Сохраняем статью в базу данных")
+                with tracing.span("db_write"):
+                    await run_in_threadpool(
+                        save_article,
+                        db=db,
+                        article_id=article_id,
+                        title=article_data["name"],
+                        content=text,
+                        keywords=article["keywords"],
+                        embedding=article.get("embedding"),
+                        content_hash=article["content_hash"],
+                        model_version=article["model_version"]
+                    )
+                logger.info("Статья успешно сохранена")
+            except Exception as e:
                 logger.error(f"Ошибка при сохранении статьи: {str(e)}")
                 raise
+        remember_results([article])
 
         return {
             "status": "success",
             "article_id": article_id,
             "title": article_data["name"],
-            "keywords": keywords
+            "keywords": article["keywords"],
+            "cache_hit": article["cache_hit"],
+            "timings": timing.as_dict() if timing is not None else None
         }
 
+    except CircuitOpenError as e:
+        logger.error(f"Scrapper недоступен: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Scrapper недоступен: {str(e)}", headers={"Retry-After": "5"})
     except httpx.HTTPError as e:
         logger.error(f"Ошибка при получении статьи: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Ошибка при получении статьи: {str(e)}")
 
+def job_to_dict(job, article=None) -> Dict[str, Any]:
+    data = {
+        "job_id": job.id,
+        "article_id": job.article_id,
+        "status": job.status,
+        "force": job.force,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+    if article is not None:
+        data["result"] = article_to_dict(article, include_content=False)
+    return data
+
+@app.post("/jobs", status_code=202)
+async def submit_jobs(request: JobsRequest, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """
+    Ставит статьи в очередь анализа и сразу возвращает ID задач; статьи анализируют воркеры очереди пакетами.
+    Если статья уже ждет анализа или анализируется, возвращается ее задача (deduplicated=true)
+    """
+    article_ids = list(dict.fromkeys(request.article_ids))
+    if not article_ids:
+        raise HTTPException(status_code=400, detail="Не указаны ID статей")
+    if len(article_ids) > settings.JOB_MAX_ARTICLES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много статей в запросе: {len(article_ids)} > {settings.JOB_MAX_ARTICLES}"
+        )
+    try:
+        jobs = await run_in_threadpool(enqueue_jobs, db, article_ids, request.force)
+    except SQLAlchemyError as e:
+        logger.error(f"Ошибка при постановке задач в очередь: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при постановке задач в очередь: {str(e)}")
+    created = sum(1 for _, is_new in jobs if is_new)
+    logger.info(f"Поставлено в очередь {created} задач, уже в очереди {len(jobs) - created}")
+    return {
+        "status": "success",
+        "jobs": [{**job_to_dict(job), "deduplicated": not is_new} for job, is_new in jobs]
+    }
+
+@app.get("/jobs/stats")
+def get_jobs_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """
+    Возвращает число задач очереди анализа по статусам
+    """
+    return {
+        "status": "success",
+        "jobs": count_jobs(db)
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=settings.JOB_MAX_WAIT),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Возвращает состояние задачи анализа, а выполненной - и результат (ключевые слова статьи).
+    wait > 0 - долгий опрос: ответ приходит, как только задача завершится, но не позже чем через wait секунд
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        job = await run_in_threadpool(get_job, db, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Задача {job_id} не найдена")
+        remaining = deadline - time.monotonic()
+        if job.status in (JOB_DONE, JOB_FAILED) or remaining <= 0:
+            break
+        # Задачу выполняет другой процесс, поэтому состояние проверяется в базе;
+        # на время ожидания соединение возвращается в пул
+        await run_in_threadpool(db.close)
+        await asyncio.sleep(min(settings.JOB_POLL_INTERVAL, remaining))
+
+    article = await run_in_threadpool(get_article, db, job.article_id) if job.status == JOB_DONE else None
+    return {
+        "status": "success",
+        "job": job_to_dict(job, article)
+    }
+
 @app.post("/mock-article")
 @app.get("/mock-article")
 async def create_mock_article() -> Dict[str, Any]:
@@ -138,43 +585,181 @@ async def create_mock_article() -> Dict[str, Any]:
         "keywords": keywords
     }
 
+@app.post("/embed")
+async def embed_texts(request: EmbedRequest) -> Dict[str, Any]:
+    """
+    Возвращает нормированные эмбеддинги текстов той же моделью, которой строятся эмбеддинги статей
+    """
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="Не указаны тексты")
+    if len(request.texts) > settings.EMBED_MAX_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много текстов в запросе: {len(request.texts)} > {settings.EMBED_MAX_TEXTS}"
+        )
+    try:
+        embeddings, timing = await inference_pool.run("embed", request.texts)
+    except PoolSaturatedError as e:
+        raise pool_saturated(e)
+    except ModelNotReadyError as e:
+        raise model_not_ready(e)
+    return {
+        "status": "success",
+        "model": MODEL_NAME,
+        "backend": settings.MODEL_BACKEND,
+        "dim": int(embeddings.shape[1]),
+        "embeddings": embeddings.tolist(),
+        "timings": timing.as_dict()
+    }
+
+def article_to_dict(article, include_content: bool = True, include_embedding: bool = False) -> Dict[str, Any]:
+    data = {
+        "id": article.article_id,
+        "title": article.title,
+        "updated_at": article.updated_at.isoformat() if article.updated_at else None,
+        "keywords": [
+            {"keyword": kw.keyword, "score": kw.score}
+            for kw in article.keywords
+        ]
+    }
+    if include_content:
+        data["content"] = article.content
+    if include_embedding:
+        # float32 в base64: в несколько раз компактнее списка чисел в JSON
+        data["embedding"] = base64.b64encode(article.embedding).decode("ascii") if article.embedding else None
+    return data
+
+def stream_articles_ndjson(db: Session, after_id: Optional[int], updated_after: Optional[datetime],
+                           include_content: bool, include_embedding: bool) -> Iterator[str]:
+    # Сессия из get_db закрывается после отправки ответа (FastAPI < 0.106), поэтому ее можно читать при стриминге
+    for article in iter_articles(db, page_size=settings.ARTICLES_PAGE_SIZE, after_id=after_id, updated_after=updated_after,
+                                 include_content=include_content, include_embedding=include_embedding):
+        yield json.dumps(article_to_dict(article, include_content, include_embedding), ensure_ascii=False) + "\n"
+
 @app.get("/articles")
-async def get_articles() -> Dict[str, Any]:
+def get_articles(
+    limit: Optional[int] = Query(None, ge=1, le=settings.ARTICLES_MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    updated_after: Optional[datetime] = None,
+    include_content: bool = True,
+    include_embedding: bool = False,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db)
+):
     """
-    Возвращает все статьи из базы данных
+    Возвращает статьи из базы данных.
+    Без limit возвращаются все статьи; с limit - страница после курсора after_id и next_after_id для следующей.
+    updated_after оставляет только статьи, сохраненные позже указанного момента (UTC): клиент передает
+    synced_at предыдущей синхронизации и получает только новые и измененные статьи.
+    include_content=false не отдает тексты статей.
+    include_embedding=true добавляет эмбеддинги статей (float32 в base64, модель - как у /embed).
+    format=ndjson отдает все статьи после after_id потоком, по одной JSON-строке на статью, с постоянным расходом памяти.
+    Обычная функция, а не корутина: FastAPI выполняет ее в пуле потоков, и запросы к базе не блокируют event loop
     """
+    # Момент синхронизации фиксируем до чтения: статьи, сохраненные во время выгрузки, попадут в следующую
+    synced_at = datetime.utcnow().isoformat()
+    if updated_after is not None and updated_after.tzinfo is not None:
+        updated_after = updated_after.astimezone(timezone.utc).replace(tzinfo=None)
+
+    if format == "ndjson":
+        logger.info("Потоковая выгрузка статей в NDJSON")
+        return StreamingResponse(
+            stream_articles_ndjson(db, after_id, updated_after, include_content, include_embedding),
+            media_type="application/x-ndjson",
+            headers={"X-Synced-At": synced_at}
+        )
+
     try:
-        logger.info("Получение всех статей из базы данных")
+        logger.info(f"Получение статей из базы данных (limit={limit}, after_id={after_id}, updated_after={updated_after})")
         
-        # Получаем все статьи из базы данных
-        articles = get_all_articles(db)
-        
-        # Формируем ответ
-        result = []
-        for article in articles:
-            article_data = {
-                "id": article.article_id,
-                "title": article.title,
-                "content": article.content,
-                "keywords": [
-                    {"keyword": kw.keyword, "score": kw.score}
-                    for kw in article.keywords
-                ]
-            }
-            result.append(article_data)
+        articles = get_articles_page(db, limit=limit, after_id=after_id, updated_after=updated_after,
+                                     include_content=include_content, include_embedding=include_embedding)
+        result = [article_to_dict(article, include_content, include_embedding) for article in articles]
         
         logger.info(f"Получено {len(result)} статей из базы данных")
         
+        # Курсор следующей страницы, если текущая заполнена целиком
+        next_after_id = result[-1]["id"] if limit is not None and len(result) == limit else None
+        
         return {
             "status": "success",
             "count": len(result),
-            "articles": result
+            "articles": result,
+            "next_after_id": next_after_id,
+            "synced_at": synced_at
         }
     
     except Exception as e:
         logger.error(f"Ошибка при получении статей: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Ошибка при получении статей: {str(e)}")
 
+@app.get("/health/live")
+async def liveness() -> Dict[str, Any]:
+    """
+    Проверка живости: процесс отвечает на запросы, модель для этого не нужна
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Проверка готовности: модель загружена и прогрета. Пока это не так, отвечает 503,
+    и балансировщик не направляет сюда запросы. В режиме MODEL_LOAD=lazy первая проверка запускает загрузку
+    """
+    model = inference_pool.model_status()
+    if not inference_pool.ready:
+        inference_pool.start_loading()
+        return JSONResponse(status_code=503, content={"status": "not_ready", "model": model},
+                            headers={"Retry-After": "5"})
+    return {"status": "ready", "model": model}
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """
+    Метрики в формате Prometheus: время запросов по обработчикам, загрузки статей из scrapper,
+    ожидания в пуле инференса, кодирования предложений и слов, подсчета сходства, записи в базу
+    и счетчики обработанных слов и предложений
+    """
+    content, content_type = metrics.render()
+    # Тип содержимого передается заголовком: media_type добавил бы к нему второй charset
+    return Response(content=content, headers={"Content-Type": content_type})
+
+@app.get("/embedding-cache/stats")
+async def get_embedding_cache_stats() -> Dict[str, Any]:
+    """
+    Возвращает счетчики попаданий и промахов кэша эмбеддингов слов
+    """
+    # В режиме процессов у каждого воркера свой кэш, счетчики недоступны из API
+    extractor = inference_pool.extractor
+    stats = extractor.cache_stats() if extractor is not None else None
+    return {
+        "status": "success",
+        "enabled": stats is not None,
+        "stats": stats
+    }
+
+@app.get("/result-cache/stats")
+async def get_result_cache_stats() -> Dict[str, Any]:
+    """
+    Возвращает счетчики кэша результатов анализа в памяти процесса и текущую версию анализа
+    """
+    return {
+        "status": "success",
+        "enabled": result_cache is not None,
+        "version": ANALYSIS_VERSION,
+        "stats": result_cache.stats() if result_cache is not None else None
+    }
+
+@app.get("/inference-pool/stats")
+async def get_inference_pool_stats() -> Dict[str, Any]:
+    """
+    Возвращает состояние пула инференса: задачи в работе, отказы, среднее ожидание и время инференса
+    """
+    return {
+        "status": "success",
+        "stats": inference_pool.stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,52 @@
+"""
+Отдельный процесс воркера очереди анализа: python -m api.worker
+
+Разбирает задачи, поставленные через POST /jobs, той же моделью и с теми же настройками, что и API,
+а при KAFKA_CONSUMER=true еще и анализирует новые статьи по событиям scrapper из Kafka.
+Воркеров можно запускать сколько угодно и на разных машинах: задачи распределяет база,
+а процесс API при JOB_WORKER_IN_API=false только принимает задачи и отвечает на опрос их состояния.
+"""
+import asyncio
+import logging
+import signal
+
+from prometheus_client import start_http_server
+
+from api.main import create_article_consumer, create_job_worker, inference_pool, scrapper_client, settings
+from internal.database import init_db
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    init_db()
+    # Модель загружается сразу: задачи, взятые до ее загрузки, возвращаются в очередь без траты попытки
+    inference_pool.start_loading()
+    if settings.WORKER_METRICS_PORT > 0:
+        start_http_server(settings.WORKER_METRICS_PORT)
+        logger.info(f"Метрики воркера доступны на порту {settings.WORKER_METRICS_PORT}")
+
+    runners = [create_job_worker()]
+    if settings.KAFKA_CONSUMER:
+        runners.append(create_article_consumer())
+
+    def stop() -> None:
+        for runner in runners:
+            runner.stop()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+    try:
+        await asyncio.gather(*(runner.run() for runner in runners))
+    finally:
+        await scrapper_client.aclose()
+        inference_pool.shutdown()
+        if inference_pool.extractor is not None:
+            inference_pool.extractor.close()
+        if inference_pool.extractor is not None and inference_pool.extractor.cache is not None:
+            inference_pool.extractor.cache.flush()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
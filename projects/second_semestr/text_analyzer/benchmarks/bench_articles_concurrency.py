@@ -0,0 +1,58 @@
+"""
+Нагрузочный бенчмарк /articles на запущенном сервисе.
+
+Для каждого уровня параллелизма отправляет запросы из N одновременных
+клиентов и печатает пропускную способность и задержки p50/p99.
+Масштабирование по воркерам сравнивается запуском сервиса с разным
+числом процессов и размером пула соединений, например:
+
+    DB_POOL_SIZE=10 uvicorn api.main:app --port 8001 --workers 1
+    DB_POOL_SIZE=10 uvicorn api.main:app --port 8001 --workers 4
+
+Запуск: python -m benchmarks.bench_articles_concurrency --url http://localhost:8001
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+
+async def run_level(client: httpx.AsyncClient, url: str, concurrency: int, requests_per_client: int):
+    latencies = []
+
+    async def worker():
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    total = time.perf_counter() - start
+    return len(latencies) / total, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+async def main_async(args) -> None:
+    url = f"{args.url.rstrip('/')}/articles"
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        # Прогрев: соединения и кэши сервиса
+        await run_level(client, url, 1, 3)
+        for concurrency in args.concurrency:
+            rps, p50, p99 = await run_level(client, url, concurrency, args.requests)
+            print(f"клиентов={concurrency:>3} {rps:8.1f} запросов/с p50={p50:8.1f} мс p99={p99:8.1f} мс")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=20, help="запросов на клиента")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
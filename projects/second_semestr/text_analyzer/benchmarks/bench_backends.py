@@ -0,0 +1,117 @@
+"""
+Бенчмарк бэкендов инференса KeywordExtractor: точность против задержки.
+
+Каждый бэкенд загружает модель, прогревается и анализирует одни и те же
+статьи так же, как /analyze (потоковый режим, окна по 32 предложения, без
+кэша эмбеддингов). Печатаются время загрузки, среднее время анализа статьи
+и совпадение с эталоном torch fp32: доля общих слов в топ-N, доля статей с
+тем же лучшим словом, средняя разница оценок общих слов и косинусное сходство
+эмбеддингов статей. Нужна модель (MODEL_PATH или доступ к HuggingFace),
+для onnx - пакет optimum[onnxruntime].
+
+Запуск: python -m benchmarks.bench_backends --threads 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from internal.keyword_extractor import MODEL_BACKENDS, KeywordExtractor, embedding_text
+
+# Статьи по умолчанию; свои статьи - файлом, разделенные пустой строкой (--texts)
+ARTICLES = [
+    "C++ предоставляет мощные инструменты для разработки многопоточных приложений. "
+    "Стандартная библиотека включает std::thread, std::mutex и std::condition_variable. "
+    "Примитивы синхронизации позволяют эффективно создавать параллельные программы. "
+    "Гонки данных возникают, когда несколько потоков без синхронизации изменяют общие данные.",
+    "Сокеты Беркли - программный интерфейс для сетевого взаимодействия. "
+    "Сервер создает сокет, привязывает его к адресу и порту и принимает соединения. "
+    "Мультиплексирование через epoll позволяет одному потоку обслуживать тысячи клиентов. "
+    "Протокол TCP гарантирует доставку и порядок байтов, UDP - нет.",
+    "Умные указатели std::unique_ptr и std::shared_ptr управляют временем жизни объектов. "
+    "Идиома RAII связывает освобождение ресурса с деструктором. "
+    "Семантика перемещения позволяет передавать владение без копирования. "
+    "Утечки памяти и висячие указатели - частые ошибки ручного управления памятью.",
+    "Индексы в PostgreSQL ускоряют поиск строк по условию. "
+    "B-дерево подходит для сравнений и сортировки, GIN - для полнотекстового поиска и массивов. "
+    "Планировщик выбирает план запроса по статистике таблиц. "
+    "Команда EXPLAIN ANALYZE показывает реальное время выполнения каждого узла плана.",
+    "Шаблоны C++ позволяют писать обобщенный код, который проверяется на этапе компиляции. "
+    "Концепты C++20 описывают требования к параметрам шаблона. "
+    "Метапрограммирование на шаблонах вычисляет значения во время компиляции. "
+    "Ошибки инстанцирования шаблонов часто бывают многословными.",
+    "Docker упаковывает приложение вместе с зависимостями в образ. "
+    "Контейнеры изолируют процессы с помощью пространств имен и контрольных групп ядра Linux. "
+    "Многоэтапная сборка уменьшает размер итогового образа. "
+    "Docker Compose описывает несколько связанных сервисов одним файлом.",
+]
+
+
+def load_texts(path):
+    with open(path, encoding="utf-8") as file:
+        return [text.strip() for text in file.read().split("\n\n") if text.strip()]
+
+
+def analyze(extractor, texts, top_n, repeats):
+    """Ключевые слова, эмбеддинги статей и среднее время анализа одной статьи"""
+    timings = []
+    for _ in range(repeats):
+        for text in texts:
+            start = time.perf_counter()
+            extractor.extract_keywords_streaming(text, top_n=top_n, window_sentences=32)
+            timings.append(time.perf_counter() - start)
+    keywords = [extractor.extract_keywords_streaming(text, top_n=top_n, window_sentences=32) for text in texts]
+    embeddings = extractor.embed([embedding_text(text[:60], [word for word, _ in words])
+                                  for text, words in zip(texts, keywords)])
+    return keywords, embeddings, float(np.mean(timings))
+
+
+def compare(reference, keywords):
+    """Совпадение рангов ключевых слов с эталоном"""
+    overlaps, same_top, score_diffs = [], [], []
+    for ref_words, words in zip(reference, keywords):
+        ref_scores = {word: score for word, score in ref_words}
+        scores = {word: score for word, score in words}
+        common = ref_scores.keys() & scores.keys()
+        overlaps.append(len(common) / max(len(ref_scores), 1))
+        same_top.append(bool(ref_words) and bool(words) and ref_words[0][0] == words[0][0])
+        score_diffs.extend(abs(ref_scores[word] - scores[word]) for word in common)
+    return float(np.mean(overlaps)), float(np.mean(same_top)), float(np.mean(score_diffs)) if score_diffs else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(MODEL_BACKENDS), choices=MODEL_BACKENDS)
+    parser.add_argument("--threads", type=int, default=0, help="потоков intra-op, 0 - по умолчанию библиотеки")
+    parser.add_argument("--model-path", default=None, help="каталог сохраненной модели (как MODEL_PATH)")
+    parser.add_argument("--onnx-file", default=None, help="файл ONNX в каталоге модели (как MODEL_ONNX_FILE)")
+    parser.add_argument("--texts", default=None, help="файл со статьями, разделенными пустой строкой")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3, help="проходов по статьям при замере времени")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts) if args.texts else ARTICLES
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    reference = None
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            extractor = KeywordExtractor(model_path=args.model_path, backend=backend, threads=args.threads,
+                                         onnx_file=args.onnx_file)
+        except ImportError as e:
+            print(f"{backend:<11} пропущен: {e}")
+            continue
+        load_seconds = time.perf_counter() - start
+        extractor.warmup()
+        keywords, embeddings, per_article = analyze(extractor, texts, args.top_n, args.repeats)
+        if reference is None:
+            reference = (keywords, embeddings, per_article)
+        overlap, same_top, score_diff = compare(reference[0], keywords)
+        cosine = float(np.mean(np.sum(reference[1] * embeddings, axis=1)))
+        print(f"{backend:<11} загрузка {load_seconds:5.2f} с | статья {per_article * 1000:7.1f} мс "
+              f"(x{reference[2] / per_article:4.2f}) | топ-{args.top_n} совпадает {overlap:6.1%}, "
+              f"лучшее слово {same_top:6.1%}, разница оценок {score_diff:4.1f} | эмбеддинги cos {cosine:.4f}")
+
+
+if __name__ == "__main__":
+    main()
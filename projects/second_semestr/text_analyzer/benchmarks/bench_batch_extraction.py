@@ -0,0 +1,95 @@
+"""
+Бенчмарк пакетного извлечения ключевых слов на корпусе похожих статей.
+
+Сравнивает анализ статей по одной (extract_keywords_streaming, как
+/analyze/{id}) с одним вызовом extract_keywords_batch для всего корпуса
+(как /analyze/batch): сколько строк и вызовов уходит в модель и сколько
+это занимает времени. Модель заменена заглушкой со стоимостью вызова
+overhead + per_item * n; статьи собираются из общего словаря и общих
+шаблонных предложений, как статьи одного сайта на близкие темы.
+
+Запуск: python -m benchmarks.bench_batch_extraction
+"""
+import argparse
+import logging
+import random
+import time
+
+import numpy as np
+
+from internal.keyword_extractor import KeywordExtractor
+
+EMBEDDING_DIM = 312  # размерность эмбеддингов rubert-tiny2
+
+
+class CountingModel:
+    def __init__(self, overhead_ms: float, per_item_ms: float):
+        self.overhead = overhead_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self.calls = 0
+        self.items = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return EMBEDDING_DIM
+
+    def encode(self, sentences, batch_size: int = 32):
+        self.calls += 1
+        self.items += len(sentences)
+        time.sleep(self.overhead + self.per_item * len(sentences))
+        return np.random.default_rng(len(sentences)).standard_normal((len(sentences), EMBEDDING_DIM)).astype(np.float32)
+
+
+def make_corpus(n_articles: int, sentences: int, vocabulary: int, shared: float, seed: int):
+    """Статьи из общего словаря; доля shared предложений - общие для сайта шаблоны"""
+    rng = random.Random(seed)
+    words = [f"термин{i}" for i in range(vocabulary)]
+    boilerplate = [" ".join(rng.sample(words, 8)) for _ in range(20)]
+    corpus = []
+    for _ in range(n_articles):
+        article = [
+            rng.choice(boilerplate) if rng.random() < shared else " ".join(rng.choices(words, k=rng.randint(6, 14)))
+            for _ in range(sentences)
+        ]
+        corpus.append(". ".join(article) + ".")
+    return corpus
+
+
+def run(corpus, overhead_ms: float, per_item_ms: float, window_sentences: int):
+    results = {}
+    for name in ("по одной", "пакетом"):
+        model = CountingModel(overhead_ms, per_item_ms)
+        extractor = KeywordExtractor(model=model)
+        start = time.perf_counter()
+        if name == "по одной":
+            for text in corpus:
+                extractor.extract_keywords_streaming(text, window_sentences=window_sentences)
+        else:
+            extractor.extract_keywords_batch(corpus, window_sentences=window_sentences)
+        results[name] = (time.perf_counter() - start, model.calls, model.items)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=40, help="предложений в статье")
+    parser.add_argument("--vocabulary", type=int, default=3000, help="слов в общем словаре")
+    parser.add_argument("--shared", type=float, default=0.2, help="доля шаблонных предложений")
+    parser.add_argument("--window", type=int, default=32, help="окно в предложениях, как ANALYSIS_WINDOW_SENTENCES")
+    parser.add_argument("--overhead-ms", type=float, default=5.0, help="фиксированная стоимость вызова модели")
+    parser.add_argument("--per-item-ms", type=float, default=0.2, help="стоимость одной строки")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger("internal.keyword_extractor").setLevel(logging.WARNING)
+    for n_articles in (10, 50, 200):
+        corpus = make_corpus(n_articles, args.sentences, args.vocabulary, args.shared, args.seed)
+        results = run(corpus, args.overhead_ms, args.per_item_ms, args.window)
+        single_time, single_calls, single_items = results["по одной"]
+        for name, (elapsed, calls, items) in results.items():
+            print(f"статей={n_articles:>4} {name:<9} {elapsed:7.2f} с | вызовов модели {calls:>5} | "
+                  f"строк {items:>7} ({items / single_items:5.1%})")
+        print(f"           ускорение x{single_time / results['пакетом'][0]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Нагрузочный бенчмарк планировщика MicroBatchEncoder.
+
+N потоков (как воркеры пула инференса) одновременно кодируют небольшие
+пакеты строк. Модель заменена заглушкой со стоимостью вызова
+overhead + per_item * n, которая держит блокировку на время вызова:
+настоящая модель на CPU занимает все ядра, и параллельные вызовы не ускоряются.
+Сравниваются прямые вызовы модели и вызовы через планировщик:
+пропускная способность и задержки p50/p99 одного вызова encode.
+
+Запуск: python -m benchmarks.bench_microbatch
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from internal.batching import MicroBatchEncoder
+
+EMBEDDING_DIM = 312  # размерность эмбеддингов rubert-tiny2
+
+
+class CpuBoundModel:
+    def __init__(self, overhead_ms: float, per_item_ms: float):
+        self.overhead = overhead_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self._lock = threading.Lock()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return EMBEDDING_DIM
+
+    def encode(self, sentences, batch_size: int = 32):
+        with self._lock:
+            time.sleep(self.overhead + self.per_item * len(sentences))
+        return np.zeros((len(sentences), EMBEDDING_DIM), dtype=np.float32)
+
+
+def load(encoder, clients: int, calls: int, items: int):
+    latencies = []
+    lock = threading.Lock()
+    batch = [f"слово{i}" for i in range(items)]
+
+    def client():
+        for _ in range(calls):
+            start = time.perf_counter()
+            encoder.encode(batch)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - start
+    return clients * calls * items / total, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20, help="вызовов encode на клиента")
+    parser.add_argument("--items", type=int, default=8, help="строк в одном вызове")
+    parser.add_argument("--overhead-ms", type=float, default=10.0, help="фиксированная стоимость вызова модели")
+    parser.add_argument("--per-item-ms", type=float, default=0.5, help="стоимость одной строки")
+    parser.add_argument("--max-batch-size", type=int, default=128)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for clients in (1, 4, 16):
+        model = CpuBoundModel(args.overhead_ms, args.per_item_ms)
+        direct = load(model, clients, args.calls, args.items)
+
+        scheduler = MicroBatchEncoder(model, args.max_batch_size, args.max_wait_ms)
+        batched = load(scheduler, clients, args.calls, args.items)
+        stats = scheduler.stats()
+        scheduler.close()
+
+        for name, (throughput, p50, p99) in (("напрямую", direct), ("планировщик", batched)):
+            print(f"клиентов={clients:>2} {name:<11} {throughput:8.0f} строк/с "
+                  f"p50={p50:7.1f} мс p99={p99:7.1f} мс")
+        print(f"            средний пакет планировщика: {stats['avg_batch_size']} строк")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Микро-бенчмарк подсчета сходства слов с предложениями.
+
+Сравнивает исходный поштучный путь (cosine_similarity для каждого слова)
+с режимом "matrix" (нормировка + одно умножение матриц) на случайных
+эмбеддингах размерности rubert-tiny2. Модель не загружается.
+
+Запуск: python -m benchmarks.bench_scoring
+"""
+import argparse
+import time
+
+import numpy as np
+
+from internal.keyword_extractor import max_similarities, max_similarities_pairwise
+
+EMBEDDING_DIM = 312  # размерность эмбеддингов rubert-tiny2
+
+
+def _best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n_words: int, n_sentences: int, repeat: int) -> None:
+    rng = np.random.default_rng(0)
+    words = rng.standard_normal((n_words, EMBEDDING_DIM)).astype(np.float32)
+    sentences = rng.standard_normal((n_sentences, EMBEDDING_DIM)).astype(np.float32)
+
+    expected = max_similarities_pairwise(words, sentences)
+    actual = max_similarities(words.copy(), sentences.copy())
+    assert np.allclose(expected, actual, atol=1e-5), "Результаты режимов расходятся"
+
+    pairwise = _best_time(lambda: max_similarities_pairwise(words, sentences), repeat)
+    # Копии входят в замер: в экстракторе буферы нормируются на месте
+    matrix = _best_time(lambda: max_similarities(words.copy(), sentences.copy()), repeat)
+
+    print(f"слов={n_words:>5} предложений={n_sentences:>4} "
+          f"pairwise={pairwise * 1000:9.2f} мс matrix={matrix * 1000:7.2f} мс "
+          f"ускорение x{pairwise / matrix:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # От короткой заметки до длинной статьи
+    for n_words, n_sentences in [(50, 5), (500, 50), (2000, 200), (5000, 500)]:
+        run(n_words, n_sentences, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Бенчмарк запуска сервиса с разными режимами загрузки модели.
+
+Каждый вариант запускается в отдельном процессе, который импортирует
+api.main (как uvicorn или тесты), ждет готовности модели (как /health/ready)
+и выполняет два анализа одного и того же текста. Печатаются время импорта,
+время до готовности и задержки первого и второго запроса: с прогревом первый
+запрос не должен заметно отличаться от второго. Нужна настоящая модель:
+MODEL_PATH=<каталог> для загрузки без сети или доступ к HuggingFace.
+
+Запуск: python -m benchmarks.bench_startup
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+
+TEXT = (
+    "C++ предоставляет мощные инструменты для разработки многопоточных приложений. "
+    "Стандартная библиотека включает std::thread, std::mutex и std::condition_variable. "
+    "Примитивы синхронизации защищают общие данные от гонок."
+)
+
+# (название, MODEL_LOAD, MODEL_WARMUP)
+VARIANTS = (
+    ("eager", "eager", "true"),
+    ("background", "background", "true"),
+    ("background без прогрева", "background", "false"),
+    ("lazy", "lazy", "false"),
+)
+
+
+def child() -> None:
+    """Замеры внутри процесса сервиса; результат печатается одной JSON-строкой"""
+    import asyncio
+
+    import api.main as service
+
+    imported = time.perf_counter() - _STARTED
+    pool = service.inference_pool
+    ready = None
+    if service.settings.MODEL_LOAD != "lazy":
+        # То же, что делает startup_event, и ожидание, пока /health/ready не ответит 200
+        pool.start_loading().result()
+        ready = time.perf_counter() - _STARTED
+
+    latencies = []
+    for _ in range(2):
+        start = time.perf_counter()
+        asyncio.run(pool.run("extract_keywords_streaming", TEXT, window_sentences=32))
+        latencies.append(time.perf_counter() - start)
+    print(json.dumps({"import": imported, "ready": ready, "first": latencies[0], "second": latencies[1]}))
+
+
+def run_variant(load: str, warmup: str) -> dict:
+    env = dict(os.environ, MODEL_LOAD=load, MODEL_WARMUP=warmup, EMBEDDING_CACHE_SIZE="0")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--repeats", type=int, default=3, help="запусков каждого варианта, берется медиана")
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    for name, load, warmup in VARIANTS:
+        runs = [run_variant(load, warmup) for _ in range(args.repeats)]
+
+        def median(key):
+            values = sorted(run[key] for run in runs)
+            return values[len(values) // 2]
+
+        ready = f"{median('ready'):6.2f} с" if runs[0]["ready"] is not None else "   при 1-м запросе"
+        print(f"{name:<24} импорт {median('import'):5.2f} с | готовность {ready} | "
+              f"1-й запрос {median('first') * 1000:8.1f} мс | 2-й запрос {median('second') * 1000:7.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Фикстуры набора бенчмарков (pytest-benchmark): корпус, заглушка модели, замена scrapper
+и база SQLite с заданным числом статей. Сеть, модель и PostgreSQL не нужны.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from internal.database import Base
+from internal.keyword_extractor import KeywordExtractor
+from internal.models import Article, Keyword
+
+from .corpus import make_analyzed, make_articles
+from .stubs import ScrapperStandIn, StubEncoder
+
+# Размеры базы статей
+SCALES = (1_000, 10_000, 100_000)
+
+
+def fill(engine, analyzed):
+    """
+    Заполняет пустую базу статьями одним executemany: быстрее save_articles, у которого
+    upsert и замена ключевых слов нужны только для повторного анализа
+    """
+    with engine.begin() as connection:
+        connection.execute(Article.__table__.insert(), [
+            {"id": row["article_id"], "article_id": row["article_id"], "title": row["title"],
+             "content": row["content"], "embedding": row["embedding"]}
+            for row in analyzed
+        ])
+        connection.execute(Keyword.__table__.insert(), [
+            {"article_id": row["article_id"], **keyword} for row in analyzed for keyword in row["keywords"]
+        ])
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """Статьи для анализа: 200 статей по 40 предложений в среднем"""
+    return make_articles(200, seed=0)
+
+
+@pytest.fixture(scope="session")
+def extractor():
+    """Экстрактор с заглушкой модели и без кэша эмбеддингов: каждый раунд выполняет одну и ту же работу"""
+    return KeywordExtractor(model=StubEncoder())
+
+
+@pytest.fixture(scope="session")
+def scrapper(corpus):
+    return ScrapperStandIn(corpus)
+
+
+@pytest.fixture(scope="module", params=SCALES, ids=lambda n: f"{n // 1000}k")
+def database(request, tmp_path_factory):
+    """
+    Файл SQLite, заполненный request.param проанализированными статьями (короткие тексты, 10 ключевых слов).
+    Возвращает фабрику сессий и число статей
+    """
+    n_articles = request.param
+    path = tmp_path_factory.mktemp("db") / f"articles_{n_articles}.sqlite"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    fill(engine, make_analyzed(make_articles(n_articles, seed=1, sentences=4), seed=1))
+    yield session_factory, n_articles
+    engine.dispose()
@@ -0,0 +1,71 @@
+"""
+Синтетический корпус статей для набора бенчмарков.
+
+Статьи детерминированы (зависят только от seed) и по форме совпадают с ответом
+scrapper: {"id", "name", "text"}. Слова берутся из общего словаря с частотами
+по закону Ципфа, поэтому статьи, как и настоящие, делят много общих слов;
+часть предложений - общие шаблоны сайта.
+"""
+import itertools
+import random
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Слова тем роадмапа: с ними статьи сопоставляются в roadmap
+TOPIC_WORDS = [
+    "потоки", "мьютекс", "синхронизация", "шаблоны", "указатели", "память", "исключения", "контейнеры",
+    "алгоритмы", "итераторы", "сокеты", "протокол", "сервер", "клиент", "база", "индексы", "транзакции",
+    "запросы", "docker", "контейнеризация", "сборка", "cmake", "тестирование", "отладка", "профилирование",
+    "асинхронность", "корутины", "лямбды", "наследование", "полиморфизм",
+]
+EMBEDDING_DIM = 312  # размерность эмбеддингов rubert-tiny2
+
+
+def make_vocabulary(size: int) -> List[str]:
+    return TOPIC_WORDS + [f"термин{i}" for i in range(size)]
+
+
+def make_articles(n_articles: int, seed: int = 0, sentences: int = 40, vocabulary: int = 5000,
+                  shared: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    :param n_articles: Число статей, ID идут с 1
+    :param sentences: Среднее число предложений в статье (от половины до полутора)
+    :param vocabulary: Слов в словаре помимо слов тем
+    :param shared: Доля шаблонных предложений, общих для всех статей
+    """
+    rng = random.Random(seed)
+    words = make_vocabulary(vocabulary)
+    # Накопленные веса считаются один раз: с weights random.choices пересчитывает их при каждом вызове
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    boilerplate = [" ".join(rng.choices(words, cum_weights=cum_weights, k=10)).capitalize() for _ in range(20)]
+    articles = []
+    for article_id in range(1, n_articles + 1):
+        text = []
+        for _ in range(rng.randint(sentences // 2, sentences * 3 // 2)):
+            if rng.random() < shared:
+                text.append(rng.choice(boilerplate))
+            else:
+                text.append(" ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(6, 16))).capitalize())
+        title = " ".join(rng.sample(TOPIC_WORDS, 3)).capitalize()
+        articles.append({"id": article_id, "name": f"{title} ({article_id})", "text": ". ".join(text) + "."})
+    return articles
+
+
+def make_analyzed(articles: List[Dict[str, Any]], seed: int = 0, keywords: int = 10) -> List[Dict[str, Any]]:
+    """
+    Результаты анализа статей в формате save_articles без обращения к модели:
+    первые уникальные слова статьи со случайными оценками и случайный эмбеддинг float32
+    """
+    rng = np.random.default_rng(seed)
+    analyzed = []
+    for article in articles:
+        words = list(dict.fromkeys(word for word in article["text"].lower().replace(".", " ").split() if len(word) > 2))
+        analyzed.append({
+            "article_id": article["id"],
+            "title": article["name"],
+            "content": article["text"],
+            "keywords": [{"keyword": word, "score": int(rng.integers(0, 100))} for word in words[:keywords]],
+            "embedding": rng.standard_normal(EMBEDDING_DIM, dtype=np.float32).tobytes(),
+        })
+    return analyzed
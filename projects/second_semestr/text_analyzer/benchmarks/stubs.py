@@ -0,0 +1,59 @@
+"""
+Заглушки внешних зависимостей для набора бенчмарков: модель и scrapper.
+"""
+from typing import Any, Dict, List
+import zlib
+
+import httpx
+import numpy as np
+
+from internal.scrapper_client import ScrapperClient
+
+from .corpus import EMBEDDING_DIM
+
+
+class StubEncoder:
+    """
+    Детерминированная заглушка SentenceTransformer: эмбеддинг строки зависит только от нее самой
+    (crc32 как seed, а не hash(), который меняется между запусками). Стоит несколько микросекунд
+    на строку, поэтому бенчмарки измеряют код вокруг модели, а не саму модель
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.calls = 0
+        self.items = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences: List[str], **kwargs) -> np.ndarray:
+        self.calls += 1
+        self.items += len(sentences)
+        embeddings = np.empty((len(sentences), self.dim), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            embeddings[i] = np.random.default_rng(zlib.crc32(sentence.encode("utf-8"))).standard_normal(self.dim)
+        return embeddings
+
+
+class ScrapperStandIn:
+    """
+    Локальная замена scrapper: отдает статьи корпуса по тому же пути, что и настоящий сервис,
+    и 404 для неизвестных ID. Подключается к ScrapperClient как транспорт httpx, без сети
+    """
+
+    def __init__(self, articles: List[Dict[str, Any]]):
+        self.articles = {article["id"]: article for article in articles}
+        self.requests = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        article_id = int(request.url.path.rsplit("/", 1)[1])
+        article = self.articles.get(article_id)
+        if article is None:
+            return httpx.Response(404, json={"error": "article not found"})
+        return httpx.Response(200, json=article)
+
+    def client(self) -> ScrapperClient:
+        transport = httpx.MockTransport(self.handle)
+        return ScrapperClient(transport=transport, async_transport=transport)
@@ -0,0 +1,92 @@
+"""
+Бенчмарки анализа статьи: загрузка из scrapper, извлечение ключевых слов
+и весь запрос /analyze/{article_id} с базой SQLite.
+"""
+import asyncio
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import api.main as service
+from internal.database import Base, get_db
+from internal.inference_pool import InferencePool
+from internal.keyword_extractor import KeywordExtractor
+
+from .corpus import make_articles
+from .stubs import StubEncoder
+
+# Статьи разной длины: (название, предложений в среднем)
+LENGTHS = (("short", 10), ("long", 200))
+
+
+@pytest.mark.parametrize("name,sentences", LENGTHS, ids=[name for name, _ in LENGTHS])
+def test_extract_keywords(benchmark, extractor, name, sentences):
+    text = make_articles(1, seed=3, sentences=sentences)[0]["text"]
+    keywords = benchmark(extractor.extract_keywords, text)
+    assert len(keywords) == 10
+
+
+def test_extract_keywords_streaming(benchmark, extractor):
+    """Длинная статья окнами по 32 предложения, как в /analyze/{article_id}"""
+    text = make_articles(1, seed=3, sentences=200)[0]["text"]
+    keywords = benchmark(extractor.extract_keywords_streaming, text, window_sentences=32)
+    assert len(keywords) == 10
+
+
+def test_extract_keywords_batch(benchmark, extractor, corpus):
+    """50 статей одним вызовом, как в /analyze/batch"""
+    texts = [article["text"] for article in corpus[:50]]
+    results = benchmark.pedantic(extractor.extract_keywords_batch, args=(texts,), kwargs={"window_sentences": 32},
+                                 rounds=5, warmup_rounds=1)
+    assert len(results) == 50
+
+
+def test_fetch_article(benchmark, scrapper):
+    """Загрузка статьи через ScrapperClient (повторы, выключатель, разбор JSON) из локальной замены scrapper"""
+    client = scrapper.client()
+    loop = asyncio.new_event_loop()
+    ids = itertools.cycle(scrapper.articles)
+    try:
+        article = benchmark(lambda: loop.run_until_complete(client.aget_article(next(ids))))
+        assert article["text"]
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.close()
+
+
+@pytest.fixture
+def analyzer(monkeypatch, scrapper, tmp_path):
+    """
+    Клиент сервиса: пул инференса с заглушкой модели, замена scrapper и пустая база SQLite
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'analyze.sqlite'}", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        with session_factory() as db:
+            yield db
+
+    pool = InferencePool(lambda: KeywordExtractor(model=StubEncoder()))
+    monkeypatch.setattr(service, "inference_pool", pool)
+    monkeypatch.setattr(service, "scrapper_client", scrapper.client())
+    monkeypatch.setitem(service.app.dependency_overrides, get_db, override_get_db)
+    yield TestClient(service.app)
+    pool.shutdown()
+    engine.dispose()
+
+
+def test_analyze_endpoint(benchmark, analyzer, scrapper):
+    """Весь запрос: scrapper, извлечение ключевых слов, эмбеддинг статьи и запись в базу (force - без кэша)"""
+    ids = itertools.cycle(scrapper.articles)
+
+    def analyze():
+        response = analyzer.get(f"/analyze/{next(ids)}", params={"force": "true"})
+        assert response.status_code == 200
+
+    benchmark.pedantic(analyze, rounds=50, warmup_rounds=2)
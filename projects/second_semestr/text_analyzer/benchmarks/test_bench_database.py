@@ -0,0 +1,34 @@
+"""
+Бенчмарки записи и чтения статей в SQLite при 1k, 10k и 100k статей в базе.
+"""
+import itertools
+
+from internal.database import get_all_articles, save_article
+
+from .corpus import make_analyzed, make_articles
+
+
+def test_save_article(benchmark, database):
+    """Повторный анализ уже сохраненной статьи: upsert статьи и замена ее ключевых слов"""
+    session_factory, n_articles = database
+    updates = make_analyzed(make_articles(100, seed=2, sentences=4), seed=2)
+    ids = itertools.cycle(range(1, n_articles + 1, max(1, n_articles // 100)))
+    rows = itertools.cycle(updates)
+
+    with session_factory() as db:
+        def save():
+            row = next(rows)
+            save_article(db, next(ids), row["title"], row["content"], row["keywords"], row["embedding"])
+
+        benchmark(save)
+
+
+def test_get_all_articles(benchmark, database):
+    """Чтение всех статей с ключевыми словами; каждый раунд - новая сессия, без объектов в identity map"""
+    session_factory, n_articles = database
+
+    def read_all():
+        with session_factory() as db:
+            return len(get_all_articles(db))
+
+    assert benchmark.pedantic(read_all, rounds=3) == n_articles
@@ -8,6 +8,14 @@ class Settings(BaseSettings):
     
     # Scrapper service settings
     SCRAPPER_SERVICE_URL: str = "http://scrapping:9003"
+    SCRAPPER_MAX_CONNECTIONS: int = 20  # размер пула соединений и число одновременных запросов к scrapper
+    SCRAPPER_TIMEOUT: float = 10.0  # таймаут запроса, секунд
+    SCRAPPER_CONNECT_TIMEOUT: float = 3.0  # таймаут установки соединения, секунд
+    SCRAPPER_RETRIES: int = 2  # повторов при сетевых ошибках и ответах 502/503/504
+    SCRAPPER_BACKOFF_BASE: float = 0.2  # базовая задержка перед повтором, секунд (растет экспоненциально, со случайным разбросом)
+    SCRAPPER_BACKOFF_MAX: float = 2.0  # максимальная задержка перед повтором, секунд
+    SCRAPPER_BREAKER_THRESHOLD: int = 5  # ошибок подряд, после которых автомат размыкается
+    SCRAPPER_BREAKER_RESET: float = 30.0  # через сколько секунд разомкнутый автомат пропускает пробный запрос
     
     # Database settings
     DB_HOST: str = "db"
@@ -15,6 +23,64 @@ class Settings(BaseSettings):
     DB_NAME: str = "text_analyzer"
     DB_USER: str = "postgres"
     DB_PASSWORD: str = "postgres"
+    DB_POOL_SIZE: int = 10  # постоянные соединения пула
+    DB_MAX_OVERFLOW: int = 20  # дополнительные соединения сверх DB_POOL_SIZE под пиковую нагрузку
+    DB_POOL_TIMEOUT: int = 30  # сколько секунд ждать свободное соединение
+    DB_POOL_RECYCLE: int = 1800  # пересоздавать соединения старше, секунд (-1 - никогда)
+    DB_POOL_PRE_PING: bool = True  # проверять соединение перед выдачей из пула
+    
+    # Articles listing settings
+    ARTICLES_PAGE_SIZE: int = 500  # размер страницы при потоковой выгрузке /articles?format=ndjson
+    ARTICLES_MAX_PAGE_SIZE: int = 1000  # максимальный limit для /articles
+    
+    # Analysis settings
+    ANALYSIS_MAX_CHARS: int = 100000  # сколько символов статьи анализировать и сохранять, 0 - без ограничения
+    ANALYSIS_WINDOW_SENTENCES: int = 32  # размер окна в предложениях при потоковом анализе
+    ANALYSIS_BATCH_MAX_ARTICLES: int = 500  # максимум статей в одном запросе /analyze/batch
+    ANALYSIS_BATCH_MAX_SENTENCES: int = 2048  # сколько предложений пакета кодировать за раз (память инференса), 0 - весь пакет сразу
+    ANALYSIS_STORE_EMBEDDINGS: bool = True  # сохранять эмбеддинг статьи для семантического сопоставления
+    EMBED_MAX_TEXTS: int = 256  # максимум текстов в одном запросе /embed
+    RESULT_CACHE_SIZE: int = 10000  # результатов анализа в кэше процесса, 0 - только база
+    SERVER_TIMING: bool = False  # добавлять к ответам заголовок Server-Timing со временем этапов запроса (отладка)
+    
+    # Analysis job queue settings
+    JOB_WORKER_IN_API: bool = True  # запускать воркер очереди анализа в процессе API; false - только отдельные python -m api.worker
+    JOB_BATCH_SIZE: int = 32  # сколько задач воркер забирает и анализирует за раз
+    JOB_POLL_INTERVAL: float = 0.5  # пауза между опросами пустой очереди воркером и между проверками статуса при ожидании, секунд
+    JOB_LEASE_SECONDS: float = 300.0  # если воркер не завершил задачу за это время, ее забирает другой
+    JOB_MAX_ATTEMPTS: int = 3  # попыток на задачу, после чего она отмечается неудачной
+    JOB_MAX_WAIT: float = 30.0  # максимальное ожидание завершения задачи в GET /jobs/{job_id}?wait=, секунд
+    JOB_MAX_ARTICLES: int = 1000  # максимум статей в одном запросе POST /jobs
+    WORKER_METRICS_PORT: int = 0  # порт метрик Prometheus отдельного процесса воркера, 0 - не открывать
+    
+    # Kafka consumer settings
+    KAFKA_CONSUMER: bool = False  # анализировать новые статьи по событиям scrapper из Kafka (нужен aiokafka)
+    KAFKA_BROKERS: str = "kafka:29092"  # адреса брокеров через запятую
+    KAFKA_TOPIC: str = "scrapping"  # топик, в который scrapper публикует {"id": <ID статьи>}
+    KAFKA_GROUP_ID: str = "text-analyzer"  # группа потребителей: партиции делятся между всеми процессами с KAFKA_CONSUMER=true
+    KAFKA_BATCH_SIZE: int = 100  # максимум событий в одном пакете анализа
+    KAFKA_BATCH_TIMEOUT_MS: int = 1000  # сколько ждать событий, прежде чем анализировать неполный пакет
+    KAFKA_RETRY_BACKOFF: float = 5.0  # пауза перед повтором пакета, который не удалось обработать, секунд
+    
+    # Model settings
+    MODEL_PATH: str = ""  # каталог с сохраненной моделью для загрузки без сети, пусто - cointegrated/rubert-tiny2 из кэша HuggingFace
+    MODEL_LOAD: str = "background"  # "eager" - при импорте приложения, "background" - в фоне при старте, "lazy" - при первом запросе
+    MODEL_WARMUP: bool = True  # прогнать тестовый текст сразу после загрузки модели
+    MODEL_LOAD_TIMEOUT: float = 60.0  # сколько запрос ждет загрузки модели, затем 503, секунд
+    MODEL_BACKEND: str = "torch"  # "torch" (fp32), "torch-int8" (динамическое квантование) или "onnx" (ONNX Runtime)
+    MODEL_THREADS: int = 0  # потоков внутри одной операции модели, 0 - по умолчанию torch/ONNX Runtime (все ядра)
+    MODEL_ONNX_FILE: str = ""  # файл ONNX в каталоге модели, например onnx/model_qint8_avx512_vnni.onnx; пусто - onnx/model.onnx
+    
+    # Inference pool settings
+    INFERENCE_POOL_KIND: str = "thread"  # "thread" или "process"
+    INFERENCE_WORKERS: int = 1
+    INFERENCE_MAX_QUEUE: int = 16  # сколько задач может ждать свободного воркера, сверх этого - 429
+    ENCODE_BATCH_MAX_SIZE: int = 0  # пакет планировщика, объединяющего encode параллельных запросов, 0 - выключен
+    ENCODE_BATCH_MAX_WAIT_MS: float = 5.0  # сколько планировщик ждет вызовы других запросов
+    
+    # Embedding cache settings
+    EMBEDDING_CACHE_SIZE: int = 50000  # 0 - кэш выключен
+    EMBEDDING_CACHE_PATH: str = ""  # каталог для хранения кэша на диске, пусто - только в памяти
     
     class Config:
         env_file = ".env"
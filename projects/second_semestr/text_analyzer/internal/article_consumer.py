@@ -0,0 +1,150 @@
+from typing import Any, Callable, List, Optional
+import asyncio
+import json
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics, tracing
+from .database import enqueue_jobs
+from .job_worker import Analyze
+
+logger = logging.getLogger(__name__)
+
+
+def create_kafka_consumer(brokers: str, topic: str, group_id: str) -> Any:
+    """
+    Consumer aiokafka без автоматической фиксации смещений: их фиксирует ArticleConsumer после сохранения.
+    Группа начинает с самого раннего события, чтобы при первом запуске проанализировать накопленные статьи
+    :param brokers: Адреса брокеров через запятую
+    """
+    from aiokafka import AIOKafkaConsumer
+
+    return AIOKafkaConsumer(
+        topic,
+        bootstrap_servers=brokers.split(","),
+        group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest"
+    )
+
+
+def parse_event(value: Optional[bytes]) -> Optional[int]:
+    """ID статьи из события scrapper ({"id": 123}) или None, если событие не разобрать"""
+    try:
+        article_id = json.loads(value)["id"]
+    except (TypeError, ValueError, KeyError):
+        return None
+    return article_id if isinstance(article_id, int) else None
+
+
+class ArticleConsumer:
+    """
+    Читает события новых статей, которые scrapper публикует в Kafka, пакетами и анализирует статьи пакета
+    вместе, как /analyze/batch: ключевые слова извлекаются общими пакетами, результаты сохраняются одной транзакцией.
+    Смещения фиксируются только после сохранения, поэтому после падения события читаются заново;
+    повторный анализ идемпотентен, а неизмененные статьи берутся из кэша результатов.
+    Статьи, которые не удалось загрузить из scrapper, ставятся в очередь анализа (см. JobWorker), чтобы не держать партицию.
+    Если пакет не удалось сохранить, смещения возвращаются к его началу и пакет повторяется через retry_backoff
+    """
+
+    def __init__(self, consumer: Any, analyze: Analyze, session_factory: Callable[[], Any], batch_size: int = 100,
+                 batch_timeout_ms: int = 1000, retry_backoff: float = 5.0):
+        """
+        :param consumer: Consumer с интерфейсом aiokafka: start, stop, getmany, seek, commit
+        :param analyze: Анализ пакета статей с сохранением результатов
+        :param session_factory: Фабрика сессий базы
+        :param batch_size: Максимум событий в пакете
+        :param batch_timeout_ms: Сколько ждать событий, прежде чем обработать неполный пакет
+        :param retry_backoff: Пауза перед повтором пакета, который не удалось обработать, секунд
+        """
+        self.consumer = consumer
+        self.analyze = analyze
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_timeout_ms = batch_timeout_ms
+        self.retry_backoff = retry_backoff
+        self._stop: Optional[asyncio.Event] = None
+
+    async def run_once(self) -> int:
+        """
+        Читает и обрабатывает один пакет событий
+        :return: Число событий, смещения которых зафиксированы
+        :raises Exception: Пакет не обработан, смещения возвращены к его началу
+        """
+        batches = await self.consumer.getmany(timeout_ms=self.batch_timeout_ms, max_records=self.batch_size)
+        batches = {partition: records for partition, records in batches.items() if records}
+        if not batches:
+            return 0
+        records = [record for records in batches.values() for record in records]
+
+        article_ids = []
+        for record in records:
+            article_id = parse_event(record.value)
+            if article_id is None:
+                logger.warning(f"Пропускаем событие без ID статьи: {record.value!r}")
+                metrics.CONSUMED_EVENTS.labels("invalid").inc()
+                continue
+            article_ids.append(article_id)
+        article_ids = list(dict.fromkeys(article_ids))
+        logger.info(f"Получено {len(records)} событий, статей для анализа: {len(article_ids)}")
+
+        try:
+            with tracing.collect() as trace:
+                failed = await self._analyze(article_ids) if article_ids else []
+            metrics.observe_trace(trace)
+        except Exception:
+            # Следующий getmany вернет эти же события
+            for partition, partition_records in batches.items():
+                self.consumer.seek(partition, partition_records[0].offset)
+            raise
+
+        metrics.CONSUMED_EVENTS.labels("analyzed").inc(len(article_ids) - len(failed))
+        metrics.CONSUMED_EVENTS.labels("queued").inc(len(failed))
+        await self.consumer.commit({
+            partition: partition_records[-1].offset + 1 for partition, partition_records in batches.items()
+        })
+        return len(records)
+
+    async def _analyze(self, article_ids: List[int]) -> List[int]:
+        """Анализирует статьи и ставит в очередь анализа те, что не удалось загрузить; возвращает их ID"""
+        with self.session_factory() as db:
+            result = await self.analyze(db, article_ids, False)
+            failed = [error["article_id"] for error in result["errors"]]
+            if failed:
+                logger.warning(f"Статьи {failed} не загружены, ставим их в очередь анализа")
+                await run_in_threadpool(enqueue_jobs, db, failed)
+        return failed
+
+    async def run(self) -> None:
+        """Читает события до вызова stop(); пока брокер недоступен, повторяет подключение через retry_backoff"""
+        self._stop = asyncio.Event()
+        try:
+            while not self._stop.is_set():
+                try:
+                    await self.consumer.start()
+                    logger.info("Чтение событий статей из Kafka запущено")
+                    break
+                except Exception as e:
+                    logger.error(f"Не удалось подключиться к Kafka, повтор через {self.retry_backoff} с: {str(e)}")
+                    await self._backoff()
+            while not self._stop.is_set():
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logger.error(f"Ошибка при обработке событий статей, повтор через {self.retry_backoff} с: {str(e)}")
+                    await self._backoff()
+        finally:
+            await self.consumer.stop()
+            logger.info("Чтение событий статей из Kafka остановлено")
+
+    async def _backoff(self) -> None:
+        try:
+            await asyncio.wait_for(self._stop.wait(), self.retry_backoff)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self) -> None:
+        """Останавливает run() после текущего пакета; смещения необработанных событий не фиксируются"""
+        if self._stop is not None:
+            self._stop.set()
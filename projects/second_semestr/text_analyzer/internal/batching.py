@@ -0,0 +1,132 @@
+from concurrent.futures import Future
+from typing import Any, List, Tuple
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Сигнал фоновому потоку о завершении работы
+_STOP = object()
+
+
+class MicroBatchEncoder:
+    """
+    Планировщик перед моделью: объединяет вызовы encode из разных потоков
+    (запросов /analyze, которые параллельно выполняются в пуле инференса) в общие пакеты.
+
+    Фоновый поток забирает первый ожидающий вызов и добирает следующие, пока в пакете
+    меньше max_batch_size строк и не истекло max_wait_ms с момента первого вызова.
+    Затем пакет кодируется одним вызовом модели, и каждый вызывающий получает
+    свои строки результата через Future. Интерфейс совпадает с SentenceTransformer,
+    поэтому планировщик подставляется в KeywordExtractor вместо модели.
+    """
+
+    def __init__(self, model: Any, max_batch_size: int = 128, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+        # Проверка _closed и постановка в очередь атомарны относительно close(): после _STOP в очереди ничего нет
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="micro-batch-encoder", daemon=True)
+        self._thread.start()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences: List[str], **kwargs) -> np.ndarray:
+        """Ставит строки в очередь и ждет их эмбеддинги"""
+        if not sentences:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Планировщик пакетов остановлен")
+            self._queue.put((list(sentences), future))
+        return future.result()
+
+    def close(self) -> None:
+        """Останавливает фоновый поток, дождавшись обработки уже принятых вызовов"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            # Вызовы, которые поток уже не обработает (например, после неожиданной ошибки), не должны ждать вечно
+            with self._lock:
+                self._closed = True
+            self._fail_pending(RuntimeError("Планировщик пакетов остановлен"))
+
+    def _fail_pending(self, error: Exception) -> None:
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if request is not _STOP:
+                request[1].set_exception(error)
+
+    def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            pending = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+
+            # Добираем вызовы до заполнения пакета или истечения ожидания
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                pending.append(request)
+                size += len(request[0])
+
+            self._flush(pending)
+
+    def _flush(self, pending: List[Tuple[List[str], Future]]) -> None:
+        items = [item for sentences, _ in pending for item in sentences]
+        try:
+            embeddings = np.asarray(self.model.encode(items, batch_size=self.max_batch_size))
+        except Exception as e:
+            logger.error(f"Ошибка при кодировании пакета из {len(items)} строк: {str(e)}")
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(items)
+        offset = 0
+        for sentences, future in pending:
+            future.set_result(embeddings[offset:offset + len(sentences)])
+            offset += len(sentences)
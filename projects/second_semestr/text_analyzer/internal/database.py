@@ -1,53 +1,390 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from .models import Base, Article, Keyword
-from config.config import get_settings
-from typing import List, Dict, Any
+from sqlalchemy import and_, case, create_engine, delete, func, insert, inspect, or_, select, text, update
+from sqlalchemy.orm import defer, joinedload, sessionmaker
+from .models import (
+    ACTIVE_JOB_CONDITION, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, AnalysisJob, Base, Article, Keyword
+)
+from config.config import Settings, get_settings
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
 
 settings = get_settings()
 
-DATABASE_URL = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+def create_db_engine(settings: Settings):
+    """
+    Движок PostgreSQL с пулом соединений из настроек DB_*
+    :raises ValueError: Размер пула или число дополнительных соединений вне допустимых значений
+    """
+    if settings.DB_POOL_SIZE < 1:
+        raise ValueError(f"DB_POOL_SIZE должен быть не меньше 1: {settings.DB_POOL_SIZE}")
+    if settings.DB_MAX_OVERFLOW < -1:
+        raise ValueError(f"DB_MAX_OVERFLOW должен быть не меньше -1 (без ограничения): {settings.DB_MAX_OVERFLOW}")
+    return create_engine(
+        f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}",
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING
+    )
 
-engine = create_engine(DATABASE_URL)
+engine = create_db_engine(settings)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+def upgrade_schema(bind) -> None:
+    """
+    Добавляет в уже существующие таблицы колонки и индексы, появившиеся в моделях позже:
+    create_all создает только отсутствующие таблицы целиком
+    """
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
 
 def get_db():
+    """Зависимость FastAPI: отдельная сессия на каждый запрос"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-def save_article(db, article_id: int, title: str, content: str, keywords: List[Dict[str, Any]]) -> None:
-    """Сохраняет статью и её ключевые слова в базу данных"""
+# Строк в одном многострочном INSERT: держимся ниже лимита параметров SQLite
+INSERT_CHUNK_ROWS = 1000
+
+def _insert(db):
+    """
+    Возвращает insert с поддержкой ON CONFLICT для диалекта текущей базы или None, если диалект его не поддерживает:
+    тогда записи сначала ищутся, а затем вставляются или обновляются отдельными запросами
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    else:
+        return None
+    return upsert
+
+def _save_article_rows(db, rows: List[Dict[str, Any]]) -> None:
+    """
+    Вставляет новые статьи и обновляет существующие: INSERT ... ON CONFLICT (article_id) DO UPDATE, а для баз
+    без него - SELECT существующих ID, затем INSERT и UPDATE по первичному ключу. Без ON CONFLICT одновременная
+    вставка той же статьи другим процессом завершается ошибкой уникальности, и транзакция откатывается
+    """
+    upsert = _insert(db)
+    if upsert is not None:
+        stmt = upsert(Article).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[Article.article_id],
+            set_={
+                "title": stmt.excluded.title,
+                "content": stmt.excluded.content,
+                "embedding": stmt.excluded.embedding,
+                "content_hash": stmt.excluded.content_hash,
+                "model_version": stmt.excluded.model_version,
+                "updated_at": stmt.excluded.updated_at
+            }
+        ))
+        return
+    existing = set(db.scalars(select(Article.article_id).where(Article.article_id.in_([row["article_id"] for row in rows]))))
+    new_rows = [row for row in rows if row["article_id"] not in existing]
+    if new_rows:
+        db.execute(insert(Article).values(new_rows))
+    changed_rows = [row for row in rows if row["article_id"] in existing]
+    if changed_rows:
+        db.execute(update(Article), changed_rows)
+
+def save_article(db, article_id: int, title: str, content: str, keywords: List[Dict[str, Any]],
+                 embedding: Optional[bytes] = None, content_hash: Optional[str] = None,
+                 model_version: Optional[str] = None) -> None:
+    """Сохраняет статью и её ключевые слова в базу данных, заменяя результаты прошлого анализа"""
+    save_articles(db, [{
+        "article_id": article_id,
+        "title": title,
+        "content": content,
+        "keywords": keywords,
+        "embedding": embedding,
+        "content_hash": content_hash,
+        "model_version": model_version
+    }])
+
+def save_articles(db, articles: List[Dict[str, Any]]) -> List[int]:
+    """
+    Сохраняет несколько статей с ключевыми словами в одной транзакции.
+    Статьи вставляются через INSERT ... ON CONFLICT (article_id) DO UPDATE (см. _save_article_rows), ключевые слова
+    уже существующих статей заменяются целиком, поэтому повторный анализ идемпотентен.
+    :param articles: Словари с полями article_id, title, content, keywords и необязательными embedding (байты float32),
+        content_hash и model_version (ключ повторного использования результата, см. find_analyses)
+    :return: ID сохраненных статей
+    """
+    # При повторе ID в одном запросе побеждает последняя версия: ON CONFLICT не обновляет строку дважды
+    by_id = {article["article_id"]: article for article in articles}
+    if not by_id:
+        return []
+    article_ids = list(by_id)
+    updated_at = datetime.utcnow()
+    
     try:
-        # Создаем новую статью
-        article = Article(
-            id=article_id,  # Используем article_id как id
-            article_id=article_id,  # Добавляем article_id
-            title=title,
-            content=content
-        )
-        db.add(article)
-        db.flush()  # Получаем id статьи
+        _save_article_rows(db, [
+            {
+                "id": article_id,  # Используем article_id как id
+                "article_id": article_id,
+                "title": article["title"],
+                "content": article["content"],
+                "embedding": article.get("embedding"),
+                "content_hash": article.get("content_hash"),
+                "model_version": article.get("model_version"),
+                "updated_at": updated_at
+            }
+            for article_id, article in by_id.items()
+        ])
         
-        # Добавляем ключевые слова
-        for keyword in keywords:
-            keyword_obj = Keyword(
-                article_id=article.id,  # Используем id статьи
-                keyword=keyword["keyword"],
-                score=keyword["score"]
-            )
-            db.add(keyword_obj)
+        db.execute(delete(Keyword).where(Keyword.article_id.in_(article_ids)))
+        keyword_rows = [
+            {"article_id": article_id, "keyword": keyword["keyword"], "score": keyword["score"]}
+            for article_id, article in by_id.items()
+            for keyword in article["keywords"]
+        ]
+        for i in range(0, len(keyword_rows), INSERT_CHUNK_ROWS):
+            db.execute(insert(Keyword).values(keyword_rows[i:i + INSERT_CHUNK_ROWS]))
         
         db.commit()
     except Exception as e:
         db.rollback()
         raise e
+    return article_ids
+
+def find_analyses(db, content_hashes: List[str], model_version: str) -> Dict[str, Article]:
+    """
+    Ищет сохраненные результаты анализа того же содержимого той же версией анализа
+    :param content_hashes: Хэши содержимого статей
+    :param model_version: Версия анализа
+    :return: Хэш -> статья с ключевыми словами и эмбеддингом (любая из статей с таким содержимым)
+    """
+    if not content_hashes:
+        return {}
+    articles = db.query(Article).options(joinedload(Article.keywords)).filter(
+        Article.content_hash.in_(set(content_hashes)),
+        Article.model_version == model_version
+    ).all()
+    return {article.content_hash: article for article in articles}
+
+def get_content_hashes(db, article_ids: List[int], model_version: str) -> Dict[int, str]:
+    """Хэши содержимого, с которыми статьи сохранены этой версией анализа: article_id -> хэш"""
+    if not article_ids:
+        return {}
+    rows = db.execute(
+        select(Article.article_id, Article.content_hash).where(
+            Article.article_id.in_(article_ids),
+            Article.model_version == model_version
+        )
+    )
+    return {article_id: content_hash for article_id, content_hash in rows}
+
+def get_article(db, article_id: int) -> Optional[Article]:
+    """Возвращает статью с ключевыми словами или None"""
+    return db.query(Article).options(joinedload(Article.keywords)).filter(Article.article_id == article_id).one_or_none()
 
 def get_all_articles(db):
     """Возвращает все статьи из базы данных с их ключевыми словами"""
-    return db.query(Article).all()
+    return get_articles_page(db)
+
+def get_articles_page(db, limit: Optional[int] = None, after_id: Optional[int] = None,
+                      updated_after: Optional[datetime] = None, include_content: bool = True,
+                      include_embedding: bool = False) -> List[Article]:
+    """
+    Возвращает страницу статей по возрастанию article_id вместе с ключевыми словами.
+    Ключевые слова загружаются тем же запросом (JOIN), а не отдельным запросом на каждую статью.
+    :param limit: Размер страницы, None - все статьи
+    :param after_id: Курсор: вернуть статьи с article_id больше этого значения
+    :param updated_after: Только статьи, сохраненные позже этого момента (UTC)
+    :param include_content: False - не читать из базы тексты статей
+    :param include_embedding: True - читать эмбеддинги статей
+    """
+    query = db.query(Article).options(joinedload(Article.keywords)).order_by(Article.article_id)
+    if not include_content:
+        query = query.options(defer(Article.content))
+    if not include_embedding:
+        query = query.options(defer(Article.embedding))
+    if after_id is not None:
+        query = query.filter(Article.article_id > after_id)
+    if updated_after is not None:
+        query = query.filter(Article.updated_at > updated_after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+def iter_articles(db, page_size: int = 500, after_id: Optional[int] = None,
+                  updated_after: Optional[datetime] = None, include_content: bool = True,
+                  include_embedding: bool = False) -> Iterator[Article]:
+    """
+    Лениво обходит все статьи страницами по page_size.
+    Прочитанные страницы удаляются из сессии, поэтому память не растет вместе с числом статей.
+    """
+    while True:
+        page = get_articles_page(db, limit=page_size, after_id=after_id, updated_after=updated_after,
+                                 include_content=include_content, include_embedding=include_embedding)
+        if not page:
+            return
+        yield from page
+        after_id = page[-1].article_id
+        db.expunge_all()
+
+def enqueue_jobs(db, article_ids: List[int], force: bool = False) -> List[Tuple[AnalysisJob, bool]]:
+    """
+    Ставит статьи в очередь анализа. Если у статьи уже есть задача в очереди или в работе, новая не создается
+    и возвращается существующая (уникальный частичный индекс защищает и от одновременной постановки).
+    force=true переводит в повторный анализ и уже ожидающую задачу статьи
+    :return: Пары (задача, создана ли новая) в порядке article_ids без повторов
+    """
+    article_ids = list(dict.fromkeys(article_ids))
+    if not article_ids:
+        return []
+    upsert = _insert(db)
+    now = datetime.utcnow()
+    try:
+        active = set(db.scalars(
+            select(AnalysisJob.article_id).where(AnalysisJob.article_id.in_(article_ids), ACTIVE_JOB_CONDITION)
+        ))
+        new_ids = [article_id for article_id in article_ids if article_id not in active]
+        if new_ids:
+            rows = [
+                {"article_id": article_id, "force": force, "status": JOB_QUEUED, "attempts": 0, "created_at": now}
+                for article_id in new_ids
+            ]
+            if upsert is not None:
+                db.execute(upsert(AnalysisJob).values(rows).on_conflict_do_nothing(
+                    index_elements=[AnalysisJob.article_id], index_where=ACTIVE_JOB_CONDITION
+                ))
+            else:
+                # Без ON CONFLICT одновременная постановка той же статьи завершится ошибкой уникального индекса
+                db.execute(insert(AnalysisJob).values(rows))
+        if force and active:
+            db.execute(update(AnalysisJob).where(
+                AnalysisJob.article_id.in_(active), AnalysisJob.status == JOB_QUEUED
+            ).values(force=True))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+    # Последняя задача каждой статьи: ожидающая, выполняемая или уже завершенная воркером за это время
+    latest = select(func.max(AnalysisJob.id)).where(AnalysisJob.article_id.in_(article_ids)).group_by(AnalysisJob.article_id)
+    jobs = {job.article_id: job for job in db.scalars(select(AnalysisJob).where(AnalysisJob.id.in_(latest)))}
+    return [(jobs[article_id], article_id not in active) for article_id in article_ids]
+
+def get_job(db, job_id: int) -> Optional[AnalysisJob]:
+    """Возвращает задачу с актуальным состоянием из базы (а не из identity map сессии) или None"""
+    return db.get(AnalysisJob, job_id, populate_existing=True)
+
+def count_jobs(db) -> Dict[str, int]:
+    """Число задач очереди по статусам"""
+    rows = db.execute(select(AnalysisJob.status, func.count()).group_by(AnalysisJob.status))
+    return {status: count for status, count in rows}
+
+def claim_jobs(db, worker: str, limit: int, lease_seconds: float, max_attempts: int) -> List[Any]:
+    """
+    Забирает до limit задач из очереди одним UPDATE: ожидающие и выполняемые воркерами, чья аренда истекла
+    (воркер упал или завис). В PostgreSQL строки выбираются через FOR UPDATE SKIP LOCKED, поэтому воркеры
+    не ждут друг друга и не получают одну задачу дважды; SQLite выполняет записи по одной и без этого.
+    Задачи с истекшей арендой и исчерпанными попытками помечаются неудачными
+    :return: Строки с полями id, article_id, force, attempts и created_at
+    """
+    now = datetime.utcnow()
+    expired = and_(AnalysisJob.status == JOB_RUNNING, AnalysisJob.lease_until < now)
+    try:
+        db.execute(update(AnalysisJob).where(expired, AnalysisJob.attempts >= max_attempts).values(
+            status=JOB_FAILED, error="Воркер не завершил задачу за отведенное время",
+            lease_until=None, finished_at=now
+        ))
+        claimable = select(AnalysisJob.id).where(
+            or_(AnalysisJob.status == JOB_QUEUED, expired),
+            AnalysisJob.attempts < max_attempts
+        ).order_by(AnalysisJob.id).limit(limit).with_for_update(skip_locked=True)
+        rows = db.execute(update(AnalysisJob).where(AnalysisJob.id.in_(claimable)).values(
+            status=JOB_RUNNING,
+            worker=worker,
+            attempts=AnalysisJob.attempts + 1,
+            started_at=now,
+            lease_until=now + timedelta(seconds=lease_seconds)
+        ).returning(
+            AnalysisJob.id, AnalysisJob.article_id, AnalysisJob.force, AnalysisJob.attempts, AnalysisJob.created_at
+        ).execution_options(synchronize_session=False)).all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    return sorted(rows, key=lambda row: row.id)
+
+def finish_jobs(db, worker: str, job_ids: List[int]) -> int:
+    """
+    Отмечает задачи выполненными. Задачи, которые после истечения аренды забрал другой воркер, не меняются
+    :return: Число отмеченных задач
+    """
+    if not job_ids:
+        return 0
+    try:
+        result = db.execute(update(AnalysisJob).where(
+            AnalysisJob.id.in_(job_ids), AnalysisJob.worker == worker, AnalysisJob.status == JOB_RUNNING
+        ).values(
+            status=JOB_DONE, error=None, lease_until=None, finished_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    return result.rowcount
+
+def release_jobs(db, worker: str, job_ids: List[int]) -> None:
+    """Возвращает задачи в очередь без траты попытки: анализ не начинался (например, модель еще загружается)"""
+    if not job_ids:
+        return
+    try:
+        db.execute(update(AnalysisJob).where(
+            AnalysisJob.id.in_(job_ids), AnalysisJob.worker == worker, AnalysisJob.status == JOB_RUNNING
+        ).values(
+            status=JOB_QUEUED, attempts=AnalysisJob.attempts - 1, lease_until=None
+        ).execution_options(synchronize_session=False))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+def retry_jobs(db, worker: str, errors: Dict[int, str], max_attempts: int) -> Dict[int, str]:
+    """
+    Возвращает задачи в очередь после ошибки, а задачи с исчерпанными попытками отмечает неудачными
+    :param errors: ID задачи -> текст ошибки
+    :return: ID задачи -> новый статус
+    """
+    statuses = {}
+    now = datetime.utcnow()
+    exhausted = AnalysisJob.attempts >= max_attempts
+    try:
+        for job_id, error in errors.items():
+            row = db.execute(update(AnalysisJob).where(
+                AnalysisJob.id == job_id, AnalysisJob.worker == worker, AnalysisJob.status == JOB_RUNNING
+            ).values(
+                status=case((exhausted, JOB_FAILED), else_=JOB_QUEUED),
+                finished_at=case((exhausted, now), else_=None),
+                error=error,
+                lease_until=None
+            ).returning(AnalysisJob.status).execution_options(synchronize_session=False)).first()
+            if row is not None:
+                statuses[job_id] = row.status
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    return statuses
@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import threading
+import unicodedata
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+INDEX_FILE = "index.json"
+
+
+class EmbeddingCache:
+    """
+    Ограниченный LRU-кэш эмбеддингов токенов.
+
+    Векторы лежат в одной матрице float32 (capacity, dim): строки вытесненных
+    токенов переиспользуются. Если указан path, матрица открывается как
+    memory-mapped файл, а порядок токенов сохраняется в index.json рядом с ней,
+    так что кэш переживает перезапуск сервиса. Вместе с индексом сохраняются модель
+    и размерность: кэш другой модели при загрузке отбрасывается.
+    """
+
+    def __init__(self, capacity: int, path: Optional[str] = None, flush_every: int = 1000,
+                 model: Optional[str] = None):
+        """
+        :param model: Модель, которой построены эмбеддинги (см. model_version); кэш на диске от другой модели не загружается
+        """
+        if capacity <= 0:
+            raise ValueError("Размер кэша эмбеддингов должен быть положительным")
+        self.capacity = capacity
+        self.path = path
+        self.flush_every = flush_every
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+
+        # token -> номер строки в self._vectors, от давно использованных к недавним
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._free_rows: List[int] = []
+        self._unflushed = 0
+        self._index_file_valid = False
+        self._lock = threading.Lock()
+
+        if path:
+            self._load()
+
+    @staticmethod
+    def normalize(token: str) -> str:
+        """Ключ кэша: токен в NFC без пробелов по краям и в нижнем регистре"""
+        return unicodedata.normalize("NFC", token).strip().lower()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, tokens: List[str], out: np.ndarray) -> List[int]:
+        """
+        Копирует найденные эмбеддинги в строки out
+        :param tokens: Нормализованные токены
+        :param out: Буфер (len(tokens), dim), в который пишутся попадания
+        :return: Позиции токенов, которых нет в кэше
+        """
+        missing = []
+        with self._lock:
+            for i, token in enumerate(tokens):
+                row = self._index.get(token)
+                if row is None:
+                    missing.append(i)
+                    continue
+                self._index.move_to_end(token)
+                out[i] = self._vectors[row]
+            self.hits += len(tokens) - len(missing)
+            self.misses += len(missing)
+        return missing
+
+    def put_many(self, tokens: List[str], embeddings: np.ndarray) -> None:
+        """
+        Кладет эмбеддинги в кэш, вытесняя самые старые токены при переполнении
+        :param tokens: Нормализованные токены
+        :param embeddings: Матрица (len(tokens), dim)
+        """
+        with self._lock:
+            if self._vectors is None:
+                self._allocate(embeddings.shape[1])
+            for token, embedding in zip(tokens, embeddings):
+                row = self._index.get(token)
+                if row is None:
+                    row = self._take_row()
+                    self._index[token] = row
+                else:
+                    self._index.move_to_end(token)
+                self._vectors[row] = embedding
+            self._unflushed += len(tokens)
+            if self.path and self._unflushed >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Сбрасывает матрицу и индекс на диск (для кэша в памяти ничего не делает)"""
+        if not self.path:
+            return
+        with self._lock:
+            self._flush_locked()
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики для подбора размера кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._index),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def ensure_dim(self, dim: int) -> None:
+        """Отбрасывает загруженные эмбеддинги, если их размерность не совпадает с размерностью текущей модели"""
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] == dim:
+                return
+            logger.warning(
+                f"Кэш эмбеддингов в {self.path} построен для размерности {self._vectors.shape[1]}, "
+                f"у модели {dim}, начинаем с пустого"
+            )
+            self._index.clear()
+            self._vectors = None
+            self._free_rows = []
+            self._unflushed = 0
+            if self.path:
+                self._invalidate_index_file()
+
+    def _take_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        # Кэш заполнен: вытесняем давно не использованный токен
+        _, row = self._index.popitem(last=False)
+        if self._index_file_valid:
+            # Строка будет перезаписана, а сохраненный индекс еще указывает на старый токен:
+            # до следующего сброса индекс на диске недействителен
+            self._invalidate_index_file()
+        return row
+
+    def _allocate(self, dim: int) -> None:
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            self._vectors = np.lib.format.open_memmap(
+                os.path.join(self.path, VECTORS_FILE), mode="w+", dtype=np.float32, shape=(self.capacity, dim)
+            )
+        else:
+            self._vectors = np.empty((self.capacity, dim), dtype=np.float32)
+        self._free_rows = list(range(self.capacity - 1, -1, -1))
+
+    def _load(self) -> None:
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(index_path)):
+            return
+
+        try:
+            vectors = np.load(vectors_path, mmap_mode="r+")
+            with open(index_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось загрузить кэш эмбеддингов из {self.path}: {str(e)}")
+            return
+
+        if vectors.shape[0] != self.capacity or vectors.dtype != np.float32:
+            logger.warning(f"Кэш эмбеддингов в {self.path} создан с другим размером, начинаем с пустого")
+            return
+        if index.get("model") != self.model or index.get("dim") != vectors.shape[1]:
+            logger.warning(
+                f"Кэш эмбеддингов в {self.path} построен моделью {index.get('model')}, "
+                f"а не {self.model}, начинаем с пустого"
+            )
+            return
+
+        self._vectors = vectors
+        self._index = OrderedDict((token, row) for token, row in index["entries"])
+        used = set(self._index.values())
+        self._free_rows = [row for row in range(self.capacity - 1, -1, -1) if row not in used]
+        self._index_file_valid = True
+        logger.info(f"Загружено {len(self._index)} эмбеддингов из кэша {self.path}")
+
+    def _invalidate_index_file(self) -> None:
+        try:
+            os.remove(os.path.join(self.path, INDEX_FILE))
+        except FileNotFoundError:
+            pass
+        self._index_file_valid = False
+
+    def _flush_locked(self) -> None:
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        index_path = os.path.join(self.path, INDEX_FILE)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "model": self.model,
+                "dim": self._vectors.shape[1],
+                "entries": list(self._index.items())
+            }, file, ensure_ascii=False)
+        os.replace(tmp_path, index_path)
+        self._unflushed = 0
+        self._index_file_valid = True
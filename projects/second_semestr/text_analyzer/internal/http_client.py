@@ -0,0 +1,190 @@
+from typing import Optional
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых запрос имеет смысл повторить
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Автомат разомкнут: сервис недавно отвечал ошибками, запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель для вызовов другого сервиса.
+    После failure_threshold ошибок подряд размыкается на reset_timeout секунд: вызовы сразу
+    отклоняются, не занимая воркеры ожиданием медленного сервиса. Затем пропускает пробный
+    вызов (half-open): успех замыкает автомат, ошибка снова размыкает.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probe_in_flight:
+                raise CircuitOpenError("Сервис временно недоступен, автомат разомкнут")
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probe_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Автомат разомкнут после {self._failures} ошибок подряд")
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def record_cancelled(self) -> None:
+        """Вызов отменен, не дождавшись ответа: об исправности сервиса это ничего не говорит, пробный вызов освобождается"""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Экспоненциальная задержка перед повтором с полным случайным разбросом (full jitter)"""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def _is_retryable(response: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+    if error is not None:
+        return isinstance(error, httpx.TransportError)
+    return response.status_code in RETRYABLE_STATUS_CODES
+
+
+class ResilientHttpClient:
+    """
+    Пул keep-alive соединений к одному сервису с таймаутами, ограниченными повторами
+    с разбросом и автоматическим выключателем. Синхронный и асинхронный клиенты
+    создаются лениво и используют общий автомат.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10.0, connect_timeout: float = 3.0,
+                 max_connections: int = 20, retries: int = 2, backoff_base: float = 0.2,
+                 backoff_max: float = 2.0, breaker: Optional[CircuitBreaker] = None,
+                 transport: Optional[httpx.BaseTransport] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._client_kwargs = {
+            "base_url": self.base_url,
+            "timeout": httpx.Timeout(timeout, connect=connect_timeout),
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        }
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(transport=self._transport, **self._client_kwargs)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(transport=self._async_transport, **self._client_kwargs)
+        return self._async_client
+
+    def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            response, error = None, None
+            self.breaker.before_call()
+            try:
+                response = self.client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                error = e
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Отмена запроса (CancelledError) или остановка процесса
+                self.breaker.record_cancelled()
+                raise
+            if not self._record(response, error, attempt):
+                return self._result(response, error)
+            time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+    async def arequest(self, method: str, path: str, **kwargs) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            response, error = None, None
+            self.breaker.before_call()
+            try:
+                response = await self.async_client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                error = e
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Отмена запроса (CancelledError) или остановка процесса
+                self.breaker.record_cancelled()
+                raise
+            if not self._record(response, error, attempt):
+                return self._result(response, error)
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+    def _record(self, response: Optional[httpx.Response], error: Optional[Exception], attempt: int) -> bool:
+        """
+        Учитывает результат в автомате: любая ошибка запроса и ответы 502/503/504 - отказ, остальные ответы - успех
+        :return: True - запрос нужно повторить
+        """
+        if error is None and response.status_code not in RETRYABLE_STATUS_CODES:
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        if not _is_retryable(response, error) or attempt >= self.retries:
+            return False
+        reason = str(error) if error is not None else f"статус {response.status_code}"
+        logger.warning(f"Запрос к {self.base_url} не удался ({reason}), повтор {attempt + 1} из {self.retries}")
+        return True
+
+    @staticmethod
+    def _result(response: Optional[httpx.Response], error: Optional[Exception]) -> httpx.Response:
+        if error is not None:
+            raise error
+        return response
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+        self.close()
@@ -0,0 +1,250 @@
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+from .tracing import Trace, collect, current_trace
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ("thread", "process")
+# Когда загружать модель: при создании пула, в фоне при старте приложения или при первой задаче
+MODEL_LOAD_MODES = ("eager", "background", "lazy")
+
+# Экстрактор внутри процесса-воркера (режим "process"), создается инициализатором пула
+_process_extractor = None
+
+
+def _init_process_extractor(extractor_factory: Callable[[], Any], warmup: bool) -> None:
+    # Инициализатор выполняется в каждом процессе до его первой задачи, поэтому задачи
+    # никогда не попадают в процесс с незагруженной или непрогретой моделью
+    global _process_extractor
+    _process_extractor = extractor_factory()
+    if warmup:
+        _process_extractor.warmup()
+
+
+def _call_process_extractor(method: str, *args, **kwargs) -> Any:
+    return getattr(_process_extractor, method)(*args, **kwargs)
+
+
+def _process_extractor_ready() -> None:
+    # Пустая задача: выполняется только после инициализатора процесса
+    return None
+
+
+def _timed_call(fn: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Any, float, float, Trace]:
+    # time.time, а не perf_counter: отметки сравниваются между процессами.
+    # Этапы задачи собираются в отдельную трассу и возвращаются вместе с результатом
+    started = time.time()
+    with collect() as trace:
+        result = fn(*args, **kwargs)
+    return result, started, time.time(), trace
+
+
+class PoolSaturatedError(Exception):
+    """Очередь пула инференса заполнена, новая задача не принята"""
+
+
+class ModelNotReadyError(Exception):
+    """Модель не загрузилась за отведенное время или загрузка завершилась ошибкой"""
+
+
+@dataclass
+class InferenceTiming:
+    queue_wait_ms: float
+    inference_ms: float
+    # Этапы внутри задачи (кодирование, сходство); в ответ API не входят
+    trace: Optional[Trace] = None
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"queue_wait_ms": round(self.queue_wait_ms, 2), "inference_ms": round(self.inference_ms, 2)}
+
+
+class InferencePool:
+    """
+    Выполняет блокирующий инференс KeywordExtractor вне event loop.
+
+    В режиме "thread" один экстрактор разделяется потоками пула, в режиме "process"
+    каждый процесс-воркер создает свой экстрактор через extractor_factory
+    (фабрика должна сериализоваться pickle). Число принятых, но не завершенных задач
+    ограничено workers + max_queue: сверх этого run() сразу бросает PoolSaturatedError.
+
+    С lazy=True модель не загружается в конструкторе: загрузку запускает start_loading()
+    (например, при старте приложения) или первый вызов run(), который ждет ее не дольше load_timeout.
+    """
+
+    def __init__(self, extractor_factory: Callable[[], Any], kind: str = "thread", workers: int = 1,
+                 max_queue: int = 16, lazy: bool = False, warmup: bool = False, load_timeout: float = 60.0):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Неизвестный тип пула инференса: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.capacity = workers + max_queue
+
+        self.warmup = warmup
+        self.load_timeout = load_timeout
+
+        self.extractor = None
+        self._extractor_factory = extractor_factory
+        self._executor: Executor
+        if kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        else:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_process_extractor, initargs=(extractor_factory, warmup)
+            )
+
+        # Загрузка модели: None - не начиналась, иначе Future с ее результатом
+        self._loading: Optional[Future] = None
+        self._load_lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._inference_total = 0.0
+
+        if not lazy:
+            self.start_loading().result()
+
+    @property
+    def ready(self) -> bool:
+        """Модель загружена (и прогрета), задачи выполняются без ожидания загрузки"""
+        loading = self._loading
+        return loading is not None and loading.done() and loading.exception() is None
+
+    def start_loading(self) -> Future:
+        """
+        Запускает загрузку модели в отдельном потоке, если она еще не идет и не завершилась успешно.
+        После ошибки следующий вызов пробует загрузить модель заново
+        :return: Future, завершающийся после загрузки
+        """
+        with self._load_lock:
+            loading = self._loading
+            if loading is None or (loading.done() and loading.exception() is not None):
+                loading = self._loading = Future()
+                threading.Thread(target=self._load, args=(loading,), name="model-loader", daemon=True).start()
+            return loading
+
+    def _load(self, loading: Future) -> None:
+        started = time.perf_counter()
+        try:
+            if self.kind == "thread":
+                extractor = self._extractor_factory()
+                if self.warmup:
+                    extractor.warmup()
+                self.extractor = extractor
+            else:
+                # Процессы запускаются при отправке задач; каждый загружает и прогревает модель в инициализаторе,
+                # так что пустые задачи по числу процессов завершаются, когда модель готова
+                futures = [self._executor.submit(_process_extractor_ready) for _ in range(self.workers)]
+                for future in futures:
+                    future.result()
+        except BaseException as e:
+            logger.error(f"Ошибка при загрузке модели: {str(e)}")
+            loading.set_exception(e)
+            return
+        self.load_seconds = time.perf_counter() - started
+        logger.info(f"Модель загружена за {self.load_seconds:.2f} с")
+        loading.set_result(None)
+
+    def model_status(self) -> Dict[str, Any]:
+        """Состояние загрузки модели: not_loaded, loading, ready или failed"""
+        loading = self._loading
+        if loading is None:
+            state, error = "not_loaded", None
+        elif not loading.done():
+            state, error = "loading", None
+        elif loading.exception() is not None:
+            state, error = "failed", str(loading.exception())
+        else:
+            state, error = "ready", None
+        return {
+            "state": state,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup": self.warmup,
+            "error": error
+        }
+
+    async def _wait_until_loaded(self) -> None:
+        loading = self.start_loading()
+        try:
+            # shield: отмена ожидания по таймауту не должна отменять саму загрузку
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(loading)), self.load_timeout)
+        except asyncio.TimeoutError:
+            raise ModelNotReadyError(f"Модель загружается дольше {self.load_timeout} с")
+        except Exception as e:
+            raise ModelNotReadyError(f"Модель не загружена: {str(e)}") from e
+
+    async def run(self, method: str, *args, **kwargs) -> Tuple[Any, InferenceTiming]:
+        """
+        Вызывает метод экстрактора в пуле
+        :param method: Имя метода KeywordExtractor
+        :return: Результат метода и время ожидания в очереди и инференса (включая ожидание загрузки модели)
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise PoolSaturatedError(f"Очередь инференса заполнена ({self.capacity} задач)")
+            self._in_flight += 1
+
+        submitted = time.time()
+        try:
+            if not self.ready:
+                await self._wait_until_loaded()
+            if self.kind == "thread":
+                fn, call_args = getattr(self.extractor, method), args
+            else:
+                fn, call_args = _call_process_extractor, (method,) + args
+            future = self._executor.submit(_timed_call, fn, call_args, kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Слот освобождается, когда задача действительно завершилась,
+        # даже если ожидавший ее запрос уже отменен
+        future.add_done_callback(lambda _: self._release())
+        result, started, finished, trace = await asyncio.wrap_future(future)
+
+        timing = InferenceTiming(
+            queue_wait_ms=max(0.0, started - submitted) * 1000,
+            inference_ms=(finished - started) * 1000,
+            trace=trace
+        )
+        request_trace = current_trace()
+        if request_trace is not None:
+            request_trace.add("inference_queue", timing.queue_wait_ms / 1000)
+            request_trace.merge(trace)
+        with self._lock:
+            self._completed += 1
+            self._queue_wait_total += timing.queue_wait_ms
+            self._inference_total += timing.inference_ms
+        return result, timing
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_queue_wait_ms": round(self._queue_wait_total / completed, 2) if completed else 0.0,
+                "avg_inference_ms": round(self._inference_total / completed, 2) if completed else 0.0,
+                "model": self.model_status(),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
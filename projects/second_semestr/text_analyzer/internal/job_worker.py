@@ -0,0 +1,128 @@
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+
+from . import metrics, tracing
+from .database import claim_jobs, finish_jobs, release_jobs, retry_jobs
+from .models import JOB_FAILED
+
+logger = logging.getLogger(__name__)
+
+# Анализ пакета статей: (сессия, article_ids, force) -> словарь с errors - списком {"article_id", "detail"}
+# для статей, которые не удалось проанализировать
+Analyze = Callable[[Any, List[int], bool], Awaitable[Dict[str, Any]]]
+
+
+def worker_name() -> str:
+    """Уникальное имя воркера: хост, процесс и случайный суффикс на случай нескольких воркеров в процессе"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobWorker:
+    """
+    Воркер очереди анализа: забирает из таблицы analysis_jobs пакет задач и анализирует статьи пакета вместе,
+    как /analyze/batch. Воркеры не связаны с процессом API и между собой, поэтому их можно запускать
+    сколько угодно (python -m api.worker) - задачи распределяет база.
+    Ошибка статьи возвращает ее задачу в очередь до max_attempts попыток; ошибки из transient_errors
+    (очередь инференса заполнена, модель еще загружается) возвращают задачи без траты попытки
+    """
+
+    def __init__(self, analyze: Analyze, session_factory: Callable[[], Any], batch_size: int = 32,
+                 poll_interval: float = 0.5, lease_seconds: float = 300.0, max_attempts: int = 3,
+                 transient_errors: Tuple[type, ...] = (), name: Optional[str] = None):
+        """
+        :param analyze: Анализ пакета статей с сохранением результатов
+        :param session_factory: Фабрика сессий базы с очередью
+        :param batch_size: Сколько задач забирать за раз
+        :param poll_interval: Пауза перед следующим опросом, когда очередь пуста, секунд
+        :param lease_seconds: Срок аренды задачи: если воркер не завершил ее за это время, задачу заберет другой
+        :param max_attempts: Попыток на задачу, после чего она отмечается неудачной
+        """
+        self.analyze = analyze
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.transient_errors = transient_errors
+        self.name = name or worker_name()
+        self._stop: Optional[asyncio.Event] = None
+
+    async def run_once(self) -> int:
+        """
+        Забирает и выполняет один пакет задач
+        :return: Число выполненных или возвращенных с ошибкой задач; 0 - очередь пуста или задачи отложены
+        """
+        with self.session_factory() as db:
+            jobs = await run_in_threadpool(
+                claim_jobs, db, self.name, self.batch_size, self.lease_seconds, self.max_attempts
+            )
+            if not jobs:
+                return 0
+            claimed_at = datetime.utcnow()
+            for job in jobs:
+                metrics.JOB_QUEUE_WAIT.observe(max(0.0, (claimed_at - job.created_at).total_seconds()))
+            logger.info(f"Воркер {self.name} взял {len(jobs)} задач")
+
+            processed = 0
+            with tracing.collect() as trace:
+                # force не смешивается в одном пакете: статьи без force могут взять готовый результат
+                for force in (False, True):
+                    group = [job for job in jobs if job.force == force]
+                    if group:
+                        processed += await self._process(db, group, force)
+            metrics.observe_trace(trace)
+        return processed
+
+    async def _process(self, db, jobs: List[Any], force: bool) -> int:
+        job_ids = {job.article_id: job.id for job in jobs}
+        try:
+            result = await self.analyze(db, list(job_ids), force)
+        except self.transient_errors as e:
+            logger.warning(f"Анализ отложен, задачи возвращены в очередь: {str(e)}")
+            await run_in_threadpool(release_jobs, db, self.name, list(job_ids.values()))
+            return 0
+        except Exception as e:
+            logger.error(f"Ошибка при анализе пакета задач: {str(e)}")
+            db.rollback()
+            errors = {job.id: str(e) for job in jobs}
+        else:
+            errors = {job_ids[error["article_id"]]: error["detail"] for error in result["errors"]}
+
+        finished = await run_in_threadpool(
+            finish_jobs, db, self.name, [job.id for job in jobs if job.id not in errors]
+        )
+        statuses = await run_in_threadpool(retry_jobs, db, self.name, errors, self.max_attempts)
+        metrics.JOBS.labels("done").inc(finished)
+        for status in statuses.values():
+            metrics.JOBS.labels("failed" if status == JOB_FAILED else "retried").inc()
+        logger.info(f"Выполнено {finished} задач, с ошибкой {len(statuses)}")
+        return len(jobs)
+
+    async def run(self) -> None:
+        """Разбирает очередь до вызова stop(); пока задач нет, опрашивает базу раз в poll_interval"""
+        self._stop = asyncio.Event()
+        logger.info(f"Воркер очереди анализа {self.name} запущен")
+        while not self._stop.is_set():
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.error(f"Ошибка воркера очереди анализа: {str(e)}")
+                processed = 0
+            if processed == 0:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info(f"Воркер очереди анализа {self.name} остановлен")
+
+    def stop(self) -> None:
+        """Останавливает run() после текущего пакета; незавершенные задачи заберут другие воркеры по истечении аренды"""
+        if self._stop is not None:
+            self._stop.set()
@@ -1,19 +1,347 @@
-from typing import List, Tuple
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import numpy as np
+import heapq
+import os
 import re
 import logging
+import time
+
+from .batching import MicroBatchEncoder
+from .embedding_cache import EmbeddingCache
+from .tracing import count, span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Режимы подсчета сходства слов с предложениями:
+# "matrix" - одно матричное умножение по нормированным эмбеддингам,
+# "pairwise" - исходный вариант с cosine_similarity для каждого слова
+SCORING_MODES = ("matrix", "pairwise")
+
+MODEL_NAME = 'cointegrated/rubert-tiny2'
+# Бэкенды инференса на CPU:
+# "torch" - исходная модель PyTorch в fp32,
+# "torch-int8" - динамическое квантование линейных слоев в int8 средствами PyTorch,
+# "onnx" - модель, экспортированная в ONNX Runtime (нужен optimum[onnxruntime])
+MODEL_BACKENDS = ("torch", "torch-int8", "onnx")
+# Сколько ключевых слов входит в текст для эмбеддинга статьи
+EMBEDDING_KEYWORDS = 10
+# Виды кодируемых строк (этапы трассы encode_<вид>) и их названия в логах
+ENCODE_LABELS = {"sentences": "предложений", "words": "слов", "texts": "текстов"}
+# Текст для прогрева модели: проходит те же этапы, что и настоящая статья
+WARMUP_TEXT = "C++ предоставляет потоки и мьютексы. Синхронизация защищает общие данные от гонок."
+
+
+def model_version(model_path: Optional[str] = None, backend: str = "torch", onnx_file: Optional[str] = None) -> str:
+    """Название модели и способ ее выполнения: от них зависят оценки ключевых слов и эмбеддинги"""
+    parts = [os.path.basename(model_path.rstrip("/")) if model_path else MODEL_NAME, backend]
+    if backend == "onnx" and onnx_file:
+        parts.append(onnx_file)
+    return ":".join(parts)
+
+
+def load_model(model_path: Optional[str] = None, backend: str = "torch", threads: int = 0,
+               onnx_file: Optional[str] = None):
+    """
+    Загружает SentenceTransformer. torch и sentence_transformers импортируются здесь, а не при импорте
+    модуля, чтобы приложение и тесты, которым модель не нужна, не тратили на них время
+    :param model_path: Каталог с сохраненной моделью (SentenceTransformer.save), загрузка без сети;
+        None - MODEL_NAME из кэша HuggingFace
+    :param backend: Бэкенд инференса из MODEL_BACKENDS
+    :param threads: Потоков внутри одной операции (intra-op) у torch или ONNX Runtime, 0 - по умолчанию библиотеки
+    :param onnx_file: Файл модели ONNX относительно каталога модели (например, квантованный
+        onnx/model_qint8_avx512_vnni.onnx), None - onnx/model.onnx; без него модель экспортируется при загрузке
+    """
+    from sentence_transformers import SentenceTransformer
+
+    name = model_path or MODEL_NAME
+    if backend == "onnx":
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        if threads > 0:
+            session_options.intra_op_num_threads = threads
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+        if onnx_file:
+            model_kwargs["file_name"] = onnx_file
+        return SentenceTransformer(name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    import torch
+
+    if threads > 0:
+        # Настройка процесса: в режиме пула "process" у каждого воркера свои потоки
+        torch.set_num_threads(threads)
+    if backend == "torch-int8":
+        # Веса линейных слоев хранятся в int8, активации квантуются на лету; работает только на CPU
+        model = SentenceTransformer(name, device="cpu")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return SentenceTransformer(name)
+
+
+def normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Нормирует строки матрицы эмбеддингов на месте
+    :param embeddings: Матрица float32 размера (n, dim)
+    :return: Та же матрица с единичными строками (нулевые строки остаются нулевыми)
+    """
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.maximum(norms, np.finfo(embeddings.dtype).tiny, out=norms)
+    embeddings /= norms
+    return embeddings
+
+
+def max_similarities(word_embeddings: np.ndarray, sentence_embeddings: np.ndarray) -> np.ndarray:
+    """
+    Максимальное косинусное сходство каждого слова с любым предложением за одно умножение матриц.
+    Матрицы нормируются на месте, поэтому передавать нужно собственные буферы.
+    :param word_embeddings: Эмбеддинги слов (n_words, dim)
+    :param sentence_embeddings: Эмбеддинги предложений (n_sentences, dim)
+    :return: Вектор длины n_words
+    """
+    normalize_rows(word_embeddings)
+    normalize_rows(sentence_embeddings)
+    return (word_embeddings @ sentence_embeddings.T).max(axis=1)
+
+
+def max_similarities_pairwise(word_embeddings: np.ndarray, sentence_embeddings: np.ndarray) -> np.ndarray:
+    """
+    То же, что max_similarities, но с отдельным вызовом cosine_similarity для каждого слова
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    similarities = np.zeros(len(word_embeddings))
+    for i, word_emb in enumerate(word_embeddings):
+        # Находим максимальное сходство слова с любым предложением
+        word_similarities = cosine_similarity([word_emb], sentence_embeddings)[0]
+        similarities[i] = np.max(word_similarities)
+    return similarities
+
+
+def embedding_text(title: str, keywords: List[str]) -> str:
+    """
+    Текст, по которому строится эмбеддинг статьи: заголовок и ключевые слова.
+    По форме он похож на описание темы роадмапа (заголовок и список подтем)
+    и не требует повторного кодирования всего текста статьи
+    """
+    return f"{title}. {', '.join(keywords[:EMBEDDING_KEYWORDS])}"
+
+
+def split_unique_words(text: str) -> List[str]:
+    """
+    Разбивает текст на слова длиннее двух символов без учета пунктуации.
+    Дубликаты (без учета регистра) удаляются с сохранением порядка первого вхождения.
+    """
+    unique_words = []
+    seen = set()
+    for word in re.findall(r'\w+', text, flags=re.UNICODE):
+        if word.lower() not in seen and len(word) > 2:  # игнорируем короткие слова
+            seen.add(word.lower())
+            unique_words.append(word)
+    return unique_words
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Лениво разбивает текст на непустые предложения по знакам [.!?]"""
+    for match in re.finditer(r'[^.!?]+', text):
+        sentence = match.group().strip()
+        if sentence:
+            yield sentence
+
+
+def iter_sentence_windows(text: str, window_sentences: int) -> Iterator[List[str]]:
+    """Группирует предложения текста в окна не более чем по window_sentences штук"""
+    window = []
+    for sentence in iter_sentences(text):
+        window.append(sentence)
+        if len(window) == window_sentences:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def merge_scores(best: Dict[str, Tuple[str, float]], words: List[str], similarities: np.ndarray) -> None:
+    """
+    Объединяет оценки слов по максимуму
+    :param best: слово в нижнем регистре -> (слово в форме первого вхождения, лучшая оценка)
+    :param words: Слова окна
+    :param similarities: Оценки слов окна
+    """
+    for word, score in zip(words, similarities.tolist()):
+        key = word.lower()
+        current = best.get(key)
+        if current is None:
+            best[key] = (word, score)
+        elif score > current[1]:
+            best[key] = (current[0], score)
+
+
+def top_keywords(best: Dict[str, Tuple[str, float]], top_n: int) -> List[Tuple[str, int]]:
+    """Переводит оценки в 0-100 (только >=0) и возвращает top_n лучших слов"""
+    keywords = [(word, int(max(0, score * 100))) for word, score in best.values()]
+    keywords.sort(key=lambda x: x[1], reverse=True)
+    return keywords[:top_n]
+
+
+def index_unique(items: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Убирает повторы с сохранением порядка первого вхождения
+    :return: Номер каждого элемента среди уникальных и сами уникальные элементы
+    """
+    positions: Dict[str, int] = {}
+    ids = np.fromiter((positions.setdefault(item, len(positions)) for item in items), dtype=np.int64, count=len(items))
+    return ids, list(positions)
+
+
+def segmented_top_keywords(text_ids: np.ndarray, key_ids: np.ndarray, scores: np.ndarray,
+                           n_texts: int, top_n: int) -> List[List[Tuple[int, int]]]:
+    """
+    То же, что merge_scores и top_keywords, но для вхождений слов всех текстов сразу, без цикла по словам:
+    вхождения сортируются по паре (текст, слово), максимум по каждой паре считает np.maximum.reduceat.
+    :param text_ids: Номер текста каждого вхождения слова
+    :param key_ids: Номер слова (без учета регистра) каждого вхождения
+    :param scores: Оценка каждого вхождения
+    :param n_texts: Число текстов
+    :param top_n: Сколько слов вернуть для текста
+    :return: Для каждого текста top_n пар (позиция первого вхождения слова, оценка 0-100) по убыванию оценки,
+        при равной оценке - в порядке первого вхождения
+    """
+    results: List[List[Tuple[int, int]]] = [[] for _ in range(n_texts)]
+    if len(scores) == 0:
+        return results
+    pairs = text_ids * (int(key_ids.max()) + 1) + key_ids
+    # Устойчивая сортировка: первым в каждой паре остается первое вхождение слова
+    order = np.argsort(pairs, kind="stable")
+    starts = np.flatnonzero(np.r_[True, pairs[order][1:] != pairs[order][:-1]])
+    best = np.maximum.reduceat(scores[order].astype(np.float64), starts)
+    first = order[starts]
+    # Как int(max(0, score * 100)) в top_keywords: отбрасываем дробную часть у оценок в float64
+    points = (np.maximum(best, 0) * 100).astype(np.int64)
+    texts = text_ids[first]
+
+    ranked = np.lexsort((first, -points, texts))
+    bounds = np.searchsorted(texts[ranked], np.arange(n_texts + 1))
+    for index in range(n_texts):
+        top = ranked[bounds[index]:min(bounds[index + 1], bounds[index] + top_n)]
+        results[index] = list(zip(first[top].tolist(), points[top].tolist()))
+    return results
+
+
 class KeywordExtractor:
-    def __init__(self):
-        logger.info("Начинаем загрузку модели rubert-tiny2...")
-        # Инициализируем модель для русского языка
-        self.model = SentenceTransformer('cointegrated/rubert-tiny2')
-        logger.info("Модель rubert-tiny2 успешно загружена!")
+    def __init__(self, scoring: str = "matrix", batch_size: int = 32, cache: Optional[EmbeddingCache] = None,
+                 model_path: Optional[str] = None, backend: str = "torch", threads: int = 0,
+                 onnx_file: Optional[str] = None, model: Optional[Any] = None):
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Неизвестный режим подсчета сходства: {scoring}")
+        if backend not in MODEL_BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд инференса: {backend}")
+        self.scoring = scoring
+        self.backend = backend
+        self.batch_size = batch_size
+        # Кэш эмбеддингов слов; без него каждое слово каждой статьи идет в модель
+        self.cache = cache
+
+        if model is not None:
+            # Готовая модель с методами encode и get_sentence_embedding_dimension, например заглушка в бенчмарках
+            self.model = model
+        else:
+            logger.info(f"Начинаем загрузку модели {model_path or MODEL_NAME} (бэкенд {backend})...")
+            # Инициализируем модель для русского языка
+            self.model = load_model(model_path, backend, threads, onnx_file)
+            logger.info("Модель rubert-tiny2 успешно загружена!")
+        # То, что кодирует строки: сама модель или планировщик пакетов перед ней
+        self.encoder = self.model
+        if self.cache is not None:
+            # Кэш с диска мог остаться от модели другой размерности
+            self.cache.ensure_dim(self.model.get_sentence_embedding_dimension())
+
+    def _encode(self, items: List[str], kind: str) -> np.ndarray:
+        """
+        Кодирует строки пакетами в заранее выделенный буфер float32
+        :param items: Строки для кодирования
+        :param kind: Вид строк из ENCODE_LABELS: время кодирования записывается в трассу как этап encode_<kind>
+        :return: Матрица эмбеддингов (len(items), dim)
+        """
+        dim = self.encoder.get_sentence_embedding_dimension()
+        embeddings = np.empty((len(items), dim), dtype=np.float32)
+        count(f"encoded_{kind}", len(items))
+        with span(f"encode_{kind}"):
+            for i in range(0, len(items), self.batch_size):
+                batch = items[i:i + self.batch_size]
+                # Время пакетов видно в метриках, поэтому каждый пакет пишется только в отладочный лог
+                logger.debug(f"Обрабатываем пакет {ENCODE_LABELS[kind]} {i+1}-{i+len(batch)} из {len(items)}")
+                embeddings[i:i + len(batch)] = self.encoder.encode(batch)
+        return embeddings
+
+    def _encode_words(self, words: List[str]) -> np.ndarray:
+        """
+        Кодирует слова, отправляя в модель только отсутствующие в кэше.
+        В модель всегда передается нормализованный токен (и с кэшем, и без него),
+        поэтому оценки не зависят ни от формы первого вхождения слова, ни от EMBEDDING_CACHE_SIZE.
+        """
+        tokens = [EmbeddingCache.normalize(word) for word in words]
+        if self.cache is None:
+            # Разные формы слова ("Потоки", "потоки") дают один токен, кодируем его один раз
+            token_ids, unique_tokens = index_unique(tokens)
+            return self._encode(unique_tokens, "words")[token_ids]
+
+        embeddings = np.empty((len(tokens), self.encoder.get_sentence_embedding_dimension()), dtype=np.float32)
+        missing = self.cache.lookup(tokens, embeddings)
+        if missing:
+            # Разные формы слова ("Потоки", "потоки") дают один токен, кодируем его один раз
+            token_ids, missing_tokens = index_unique([tokens[i] for i in missing])
+            encoded = self._encode(missing_tokens, "words")
+            embeddings[missing] = encoded[token_ids]
+            self.cache.put_many(missing_tokens, encoded)
+        logger.info(f"Кэш эмбеддингов: {len(tokens) - len(missing)} попаданий, {len(missing)} промахов")
+        return embeddings
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Кодирует тексты целиком для семантического поиска
+        :param texts: Исходные тексты
+        :return: Матрица нормированных эмбеддингов (len(texts), dim)
+        """
+        return normalize_rows(self._encode(texts, "texts"))
+
+    def warmup(self) -> float:
+        """
+        Прогоняет короткий текст через извлечение ключевых слов и эмбеддинг статьи, чтобы первый запрос
+        не платил за ленивую инициализацию токенизатора и torch
+        :return: Время прогрева в секундах
+        """
+        started = time.perf_counter()
+        keywords = self.extract_keywords(WARMUP_TEXT, top_n=EMBEDDING_KEYWORDS)
+        self.embed([embedding_text("Прогрев", [word for word, _ in keywords])])
+        elapsed = time.perf_counter() - started
+        logger.info(f"Прогрев модели занял {elapsed:.2f} с")
+        return elapsed
+
+    def close(self) -> None:
+        """Останавливает планировщик пакетов перед моделью, если он есть"""
+        if self.encoder is not self.model and hasattr(self.encoder, "close"):
+            self.encoder.close()
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        """Счетчики попаданий и промахов кэша эмбеддингов (None, если кэш выключен)"""
+        return self.cache.stats() if self.cache is not None else None
+
+    def _score(self, words: List[str], sentences: List[str]) -> np.ndarray:
+        """Максимальное сходство каждого слова с любым из предложений"""
+        count("sentences", len(sentences))
+        count("words", len(words))
+        # Обрабатываем предложения и слова по частям
+        sentence_embeddings = self._encode(sentences, "sentences")
+        word_embeddings = self._encode_words(words)
+        
+        with span("similarity"):
+            return self._similarities(word_embeddings, sentence_embeddings)
+
+    def _similarities(self, word_embeddings: np.ndarray, sentence_embeddings: np.ndarray) -> np.ndarray:
+        # Вычисляем максимальное косинусное сходство каждого слова с предложениями
+        if self.scoring == "matrix":
+            return max_similarities(word_embeddings, sentence_embeddings)
+        return max_similarities_pairwise(word_embeddings, sentence_embeddings)
 
     def extract_keywords(self, text: str, top_n: int = 10) -> List[Tuple[str, int]]:
         """
@@ -25,51 +353,13 @@ class KeywordExtractor:
         if not text:
             return []
             
-        # Разбиваем текст на слова, удаляя пунктуацию
-        words = re.findall(r'\w+', text, flags=re.UNICODE)
-        
-        # Удаляем дубликаты, сохраняя порядок
-        unique_words = []
-        seen = set()
-        for word in words:
-            if word.lower() not in seen and len(word) > 2:  # игнорируем короткие слова
-                seen.add(word.lower())
-                unique_words.append(word)
-                
+        unique_words = split_unique_words(text)
         if not unique_words:
             return []
             
         logger.info(f"Начинаем обработку текста из {len(unique_words)} уникальных слов...")
         
-        # Разбиваем текст на предложения
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        # Обрабатываем предложения по частям
-        batch_size = 32
-        sentence_embeddings = []
-        for i in range(0, len(sentences), batch_size):
-            batch = sentences[i:i + batch_size]
-            logger.info(f"Обрабатываем пакет предложений {i+1}-{min(i+batch_size, len(sentences))} из {len(sentences)}")
-            batch_embeddings = self.model.encode(batch)
-            sentence_embeddings.extend(batch_embeddings)
-        sentence_embeddings = np.array(sentence_embeddings)
-        
-        # Обрабатываем слова по частям
-        word_embeddings = []
-        for i in range(0, len(unique_words), batch_size):
-            batch = unique_words[i:i + batch_size]
-            logger.info(f"Обрабатываем пакет слов {i+1}-{min(i+batch_size, len(unique_words))} из {len(unique_words)}")
-            batch_embeddings = self.model.encode(batch)
-            word_embeddings.extend(batch_embeddings)
-        word_embeddings = np.array(word_embeddings)
-        
-        # Вычисляем косинусное сходство между каждым словом и каждым предложением
-        similarities = np.zeros(len(unique_words))
-        for i, word_emb in enumerate(word_embeddings):
-            # Находим максимальное сходство слова с любым предложением
-            word_similarities = cosine_similarity([word_emb], sentence_embeddings)[0]
-            similarities[i] = np.max(word_similarities)
+        similarities = self._score(unique_words, list(iter_sentences(text)))
         
         # Создаем список кортежей (слово, оценка)
         # Оценку переводим в 0-100 и берем только >=0
@@ -80,3 +370,159 @@ class KeywordExtractor:
         
         logger.info(f"Извлечено {len(keywords[:top_n])} ключевых слов")
         return keywords[:top_n]
+
+    def extract_keywords_streaming(self, text: str, top_n: int = 10, window_sentences: int = 32,
+                                   max_candidates: int = 1000) -> List[Tuple[str, int]]:
+        """
+        Извлекает ключевые слова из текста любой длины, проходя его окнами по window_sentences предложений.
+        Слово сравнивается с предложениями своего окна, итоговая оценка - максимум по окнам.
+        Память ограничена размером окна и max_candidates и не зависит от длины текста.
+        :param text: Исходный текст
+        :param top_n: Количество ключевых слов для извлечения
+        :param window_sentences: Количество предложений в окне
+        :param max_candidates: Сколько лучших слов хранить между окнами
+        :return: Список кортежей (ключевое слово, оценка)
+        """
+        # слово в нижнем регистре -> (слово в форме первого вхождения, лучшая оценка)
+        best: Dict[str, Tuple[str, float]] = {}
+        max_candidates = max(max_candidates, top_n)
+        windows = 0
+        
+        for window in iter_sentence_windows(text, window_sentences):
+            words = split_unique_words(" ".join(window))
+            if not words:
+                continue
+            windows += 1
+            similarities = self._score(words, window)
+            
+            merge_scores(best, words, similarities)
+            
+            # Отбрасываем слабых кандидатов, чтобы словарь не рос вместе с текстом
+            if len(best) > 2 * max_candidates:
+                strongest = {key for key, _ in heapq.nlargest(max_candidates, best.items(), key=lambda item: item[1][1])}
+                best = {key: value for key, value in best.items() if key in strongest}
+        
+        keywords = top_keywords(best, top_n)
+        logger.info(f"Обработано окон: {windows}, извлечено {len(keywords)} ключевых слов")
+        return keywords
+
+    def extract_keywords_batch(self, texts: List[str], top_n: int = 10, window_sentences: Optional[int] = None,
+                               max_group_sentences: int = 0) -> List[List[Tuple[str, int]]]:
+        """
+        Извлекает ключевые слова сразу из нескольких текстов.
+        Тексты идут группами: слова и предложения группы собираются вместе, повторы между текстами убираются,
+        и модель кодирует каждое уникальное слово и предложение группы один раз заполненными пакетами.
+        Оценки по текстам сводятся векторно (segmented_top_keywords) и совпадают с обработкой каждого текста
+        по отдельности.
+        :param texts: Исходные тексты
+        :param top_n: Количество ключевых слов для каждого текста
+        :param window_sentences: Размер окна в предложениях (как в extract_keywords_streaming), None - текст целиком
+        :param max_group_sentences: Сколько предложений кодируется за раз, 0 - все тексты одной группой.
+            Эмбеддинги держатся в памяти только для текущей группы, поэтому память не растет с числом текстов.
+            Текст не делится между группами: текст длиннее ограничения образует группу один
+        :return: Списки кортежей (ключевое слово, оценка) в порядке texts
+        """
+        results: List[List[Tuple[str, int]]] = [[] for _ in texts]
+        # Окна текстов текущей группы: (номер текста, слова окна, предложения окна)
+        group: List[Tuple[int, List[str], List[str]]] = []
+        group_sentences = 0
+        groups = 0
+        for index, text in enumerate(texts):
+            if not text:
+                continue
+            if window_sentences:
+                text_windows = iter_sentence_windows(text, window_sentences)
+            else:
+                text_windows = [list(iter_sentences(text))]
+            windows = []
+            for window in text_windows:
+                words = split_unique_words(" ".join(window))
+                if words:
+                    windows.append((index, words, window))
+            text_sentences = sum(len(window) for _, _, window in windows)
+            if group and max_group_sentences and group_sentences + text_sentences > max_group_sentences:
+                self._extract_group(group, top_n, results)
+                groups += 1
+                group, group_sentences = [], 0
+            group.extend(windows)
+            group_sentences += text_sentences
+        
+        if group:
+            self._extract_group(group, top_n, results)
+            groups += 1
+        if groups > 1:
+            logger.info(f"Пакет из {len(texts)} текстов обработан группами: {groups}")
+        return results
+
+    def _extract_group(self, windows: List[Tuple[int, List[str], List[str]]], top_n: int,
+                       results: List[List[Tuple[str, int]]]) -> None:
+        """
+        Кодирует и оценивает окна группы текстов из extract_keywords_batch
+        :param windows: Окна группы (номер текста, слова окна, предложения окна) по возрастанию номера текста
+        :param top_n: Количество ключевых слов для каждого текста
+        :param results: Результаты пакета, в которые записываются ключевые слова текстов группы
+        """
+        all_sentences = [sentence for _, _, window in windows for sentence in window]
+        all_words = [word for _, words, _ in windows for word in words]
+        sentence_ids, unique_sentences = index_unique(all_sentences)
+        word_ids, unique_words = index_unique(all_words)
+        logger.info(f"Пакетная обработка текстов {windows[0][0] + 1}-{windows[-1][0] + 1}: "
+                    f"{len(all_sentences)} предложений ({len(unique_sentences)} уникальных), "
+                    f"{len(all_words)} слов ({len(unique_words)} уникальных)")
+        count("sentences", len(all_sentences))
+        count("words", len(all_words))
+        sentence_embeddings = self._encode(unique_sentences, "sentences")
+        word_embeddings = self._encode_words(unique_words)
+        if self.scoring == "matrix":
+            # Нормируем каждую уникальную строку один раз, а не в каждом окне
+            normalize_rows(sentence_embeddings)
+            normalize_rows(word_embeddings)
+        
+        # Оценка каждого вхождения слова: максимальное сходство с предложениями его окна
+        scores = np.empty(len(all_words), dtype=np.float32)
+        sentence_offset = word_offset = 0
+        with span("similarity"):
+            for _, words, window in windows:
+                window_words = word_embeddings[word_ids[word_offset:word_offset + len(words)]]
+                window_sentence_embeddings = sentence_embeddings[sentence_ids[sentence_offset:sentence_offset + len(window)]]
+                if self.scoring == "matrix":
+                    scores[word_offset:word_offset + len(words)] = (window_words @ window_sentence_embeddings.T).max(axis=1)
+                else:
+                    scores[word_offset:word_offset + len(words)] = max_similarities_pairwise(
+                        window_words, window_sentence_embeddings
+                    )
+                word_offset += len(words)
+                sentence_offset += len(window)
+        
+        # Номера текстов внутри группы отсчитываются от первого текста группы
+        first = windows[0][0]
+        text_ids = np.repeat([index - first for index, _, _ in windows], [len(words) for _, words, _ in windows])
+        key_ids, _ = index_unique([word.lower() for word in all_words])
+        ranked = segmented_top_keywords(text_ids, key_ids, scores, windows[-1][0] - first + 1, top_n)
+        for offset, text_ranked in enumerate(ranked):
+            results[first + offset] = [(all_words[position], points) for position, points in text_ranked]
+
+
+def create_keyword_extractor(cache_size: int = 0, cache_path: Optional[str] = None,
+                             batching_max_size: int = 0, batching_max_wait_ms: float = 5.0,
+                             **kwargs) -> KeywordExtractor:
+    """
+    Создает экстрактор с кэшем эмбеддингов и планировщиком пакетов. Функция уровня модуля,
+    поэтому подходит как фабрика для процессов-воркеров InferencePool.
+    :param cache_size: Размер кэша эмбеддингов, 0 - без кэша
+    :param cache_path: Каталог для хранения кэша на диске, None - только в памяти
+    :param batching_max_size: Максимальный пакет планировщика MicroBatchEncoder, 0 - без планировщика
+    :param batching_max_wait_ms: Сколько планировщик ждет вызовы других запросов
+    :param kwargs: Параметры KeywordExtractor (scoring, batch_size, model_path, backend, threads, onnx_file)
+    """
+    cache = EmbeddingCache(
+        cache_size, cache_path,
+        model=model_version(kwargs.get("model_path"), kwargs.get("backend", "torch"), kwargs.get("onnx_file"))
+    ) if cache_size > 0 else None
+    if batching_max_size > 0:
+        # Строки отдаются планировщику целиком, пакеты он собирает сам
+        kwargs.setdefault("batch_size", batching_max_size)
+    extractor = KeywordExtractor(cache=cache, **kwargs)
+    if batching_max_size > 0:
+        extractor.encoder = MicroBatchEncoder(extractor.model, batching_max_size, batching_max_wait_ms)
+    return extractor
@@ -0,0 +1,85 @@
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+from .tracing import Trace
+
+# Границы гистограмм, секунд: от слов из кэша до длинных статей и пакетов
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "text_analyzer_request_duration_seconds", "Время обработки запроса до начала ответа",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+SCRAPPER_FETCH = Histogram(
+    "text_analyzer_scrapper_fetch_seconds", "Время загрузки одной статьи из scrapper, включая повторы",
+    buckets=LATENCY_BUCKETS
+)
+INFERENCE_QUEUE = Histogram(
+    "text_analyzer_inference_queue_seconds", "Ожидание свободного воркера пула инференса и загрузки модели",
+    buckets=LATENCY_BUCKETS
+)
+ENCODE = Histogram(
+    "text_analyzer_encode_seconds", "Время одного вызова кодирования строк моделью",
+    ["kind"], buckets=LATENCY_BUCKETS
+)
+SIMILARITY = Histogram(
+    "text_analyzer_similarity_seconds", "Время подсчета сходства слов с предложениями",
+    buckets=LATENCY_BUCKETS
+)
+DB_WRITE = Histogram(
+    "text_analyzer_db_write_seconds", "Время сохранения результатов анализа в базу",
+    buckets=LATENCY_BUCKETS
+)
+PROCESSED_ITEMS = Counter(
+    "text_analyzer_processed_items_total", "Слова и предложения проанализированных текстов", ["kind"]
+)
+ENCODED_ITEMS = Counter(
+    "text_analyzer_encoded_items_total", "Строки, переданные в модель (после удаления повторов и кэша)", ["kind"]
+)
+JOB_QUEUE_WAIT = Histogram(
+    "text_analyzer_job_queue_wait_seconds", "Время от постановки задачи анализа в очередь до ее захвата воркером",
+    buckets=LATENCY_BUCKETS
+)
+JOBS = Counter(
+    "text_analyzer_jobs_total", "Задачи очереди анализа, обработанные воркерами этого процесса, по итогу", ["status"]
+)
+CONSUMED_EVENTS = Counter(
+    "text_analyzer_kafka_events_total",
+    "События статей из Kafka: проанализированные, поставленные в очередь анализа и неразобранные", ["status"]
+)
+
+# Виды строк, которые кодирует KeywordExtractor
+ENCODE_KINDS = ("sentences", "words", "texts")
+
+
+def observe_trace(trace: Trace) -> None:
+    """
+    Переносит этапы трассы запроса в метрики. Этапы инференса записываются в процессе-воркере
+    и возвращаются вместе с результатом, поэтому учитываются и в режиме пула "process"
+    """
+    stages = {
+        "scrapper_fetch": SCRAPPER_FETCH,
+        "inference_queue": INFERENCE_QUEUE,
+        "similarity": SIMILARITY,
+        "db_write": DB_WRITE,
+    }
+    for kind in ENCODE_KINDS:
+        stages[f"encode_{kind}"] = ENCODE.labels(kind)
+    for name, durations in trace.spans.items():
+        histogram = stages.get(name)
+        if histogram is None:
+            continue
+        for seconds in durations:
+            histogram.observe(seconds)
+
+    for name, value in trace.counts.items():
+        if name.startswith("encoded_"):
+            ENCODED_ITEMS.labels(name[len("encoded_"):]).inc(value)
+        else:
+            PROCESSED_ITEMS.labels(name).inc(value)
+
+
+def render() -> Tuple[bytes, str]:
+    """Текст метрик в формате Prometheus и его тип содержимого"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, create_engine
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, LargeBinary, String, Text, ForeignKey, create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from datetime import datetime
 
 Base = declarative_base()
 
@@ -11,14 +12,55 @@ class Article(Base):
     article_id = Column(Integer, unique=True, nullable=False)
     title = Column(String(500), nullable=False)
     content = Column(Text, nullable=False)
-    keywords = relationship("Keyword", back_populates="article")
+    # Время последнего сохранения (UTC): по нему клиенты забирают только новые и измененные статьи
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Нормированный эмбеддинг статьи (float32, байты) для семантического сопоставления с темами
+    embedding = Column(LargeBinary, nullable=True)
+    # sha256 заголовка и проанализированного текста и версия анализа (модель, бэкенд, параметры):
+    # статья с тем же содержимым и версией не анализируется повторно
+    content_hash = Column(String(64), nullable=True, index=True)
+    model_version = Column(String(200), nullable=True)
+    keywords = relationship("Keyword", back_populates="article", order_by="Keyword.id")
 
 class Keyword(Base):
     __tablename__ = "keywords"
     
     id = Column(Integer, primary_key=True)
-    article_id = Column(Integer, ForeignKey("articles.id"))
+    article_id = Column(Integer, ForeignKey("articles.id"), index=True)
     keyword = Column(String(100), nullable=False)
     score = Column(Integer, nullable=False)
     
     article = relationship("Article", back_populates="keywords")
+
+# Статусы задач очереди анализа; у статьи не больше одной активной задачи
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+ACTIVE_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+ACTIVE_JOB_CONDITION = text("status IN ('queued', 'running')")
+
+class AnalysisJob(Base):
+    """Задача асинхронного анализа статьи: очередь в базе, которую разбирают воркеры (см. api/worker.py)"""
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(Integer, primary_key=True)
+    article_id = Column(Integer, nullable=False)
+    force = Column(Boolean, nullable=False, default=False)
+    status = Column(String(20), nullable=False, default=JOB_QUEUED)
+    # Попыток выполнения: растет при каждом захвате задачи воркером
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    # Воркер, выполняющий задачу, и срок его аренды: после срока задачу может забрать другой воркер
+    worker = Column(String(200), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Повторная постановка статьи, пока ее задача в очереди или выполняется, возвращает ту же задачу
+        Index("ix_analysis_jobs_active_article", "article_id", unique=True,
+              postgresql_where=ACTIVE_JOB_CONDITION, sqlite_where=ACTIVE_JOB_CONDITION),
+        Index("ix_analysis_jobs_status_id", "status", "id"),
+    )
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import threading
+
+
+def content_hash(title: str, content: str) -> str:
+    """
+    Ключ результата анализа: sha256 заголовка и проанализированного текста.
+    Заголовок входит в ключ, потому что по нему строится эмбеддинг статьи
+    """
+    digest = hashlib.sha256()
+    digest.update(title.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    keywords: List[Dict[str, Any]]
+    embedding: Optional[bytes]
+
+
+class ResultCache:
+    """
+    Ограниченный LRU-кэш результатов анализа в памяти процесса:
+    (хэш содержимого, версия анализа) -> ключевые слова и эмбеддинг статьи.
+    Избавляет от чтения ключевых слов из базы для недавно проанализированного содержимого
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("Размер кэша результатов должен быть положительным")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, content_hash: str, version: str) -> Optional[CachedResult]:
+        with self._lock:
+            result = self._entries.get((content_hash, version))
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((content_hash, version))
+            self.hits += 1
+            return result
+
+    def put(self, content_hash: str, version: str, keywords: List[Dict[str, Any]],
+            embedding: Optional[bytes]) -> None:
+        with self._lock:
+            self._entries[(content_hash, version)] = CachedResult(keywords, embedding)
+            self._entries.move_to_end((content_hash, version))
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Счетчики для подбора размера кэша (попадания в базу сюда не входят)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -1,11 +1,29 @@
-import requests
+from typing import Optional
+
+import httpx
+
 from config.config import get_settings
+from .http_client import CircuitBreaker, ResilientHttpClient
 
 settings = get_settings()
 
 class ScrapperClient:
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.BaseTransport] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None):
         self.base_url = settings.SCRAPPER_SERVICE_URL
+        # Один пул соединений и один автомат на процесс: медленный scrapper не занимает воркеры
+        self.http = ResilientHttpClient(
+            self.base_url,
+            timeout=settings.SCRAPPER_TIMEOUT,
+            connect_timeout=settings.SCRAPPER_CONNECT_TIMEOUT,
+            max_connections=settings.SCRAPPER_MAX_CONNECTIONS,
+            retries=settings.SCRAPPER_RETRIES,
+            backoff_base=settings.SCRAPPER_BACKOFF_BASE,
+            backoff_max=settings.SCRAPPER_BACKOFF_MAX,
+            breaker=CircuitBreaker(settings.SCRAPPER_BREAKER_THRESHOLD, settings.SCRAPPER_BREAKER_RESET),
+            transport=transport,
+            async_transport=async_transport
+        )
     
     def get_article(self, article_id: int) -> dict:
         """
@@ -13,6 +31,19 @@ class ScrapperClient:
         :param article_id: ID статьи
         :return: Данные статьи
         """
-        response = requests.get(f"{self.base_url}/api/v1/scrapping/article/{article_id}")
+        response = self.http.request("GET", f"/api/v1/scrapping/article/{article_id}")
         response.raise_for_status()
-        return response.json() 
\ No newline at end of file
+        return response.json()
+
+    async def aget_article(self, article_id: int) -> dict:
+        """
+        Асинхронный вариант get_article для обработчиков FastAPI
+        :param article_id: ID статьи
+        :return: Данные статьи
+        """
+        response = await self.http.arequest("GET", f"/api/v1/scrapping/article/{article_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+import time
+
+
+class Trace:
+    """
+    Время этапов обработки одного запроса: длительности каждого вызова этапа в секундах
+    и счетчики обработанных элементов. Передается между процессами пула инференса, поэтому
+    содержит только словари и списки
+    """
+
+    def __init__(self):
+        self.spans: Dict[str, List[float]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans.setdefault(name, []).append(seconds)
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def merge(self, other: "Trace") -> None:
+        for name, durations in other.spans.items():
+            self.spans.setdefault(name, []).extend(durations)
+        for name, value in other.counts.items():
+            self.count(name, value)
+
+    def server_timing(self) -> str:
+        """
+        Значение заголовка Server-Timing: суммарное время каждого этапа в миллисекундах.
+        Параллельные вызовы одного этапа (загрузка статей пакета) складываются
+        """
+        return ", ".join(
+            f'{name};desc="{len(durations)}";dur={sum(durations) * 1000:.2f}'
+            for name, durations in self.spans.items()
+        )
+
+
+# Трасса текущего запроса; в потоках пула инференса - трасса текущей задачи
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def collect() -> Iterator[Trace]:
+    """Собирает этапы, выполненные внутри блока, в новую трассу"""
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Записывает время блока как этап текущей трассы; вне трассы ничего не делает"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def count(name: str, value: int) -> None:
+    """Увеличивает счетчик текущей трассы"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name, value)
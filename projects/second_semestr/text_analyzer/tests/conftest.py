@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -16,6 +17,23 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+class HashModel:
+    """Заглушка модели: детерминированный эмбеддинг из хэша строки, считает закодированные строки"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def get_sentence_embedding_dimension(self):
+        return 16
+
+    def encode(self, items, **kwargs):
+        self.encoded.extend(items)
+        return np.stack([
+            np.random.default_rng(abs(hash(item)) % 2 ** 32).standard_normal(16).astype(np.float32) for item in items
+        ])
+
+
 @pytest.fixture(scope="function")
 def db_session():
     Base.metadata.create_all(bind=engine)
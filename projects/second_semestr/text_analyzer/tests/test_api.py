@@ -0,0 +1,205 @@
+import httpx
+import pytest
+from sqlalchemy import event
+
+import api.main
+from conftest import HashModel
+from internal.inference_pool import InferenceTiming
+from internal.keyword_extractor import KeywordExtractor
+from internal.database import save_articles
+from internal.models import Article
+from internal.result_cache import ResultCache
+from internal.scrapper_client import ScrapperClient
+
+ARTICLES = {
+    1: {"name": "Потоки", "text": "Потоки и мьютексы в C++. Мьютекс защищает общие данные! Потоки ждут друг друга."},
+    2: {"name": "Память", "text": "Куча и стек. Аллокатор выделяет память. Потоки делят кучу."},
+    3: {"name": "Сети", "text": "Сокеты Беркли. Сервер принимает соединения. Клиент отправляет данные."},
+}
+
+
+class StubPool:
+    """Заглушка InferencePool: вызывает экстрактор с моделью-заглушкой в том же потоке и считает вызовы"""
+
+    def __init__(self):
+        self.extractor = KeywordExtractor(model=HashModel())
+        self.calls = []
+
+    async def run(self, method, *args, **kwargs):
+        self.calls.append(method)
+        return getattr(self.extractor, method)(*args, **kwargs), InferenceTiming(queue_wait_ms=0.0, inference_ms=0.0)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = StubPool()
+    monkeypatch.setattr(api.main, "inference_pool", pool)
+    # Кэш результатов общий для процесса, каждому тесту нужен свой
+    monkeypatch.setattr(api.main, "result_cache", ResultCache(100))
+    return pool
+
+
+@pytest.fixture
+def scrapper(monkeypatch):
+    """Статьи scrapper в памяти: ID, которых нет в словаре, отвечают 404"""
+    articles = {article_id: dict(article) for article_id, article in ARTICLES.items()}
+
+    def handler(request):
+        article_id = int(request.url.path.rsplit("/", 1)[-1])
+        if article_id not in articles:
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, json=articles[article_id])
+
+    monkeypatch.setattr(api.main, "scrapper_client", ScrapperClient(async_transport=httpx.MockTransport(handler)))
+    return articles
+
+
+@pytest.fixture
+def commits(db_session):
+    """Число транзакций, зафиксированных сессией теста"""
+    counter = []
+    event.listen(db_session, "after_commit", lambda session: counter.append(session))
+    return counter
+
+
+def expected_keywords(pool, article_id):
+    """Ключевые слова статьи, извлеченные отдельно от остальных"""
+    keywords = pool.extractor.extract_keywords_streaming(
+        ARTICLES[article_id]["text"], window_sentences=api.main.settings.ANALYSIS_WINDOW_SENTENCES
+    )
+    return [{"keyword": word, "score": score} for word, score in keywords]
+
+
+def test_analyze_batch_returns_keywords_of_each_article_in_request_order(client, db_session, pool, scrapper, commits):
+    response = client.post("/analyze/batch", json={"article_ids": [3, 1, 3, 2]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["article_id"] for result in body["results"]] == [3, 1, 2]
+    for result in body["results"]:
+        assert result["keywords"] == expected_keywords(pool, result["article_id"])
+        assert result["cache_hit"] is None
+    # Все статьи пакета извлекаются одним вызовом и сохраняются одной транзакцией
+    assert pool.calls == ["extract_keywords_batch", "embed"]
+    assert len(commits) == 1
+    assert (body["analyzed_count"], body["saved_count"], body["errors"]) == (3, 3, [])
+    for article in db_session.query(Article):
+        saved = [{"keyword": kw.keyword, "score": kw.score} for kw in article.keywords]
+        assert saved == expected_keywords(pool, article.article_id)
+
+
+def test_analyze_batch_saves_fetched_articles_when_some_fetches_fail(client, db_session, pool, scrapper, commits):
+    response = client.post("/analyze/batch", json={"article_ids": [1, 404, 2]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["article_id"] for result in body["results"]] == [1, 2]
+    assert [error["article_id"] for error in body["errors"]] == [404]
+    assert body["saved_count"] == 2
+    assert len(commits) == 1
+    assert sorted(article.article_id for article in db_session.query(Article)) == [1, 2]
+
+
+def test_analyze_batch_rejects_empty_request(client, pool, scrapper):
+    response = client.post("/analyze/batch", json={"article_ids": []})
+
+    assert response.status_code == 400
+    assert pool.calls == []
+
+
+def test_unchanged_article_skips_inference_and_database_write(client, pool, scrapper, commits):
+    first = client.get("/analyze/1").json()
+    assert first["cache_hit"] is None
+    assert pool.calls == ["extract_keywords_streaming", "embed"]
+    assert len(commits) == 1
+
+    second = client.get("/analyze/1").json()
+
+    assert second["cache_hit"] == "memory"
+    assert second["keywords"] == first["keywords"]
+    assert second["timings"] is None
+    assert pool.calls == ["extract_keywords_streaming", "embed"]
+    assert len(commits) == 1
+
+
+def test_stored_result_is_reused_after_process_cache_is_lost(client, monkeypatch, pool, scrapper, commits):
+    client.get("/analyze/1")
+    monkeypatch.setattr(api.main, "result_cache", ResultCache(100))
+
+    response = client.get("/analyze/1").json()
+
+    assert response["cache_hit"] == "database"
+    assert len(pool.calls) == 2
+    assert len(commits) == 1
+
+
+def test_changed_article_is_analyzed_again(client, pool, scrapper, commits):
+    client.get("/analyze/1")
+    scrapper[1]["text"] += " Атомарные операции."
+
+    response = client.get("/analyze/1").json()
+
+    assert response["cache_hit"] is None
+    assert pool.calls.count("extract_keywords_streaming") == 2
+    assert len(commits) == 2
+
+
+def test_force_bypasses_result_cache(client, pool, scrapper, commits):
+    client.get("/analyze/1")
+
+    response = client.get("/analyze/1", params={"force": "true"}).json()
+
+    assert response["cache_hit"] is None
+    assert pool.calls.count("extract_keywords_streaming") == 2
+    assert len(commits) == 2
+
+
+def test_analyze_batch_reports_cache_hits(client, pool, scrapper, commits):
+    client.post("/analyze/batch", json={"article_ids": [1, 2]})
+
+    body = client.post("/analyze/batch", json={"article_ids": [1, 2, 3]}).json()
+
+    assert body["cache_hits"] == 2
+    assert [result["cache_hit"] for result in body["results"]] == ["memory", "memory", None]
+    # Анализируется и сохраняется только новая статья
+    assert pool.calls.count("extract_keywords_batch") == 2
+    assert body["saved_count"] == 1
+    assert len(commits) == 2
+
+    forced = client.post("/analyze/batch", json={"article_ids": [1, 2, 3], "force": True}).json()
+
+    assert forced["cache_hits"] == 0
+    assert pool.calls.count("extract_keywords_batch") == 3
+    assert forced["saved_count"] == 3
+
+
+def test_articles_returns_only_articles_saved_after_updated_after(client, db_session):
+    from datetime import datetime
+
+    save_articles(db_session, [
+        {"article_id": article_id, "title": f"Статья {article_id}", "content": "текст", "keywords": []}
+        for article_id in range(1, 6)
+    ])
+    # Статьи 1-2 сохранены до прошлой синхронизации, 3-5 - после, 4 - ровно в ее момент
+    synced_at = datetime(2024, 1, 1, 12, 0)
+    saved_at = {1: (11, 0), 2: (11, 59), 3: (12, 1), 4: (12, 0), 5: (13, 0)}
+    for article_id, (hour, minute) in saved_at.items():
+        db_session.query(Article).filter(Article.article_id == article_id).update(
+            {"updated_at": datetime(2024, 1, 1, hour, minute)}
+        )
+    db_session.commit()
+
+    params = {"updated_after": synced_at.isoformat(), "include_content": "false", "limit": 1}
+    pages = []
+    while True:
+        body = client.get("/articles", params=params).json()
+        pages.append([article["id"] for article in body["articles"]])
+        assert all("content" not in article for article in body["articles"])
+        if body["next_after_id"] is None:
+            break
+        params["after_id"] = body["next_after_id"]
+
+    # Сохраненная в тот же момент статья не попадает (updated_at > updated_after): это покрывает перекрытие клиента
+    assert pages == [[3], [5], []]
+    assert client.get("/articles").json()["articles"][0]["content"] == "текст"
+    assert client.get("/articles", params={"updated_after": "2024-01-01T12:00:00+03:00"}).json()["count"] == 5
@@ -0,0 +1,206 @@
+import asyncio
+import json
+from collections import namedtuple
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from internal.article_consumer import ArticleConsumer, parse_event
+from internal.database import Base, count_jobs
+from internal.models import AnalysisJob, JOB_QUEUED
+
+TopicPartition = namedtuple("TopicPartition", ["topic", "partition"])
+Record = namedtuple("Record", ["offset", "value"])
+
+
+class FakeBroker:
+    """Брокер в памяти: партиции топика и зафиксированные смещения групп"""
+
+    def __init__(self, topic="scrapping", partitions=2):
+        self.partitions = {TopicPartition(topic, i): [] for i in range(partitions)}
+        self.committed = {}
+        # Сколько следующих подключений завершатся ошибкой
+        self.unavailable = 0
+
+    def publish(self, partition, *article_ids):
+        records = self.partitions[TopicPartition("scrapping", partition)]
+        for article_id in article_ids:
+            value = article_id if isinstance(article_id, bytes) else json.dumps({"id": article_id}).encode()
+            records.append(Record(len(records), value))
+
+    def consumer(self, group_id="text-analyzer"):
+        return FakeConsumer(self, group_id)
+
+
+class FakeConsumer:
+    """Consumer с тем же интерфейсом, что у AIOKafkaConsumer, которым пользуется ArticleConsumer"""
+
+    def __init__(self, broker, group_id):
+        self.broker = broker
+        self.group_id = group_id
+        self.positions = {}
+        self.started = False
+
+    async def start(self):
+        if self.broker.unavailable > 0:
+            self.broker.unavailable -= 1
+            raise ConnectionError("брокер недоступен")
+        self.started = True
+        self.positions = {
+            partition: self.broker.committed.get((self.group_id, partition), 0) for partition in self.broker.partitions
+        }
+
+    async def stop(self):
+        self.started = False
+
+    async def getmany(self, timeout_ms=0, max_records=None):
+        batches = {}
+        left = max_records
+        for partition, records in self.broker.partitions.items():
+            taken = records[self.positions[partition]:][:left]
+            if taken:
+                batches[partition] = taken
+                self.positions[partition] += len(taken)
+                left -= len(taken)
+            if left == 0:
+                break
+        if not batches:
+            # Как и настоящий consumer, ждет новых событий до timeout_ms
+            await asyncio.sleep(timeout_ms / 1000)
+        return batches
+
+    def seek(self, partition, offset):
+        self.positions[partition] = offset
+
+    async def commit(self, offsets):
+        for partition, offset in offsets.items():
+            self.broker.committed[(self.group_id, partition)] = offset
+
+
+class FakeAnalyze:
+    """Заглушка analyze_articles: статьи из missing не загружаются из scrapper, fail_times вызовов падают"""
+
+    def __init__(self, broker, missing=(), fail_times=0):
+        self.broker = broker
+        self.missing = set(missing)
+        self.fail_times = fail_times
+        self.calls = []
+
+    async def __call__(self, db, article_ids, force):
+        # Смещения, зафиксированные к моменту анализа: фиксация должна идти после сохранения
+        self.calls.append((list(article_ids), dict(self.broker.committed)))
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError("база недоступна")
+        return {"errors": [
+            {"article_id": article_id, "detail": "Ошибка при получении статьи"}
+            for article_id in article_ids if article_id in self.missing
+        ]}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'consumer.sqlite'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def committed_offsets(broker):
+    return {partition.partition: offset for (_, partition), offset in broker.committed.items()}
+
+
+def test_parse_event():
+    assert parse_event(b'{"id": 42}') == 42
+    assert parse_event(b'{"id": "42"}') is None
+    assert parse_event(b"not json") is None
+    assert parse_event(None) is None
+
+
+def test_events_are_analyzed_in_batches_and_committed_after_persistence(session_factory):
+    broker = FakeBroker()
+    broker.publish(0, 1, 2, 3)
+    broker.publish(1, 2, 4)
+    analyze = FakeAnalyze(broker)
+    consumer = ArticleConsumer(broker.consumer(), analyze, session_factory, batch_size=10)
+    asyncio.run(consumer.consumer.start())
+
+    assert asyncio.run(consumer.run_once()) == 5
+
+    # Повторы статьи в пакете анализируются один раз, до анализа ничего не зафиксировано
+    assert analyze.calls == [([1, 2, 3, 4], {})]
+    assert committed_offsets(broker) == {0: 3, 1: 2}
+    assert asyncio.run(consumer.run_once()) == 0
+
+
+def test_failed_batch_is_redelivered_without_commit(session_factory):
+    broker = FakeBroker(partitions=1)
+    broker.publish(0, 1, 2)
+    analyze = FakeAnalyze(broker, fail_times=1)
+    consumer = ArticleConsumer(broker.consumer(), analyze, session_factory, batch_size=10)
+    asyncio.run(consumer.consumer.start())
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(consumer.run_once())
+    assert broker.committed == {}
+
+    assert asyncio.run(consumer.run_once()) == 2
+    assert [article_ids for article_ids, _ in analyze.calls] == [[1, 2], [1, 2]]
+    assert committed_offsets(broker) == {0: 2}
+
+
+def test_restarted_consumer_resumes_from_committed_offset(session_factory):
+    broker = FakeBroker(partitions=1)
+    broker.publish(0, 1, 2, 3)
+    analyze = FakeAnalyze(broker)
+    first = ArticleConsumer(broker.consumer(), analyze, session_factory, batch_size=2)
+    asyncio.run(first.consumer.start())
+    asyncio.run(first.run_once())
+    # Второй пакет не сохранен, процесс завершается: его смещение не зафиксировано
+    analyze.fail_times = 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(first.run_once())
+
+    second = ArticleConsumer(broker.consumer(), analyze, session_factory, batch_size=2)
+    asyncio.run(second.consumer.start())
+    asyncio.run(second.run_once())
+
+    assert [article_ids for article_ids, _ in analyze.calls] == [[1, 2], [3], [3]]
+    assert committed_offsets(broker) == {0: 3}
+
+
+def test_unfetched_articles_are_queued_and_invalid_events_skipped(session_factory):
+    broker = FakeBroker(partitions=1)
+    broker.publish(0, 1, b"garbage", 2)
+    analyze = FakeAnalyze(broker, missing=[2])
+    consumer = ArticleConsumer(broker.consumer(), analyze, session_factory, batch_size=10)
+    asyncio.run(consumer.consumer.start())
+
+    assert asyncio.run(consumer.run_once()) == 3
+
+    assert analyze.calls[0][0] == [1, 2]
+    assert committed_offsets(broker) == {0: 3}
+    with session_factory() as db:
+        assert count_jobs(db) == {JOB_QUEUED: 1}
+        assert db.query(AnalysisJob).one().article_id == 2
+
+
+def test_run_reconnects_commits_and_stops_consumer(session_factory):
+    broker = FakeBroker(partitions=1)
+    broker.publish(0, 1, 2, 3)
+    broker.unavailable = 1
+    analyze = FakeAnalyze(broker)
+    consumer = ArticleConsumer(broker.consumer(), analyze, session_factory, batch_size=2, batch_timeout_ms=10,
+                               retry_backoff=0.01)
+
+    async def scenario():
+        task = asyncio.ensure_future(consumer.run())
+        while committed_offsets(broker).get(0) != 3:
+            await asyncio.sleep(0.01)
+        consumer.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(scenario())
+
+    assert not consumer.consumer.started
+    assert [article_ids for article_ids, _ in analyze.calls] == [[1, 2], [3]]
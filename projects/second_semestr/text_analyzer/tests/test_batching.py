@@ -0,0 +1,110 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from internal.batching import MicroBatchEncoder
+
+
+class RecordingModel:
+    """Заглушка модели: эмбеддинг строки - ее длина, размеры пакетов запоминаются"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_sentence_embedding_dimension(self):
+        return 1
+
+    def encode(self, sentences, batch_size=32):
+        if "ошибка" in sentences:
+            raise ValueError("сбой модели")
+        self.batch_sizes.append(len(sentences))
+        return np.array([[len(s)] for s in sentences], dtype=np.float32)
+
+
+def test_concurrent_calls_share_batches_and_get_own_rows():
+    model = RecordingModel()
+    encoder = MicroBatchEncoder(model, max_batch_size=64, max_wait_ms=200)
+    inputs = [["a" * (i + 1)] * 3 for i in range(8)]
+    results = [None] * len(inputs)
+
+    def call(i):
+        results[i] = encoder.encode(inputs[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    encoder.close()
+
+    for i, result in enumerate(results):
+        assert result.tolist() == [[i + 1]] * 3
+    assert len(model.batch_sizes) < len(inputs)
+    assert sum(model.batch_sizes) == 24
+
+
+def test_model_error_is_raised_in_caller():
+    encoder = MicroBatchEncoder(RecordingModel(), max_batch_size=4, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        encoder.encode(["ошибка"])
+    assert encoder.encode(["ok"]).tolist() == [[2]]
+    encoder.close()
+
+
+def test_calls_racing_close_either_finish_or_fail():
+    encoder = MicroBatchEncoder(RecordingModel(), max_batch_size=4, max_wait_ms=1)
+    outcomes = []
+
+    def call():
+        for _ in range(50):
+            try:
+                outcomes.append(encoder.encode(["ok"]).tolist())
+            except RuntimeError:
+                outcomes.append("closed")
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    encoder.close()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # Ни один вызов не завис: каждый получил результат или отказ
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(outcomes) == 200
+    assert all(outcome in ("closed", [[2.0]]) for outcome in outcomes)
+    with pytest.raises(RuntimeError):
+        encoder.encode(["ok"])
+    encoder.close()
+
+
+def test_pending_calls_fail_when_scheduler_stops():
+    started = threading.Event()
+    crash = threading.Event()
+
+    class CrashingEncoder(MicroBatchEncoder):
+        def _loop(self):
+            # Цикл завершается, не разобрав очередь, как при неожиданной ошибке
+            started.set()
+            crash.wait(timeout=5)
+
+    encoder = CrashingEncoder(RecordingModel())
+    started.wait(timeout=5)
+    errors = []
+
+    def call():
+        try:
+            encoder.encode(["ok"])
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    time.sleep(0.05)
+    crash.set()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert len(errors) == 1
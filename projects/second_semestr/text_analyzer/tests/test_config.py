@@ -0,0 +1,53 @@
+import pytest
+from pydantic import ValidationError
+
+from config.config import Settings
+from internal.database import create_db_engine, get_db
+
+
+def test_pool_settings_are_read_from_environment_and_applied(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "7")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "5")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "-1")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+
+    engine = create_db_engine(Settings())
+
+    # Движок создается без подключения к базе
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 7
+    assert engine.pool.timeout() == 5
+    assert engine.pool._recycle == -1
+    assert engine.pool._pre_ping is False
+
+
+@pytest.mark.parametrize("name, value", [
+    ("DB_POOL_SIZE", "many"),
+    ("DB_MAX_OVERFLOW", "1.5"),
+    ("DB_POOL_PRE_PING", "sometimes"),
+])
+def test_malformed_pool_settings_are_rejected(monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+
+    with pytest.raises(ValidationError):
+        Settings()
+
+
+@pytest.mark.parametrize("name, value", [("DB_POOL_SIZE", "0"), ("DB_MAX_OVERFLOW", "-2")])
+def test_out_of_range_pool_settings_are_rejected(monkeypatch, name, value):
+    monkeypatch.setenv(name, value)
+
+    with pytest.raises(ValueError, match=name):
+        create_db_engine(Settings())
+
+
+def test_each_request_gets_its_own_session():
+    first, second = get_db(), get_db()
+
+    sessions = next(first), next(second)
+
+    # Параллельные запросы не делят одну сессию и одно соединение
+    assert sessions[0] is not sessions[1]
+    first.close()
+    second.close()
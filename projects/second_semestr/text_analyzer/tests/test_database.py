@@ -0,0 +1,224 @@
+from internal.database import (
+    claim_jobs, enqueue_jobs, find_analyses, finish_jobs, get_articles_page, get_content_hashes, get_job, iter_articles,
+    retry_jobs, save_article, save_articles
+)
+from internal.models import Article, Keyword, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+
+
+def _keywords(*words):
+    return [{"keyword": word, "score": 100 - i} for i, word in enumerate(words)]
+
+
+def test_save_articles_inserts_articles_and_keywords(db_session):
+    saved = save_articles(db_session, [
+        {"article_id": 1, "title": "Потоки", "content": "текст", "keywords": _keywords("mutex", "thread")},
+        {"article_id": 2, "title": "Память", "content": "текст", "keywords": _keywords("heap")},
+    ])
+
+    assert saved == [1, 2]
+    assert db_session.query(Article).count() == 2
+    assert db_session.query(Keyword).filter(Keyword.article_id == 1).count() == 2
+
+
+def test_save_articles_keeps_keyword_order_of_each_article_in_one_commit(db_session):
+    from sqlalchemy import event
+
+    commits = []
+    event.listen(db_session, "after_commit", lambda session: commits.append(session))
+    save_articles(db_session, [
+        {"article_id": 2, "title": "Память", "content": "текст", "keywords": _keywords("heap", "stack", "alloc")},
+        {"article_id": 1, "title": "Потоки", "content": "текст", "keywords": _keywords("thread", "mutex")},
+    ])
+
+    keywords = {
+        article.article_id: [(kw.keyword, kw.score) for kw in article.keywords] for article in db_session.query(Article)
+    }
+    assert keywords == {2: [("heap", 100), ("stack", 99), ("alloc", 98)], 1: [("thread", 100), ("mutex", 99)]}
+    assert len(commits) == 1
+
+
+def test_reanalysis_replaces_keywords(db_session):
+    save_article(db_session, 1, "Потоки", "старый текст", _keywords("mutex", "thread"))
+    save_article(db_session, 1, "Потоки в C++", "новый текст", _keywords("atomic"))
+
+    article = db_session.query(Article).filter(Article.article_id == 1).one()
+    db_session.refresh(article)
+    assert article.title == "Потоки в C++"
+    assert article.content == "новый текст"
+    assert [kw.keyword for kw in article.keywords] == ["atomic"]
+    assert db_session.query(Keyword).count() == 1
+
+
+def test_saving_without_on_conflict_inserts_new_and_updates_existing(db_session, monkeypatch):
+    # Для баз без ON CONFLICT статьи ищутся и затем вставляются или обновляются отдельными запросами
+    monkeypatch.setattr("internal.database._insert", lambda db: None)
+    save_article(db_session, 1, "Потоки", "старый текст", _keywords("mutex", "thread"))
+
+    save_articles(db_session, [
+        {"article_id": 1, "title": "Потоки в C++", "content": "новый текст", "keywords": _keywords("atomic")},
+        {"article_id": 2, "title": "Память", "content": "текст", "keywords": _keywords("heap")},
+    ])
+
+    articles = {article.article_id: article for article in db_session.query(Article)}
+    db_session.refresh(articles[1])
+    assert (articles[1].title, articles[1].content) == ("Потоки в C++", "новый текст")
+    assert [kw.keyword for kw in articles[1].keywords] == ["atomic"]
+    assert [kw.keyword for kw in articles[2].keywords] == ["heap"]
+    assert [(job.article_id, is_new) for job, is_new in enqueue_jobs(db_session, [1, 1, 2])] == [(1, True), (2, True)]
+    assert [is_new for _, is_new in enqueue_jobs(db_session, [2])] == [False]
+
+
+def test_duplicate_ids_in_one_batch_keep_last_version(db_session):
+    save_articles(db_session, [
+        {"article_id": 1, "title": "Первая", "content": "a", "keywords": _keywords("mutex")},
+        {"article_id": 1, "title": "Вторая", "content": "b", "keywords": _keywords("atomic")},
+    ])
+
+    assert db_session.query(Article).one().title == "Вторая"
+    assert [kw.keyword for kw in db_session.query(Keyword)] == ["atomic"]
+
+
+def _seed(db_session, count):
+    save_articles(db_session, [
+        {"article_id": i, "title": f"Статья {i}", "content": "текст", "keywords": _keywords(f"kw{i}", "mutex")}
+        for i in range(1, count + 1)
+    ])
+
+
+def test_get_articles_page_uses_cursor_and_loads_keywords_in_one_query(db_session):
+    from sqlalchemy import event
+
+    _seed(db_session, 5)
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        page = get_articles_page(db_session, limit=2, after_id=2)
+        keywords = [[kw.keyword for kw in article.keywords] for article in page]
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+
+    assert [article.article_id for article in page] == [3, 4]
+    assert keywords == [["kw3", "mutex"], ["kw4", "mutex"]]
+    assert len(statements) == 1
+
+
+def test_iter_articles_walks_all_pages(db_session):
+    _seed(db_session, 7)
+
+    assert [article.article_id for article in iter_articles(db_session, page_size=3)] == list(range(1, 8))
+    assert [article.article_id for article in iter_articles(db_session, page_size=3, after_id=5)] == [6, 7]
+
+
+def test_embedding_is_saved_and_replaced_on_reanalysis(db_session):
+    import numpy as np
+
+    first = np.arange(4, dtype=np.float32)
+    second = np.ones(4, dtype=np.float32)
+    save_article(db_session, 1, "Потоки", "текст", _keywords("mutex"), embedding=first.tobytes())
+    save_article(db_session, 1, "Потоки", "текст", _keywords("mutex"), embedding=second.tobytes())
+
+    article = get_articles_page(db_session, include_embedding=True)[0]
+    assert np.array_equal(np.frombuffer(article.embedding, dtype=np.float32), second)
+
+
+def test_find_analyses_matches_content_hash_and_model_version(db_session):
+    save_article(db_session, 1, "Потоки", "текст", _keywords("mutex", "thread"),
+                 content_hash="a" * 64, model_version="v1")
+    save_article(db_session, 2, "Память", "текст", _keywords("heap"), content_hash="b" * 64, model_version="v0")
+
+    found = find_analyses(db_session, ["a" * 64, "b" * 64, "c" * 64], "v1")
+
+    assert list(found) == ["a" * 64]
+    assert [kw.keyword for kw in found["a" * 64].keywords] == ["mutex", "thread"]
+    assert get_content_hashes(db_session, [1, 2, 3], "v1") == {1: "a" * 64}
+
+
+def test_enqueue_jobs_deduplicates_active_jobs(db_session):
+    first = enqueue_jobs(db_session, [1, 2, 2])
+    second = enqueue_jobs(db_session, [2, 3], force=True)
+
+    assert [(job.article_id, is_new) for job, is_new in first] == [(1, True), (2, True)]
+    assert [(job.article_id, is_new) for job, is_new in second] == [(2, False), (3, True)]
+    assert second[0][0].id == first[1][0].id
+    assert get_job(db_session, second[0][0].id).force
+
+    # Завершенная задача не мешает поставить статью заново
+    claimed = claim_jobs(db_session, "w1", limit=10, lease_seconds=60, max_attempts=3)
+    finish_jobs(db_session, "w1", [job.id for job in claimed if job.article_id == 1])
+    job, is_new = enqueue_jobs(db_session, [1])[0]
+    assert is_new and job.status == JOB_QUEUED
+
+
+def test_claim_jobs_takes_each_job_once_and_reclaims_expired_lease(db_session):
+    enqueue_jobs(db_session, [1, 2, 3])
+
+    first = claim_jobs(db_session, "w1", limit=2, lease_seconds=60, max_attempts=3)
+    second = claim_jobs(db_session, "w2", limit=2, lease_seconds=60, max_attempts=3)
+
+    assert [job.article_id for job in first] == [1, 2]
+    assert [job.article_id for job in second] == [3]
+    assert claim_jobs(db_session, "w3", limit=2, lease_seconds=60, max_attempts=3) == []
+
+
+def test_expired_lease_is_reclaimed(db_session):
+    enqueue_jobs(db_session, [1])
+    # Аренда w1 истекает сразу: задачу забирает другой воркер, а w1 уже не может ее завершить
+    claim_jobs(db_session, "w1", limit=1, lease_seconds=-1, max_attempts=3)
+
+    retaken = claim_jobs(db_session, "w2", limit=1, lease_seconds=60, max_attempts=3)
+
+    assert [(job.article_id, job.attempts) for job in retaken] == [(1, 2)]
+    assert finish_jobs(db_session, "w1", [retaken[0].id]) == 0
+    assert finish_jobs(db_session, "w2", [retaken[0].id]) == 1
+    assert get_job(db_session, retaken[0].id).status == JOB_DONE
+
+
+def test_retry_jobs_fails_after_max_attempts(db_session):
+    enqueue_jobs(db_session, [1])
+
+    job = claim_jobs(db_session, "w1", limit=1, lease_seconds=60, max_attempts=2)[0]
+    assert retry_jobs(db_session, "w1", {job.id: "scrapper недоступен"}, max_attempts=2) == {job.id: JOB_QUEUED}
+    job = claim_jobs(db_session, "w1", limit=1, lease_seconds=60, max_attempts=2)[0]
+    assert get_job(db_session, job.id).status == JOB_RUNNING
+    assert retry_jobs(db_session, "w1", {job.id: "scrapper недоступен"}, max_attempts=2) == {job.id: JOB_FAILED}
+
+    failed = get_job(db_session, job.id)
+    assert (failed.attempts, failed.error) == (2, "scrapper недоступен")
+    assert claim_jobs(db_session, "w1", limit=1, lease_seconds=60, max_attempts=2) == []
+
+
+def test_upgrade_schema_adds_new_columns_and_indexes_to_old_tables():
+    from sqlalchemy import create_engine, inspect, text
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from internal.database import Base, upgrade_schema
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as connection:
+        # Схема до появления updated_at, эмбеддингов и ключа повторного использования результатов
+        connection.execute(text(
+            "CREATE TABLE articles (id INTEGER PRIMARY KEY, article_id INTEGER NOT NULL UNIQUE, "
+            "title VARCHAR(500) NOT NULL, content TEXT NOT NULL)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE keywords (id INTEGER PRIMARY KEY, article_id INTEGER REFERENCES articles (id), "
+            "keyword VARCHAR(100) NOT NULL, score INTEGER NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO articles VALUES (1, 1, 'Потоки', 'старый текст')"))
+        connection.execute(text("INSERT INTO keywords VALUES (1, 1, 'mutex', 90)"))
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("articles")}
+    assert {"updated_at", "embedding", "content_hash", "model_version"} <= columns
+    assert "ix_articles_content_hash" in {index["name"] for index in inspector.get_indexes("articles")}
+    with sessionmaker(bind=engine)() as db:
+        old = get_articles_page(db)[0]
+        assert (old.title, [kw.keyword for kw in old.keywords], old.updated_at) == ("Потоки", ["mutex"], None)
+        save_article(db, 1, "Потоки", "новый текст", _keywords("atomic"), content_hash="a" * 64, model_version="v1")
+        assert get_content_hashes(db, [1], "v1") == {1: "a" * 64}
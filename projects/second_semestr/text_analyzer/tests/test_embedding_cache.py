@@ -0,0 +1,81 @@
+import numpy as np
+
+from internal.embedding_cache import EmbeddingCache
+
+
+def _vectors(n, dim=4, start=0):
+    return np.arange(start, start + n * dim, dtype=np.float32).reshape(n, dim)
+
+
+def test_lookup_hits_and_misses():
+    cache = EmbeddingCache(capacity=10)
+    cache.put_many(["mutex", "std::thread"], _vectors(2))
+
+    out = np.zeros((3, 4), dtype=np.float32)
+    missing = cache.lookup(["mutex", "программирование", "std::thread"], out)
+
+    assert missing == [1]
+    assert np.array_equal(out[0], _vectors(2)[0])
+    assert np.array_equal(out[2], _vectors(2)[1])
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used():
+    cache = EmbeddingCache(capacity=2)
+    cache.put_many(["a", "b"], _vectors(2))
+    cache.lookup(["a"], np.zeros((1, 4), dtype=np.float32))  # "a" становится недавним
+    cache.put_many(["c"], _vectors(1, start=100))
+
+    out = np.zeros((3, 4), dtype=np.float32)
+    assert cache.lookup(["a", "b", "c"], out) == [1]
+    assert len(cache) == 2
+
+
+def test_normalize():
+    assert EmbeddingCache.normalize("  Мьютекс ") == "мьютекс"
+
+
+def test_disk_store_survives_restart(tmp_path):
+    cache = EmbeddingCache(capacity=4, path=str(tmp_path))
+    cache.put_many(["mutex", "thread"], _vectors(2))
+    cache.flush()
+
+    restored = EmbeddingCache(capacity=4, path=str(tmp_path))
+    out = np.zeros((2, 4), dtype=np.float32)
+    assert restored.lookup(["thread", "mutex"], out) == []
+    assert np.array_equal(out, _vectors(2)[::-1])
+
+
+def test_disk_store_with_other_capacity_starts_empty(tmp_path):
+    cache = EmbeddingCache(capacity=4, path=str(tmp_path))
+    cache.put_many(["mutex"], _vectors(1))
+    cache.flush()
+
+    assert len(EmbeddingCache(capacity=8, path=str(tmp_path))) == 0
+
+
+def test_disk_store_of_other_model_starts_empty(tmp_path):
+    cache = EmbeddingCache(capacity=4, path=str(tmp_path), model="rubert-tiny2:torch")
+    cache.put_many(["mutex"], _vectors(1))
+    cache.flush()
+
+    assert len(EmbeddingCache(capacity=4, path=str(tmp_path), model="rubert-tiny2:torch")) == 1
+    assert len(EmbeddingCache(capacity=4, path=str(tmp_path), model="other-model:torch")) == 0
+
+
+def test_ensure_dim_discards_vectors_of_other_dimension(tmp_path):
+    cache = EmbeddingCache(capacity=4, path=str(tmp_path), model="m")
+    cache.put_many(["mutex", "thread"], _vectors(2))
+    cache.flush()
+
+    restored = EmbeddingCache(capacity=4, path=str(tmp_path), model="m")
+    restored.ensure_dim(4)
+    assert len(restored) == 2
+
+    restored.ensure_dim(8)
+    assert len(restored) == 0
+    restored.put_many(["mutex"], _vectors(1, dim=8))
+    out = np.zeros((1, 8), dtype=np.float32)
+    assert restored.lookup(["mutex"], out) == []
+    assert out.shape == (1, 8) and np.array_equal(out[0], _vectors(1, dim=8)[0])
@@ -0,0 +1,136 @@
+import httpx
+import pytest
+
+from internal.http_client import CircuitBreaker, CircuitOpenError, ResilientHttpClient
+
+
+class FlakyTransport(httpx.BaseTransport):
+    """Отвечает заданной последовательностью статусов (None - сетевая ошибка)"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def handle_request(self, request):
+        self.calls += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status is None:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(status, json={"status": status})
+
+
+def _client(transport, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    return ResilientHttpClient("http://scrapper", transport=transport, **kwargs)
+
+
+def test_retries_transient_errors():
+    transport = FlakyTransport([None, 503, 200])
+    response = _client(transport, retries=2).request("GET", "/article/1")
+
+    assert response.status_code == 200
+    assert transport.calls == 3
+
+
+def test_does_not_retry_client_errors():
+    transport = FlakyTransport([404])
+    response = _client(transport, retries=2).request("GET", "/article/1")
+
+    assert response.status_code == 404
+    assert transport.calls == 1
+
+
+def test_gives_up_after_retries():
+    transport = FlakyTransport([None, None])
+    with pytest.raises(httpx.ConnectError):
+        _client(transport, retries=1).request("GET", "/article/1")
+    assert transport.calls == 2
+
+
+def test_breaker_opens_and_recovers(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("internal.http_client.time.monotonic", lambda: now[0])
+    transport = FlakyTransport([503, 503])
+    client = _client(transport, retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=10))
+
+    client.request("GET", "/a")
+    client.request("GET", "/a")
+    with pytest.raises(CircuitOpenError):
+        client.request("GET", "/a")
+    assert transport.calls == 2
+
+    # После reset_timeout пробный запрос проходит и замыкает автомат
+    now[0] = 11
+    assert client.request("GET", "/a").status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def test_non_retryable_errors_count_as_failures():
+    transport = FlakyTransport([])
+    transport.handle_request = lambda request: (_ for _ in ()).throw(httpx.DecodingError("bad body", request=request))
+    client = _client(transport, retries=2, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=10))
+
+    with pytest.raises(httpx.DecodingError):
+        client.request("GET", "/a")
+    assert client.breaker.state == "open"
+
+
+def test_failed_probe_reopens_breaker(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("internal.http_client.time.monotonic", lambda: now[0])
+    transport = FlakyTransport([None, None, 200])
+    client = _client(transport, retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=10))
+
+    with pytest.raises(httpx.ConnectError):
+        client.request("GET", "/a")
+    now[0] = 11
+    assert client.breaker.state == "half-open"
+    with pytest.raises(httpx.ConnectError):
+        client.request("GET", "/a")
+
+    # Проба не удалась: автомат снова разомкнут на reset_timeout от момента пробы
+    assert client.breaker.state == "open"
+    now[0] = 20
+    with pytest.raises(CircuitOpenError):
+        client.request("GET", "/a")
+    now[0] = 22
+    assert client.request("GET", "/a").status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def test_retries_stop_when_breaker_opens():
+    transport = FlakyTransport([503, 503, 503])
+    client = _client(transport, retries=5, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=10))
+
+    with pytest.raises(CircuitOpenError):
+        client.request("GET", "/a")
+    assert transport.calls == 2
+
+
+def test_cancelled_request_does_not_count_as_failure():
+    import asyncio
+    import time
+
+    class HangingTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            await asyncio.sleep(10)
+
+    async def cancelled_request(breaker):
+        client = ResilientHttpClient("http://scrapper", retries=0, breaker=breaker, async_transport=HangingTransport())
+        task = asyncio.ensure_future(client.arequest("GET", "/a"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    closed = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    asyncio.run(cancelled_request(closed))
+    assert closed.state == "closed"
+
+    # Отмененная проба не размыкает автомат заново, следующий запрос снова может стать пробой
+    probing = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    probing.record_failure()
+    time.sleep(0.06)
+    asyncio.run(cancelled_request(probing))
+    assert probing.state == "half-open"
+    probing.before_call()
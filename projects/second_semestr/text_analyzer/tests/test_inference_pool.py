@@ -0,0 +1,169 @@
+import asyncio
+import threading
+
+import pytest
+
+from internal.inference_pool import InferencePool, ModelNotReadyError, PoolSaturatedError
+from internal.tracing import collect, count, span
+
+
+class SlowExtractor:
+    """Заглушка экстрактора: блокируется, пока тест не откроет событие"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def extract_keywords(self, text, top_n=10):
+        self.release.wait(timeout=5)
+        return [(text, top_n)]
+
+
+def test_run_returns_result_and_timings():
+    pool = InferencePool(SlowExtractor, workers=1, max_queue=1)
+    pool.extractor.release.set()
+
+    result, timing = asyncio.run(pool.run("extract_keywords", "mutex", top_n=3))
+
+    assert result == [("mutex", 3)]
+    assert timing.queue_wait_ms >= 0
+    assert timing.inference_ms >= 0
+    assert pool.stats()["completed"] == 1
+    pool.shutdown()
+
+
+def test_rejects_when_queue_is_full():
+    pool = InferencePool(SlowExtractor, workers=1, max_queue=1)
+
+    async def scenario():
+        # Один вызов занимает воркер, второй ждет в очереди, третий отклоняется
+        running = [asyncio.ensure_future(pool.run("extract_keywords", str(i))) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run("extract_keywords", "overflow")
+        pool.extractor.release.set()
+        return await asyncio.gather(*running)
+
+    results = asyncio.run(scenario())
+
+    assert [result for result, _ in results] == [[("0", 10)], [("1", 10)]]
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["in_flight"] == 0
+    pool.shutdown()
+
+
+class WarmedExtractor:
+    """Заглушка экстрактора, которая считает прогревы"""
+
+    created = 0
+
+    def __init__(self):
+        WarmedExtractor.created += 1
+        self.warmups = 0
+
+    def warmup(self):
+        self.warmups += 1
+
+    def extract_keywords(self, text, top_n=10):
+        return [(text, top_n)]
+
+    def warmup_count(self):
+        return self.warmups
+
+
+def test_lazy_pool_loads_and_warms_up_on_first_call():
+    WarmedExtractor.created = 0
+    pool = InferencePool(WarmedExtractor, lazy=True, warmup=True)
+    assert WarmedExtractor.created == 0
+    assert pool.model_status()["state"] == "not_loaded"
+
+    result, _ = asyncio.run(pool.run("extract_keywords", "mutex"))
+
+    assert result == [("mutex", 10)]
+    assert pool.ready
+    assert pool.extractor.warmups == 1
+    assert pool.model_status()["state"] == "ready"
+    asyncio.run(pool.run("extract_keywords", "thread"))
+    assert WarmedExtractor.created == 1
+    pool.shutdown()
+
+
+def test_every_worker_process_is_warmed_up_before_its_first_task():
+    pool = InferencePool(WarmedExtractor, kind="process", workers=2, lazy=True, warmup=True)
+
+    async def calls():
+        return await asyncio.gather(*(pool.run("warmup_count") for _ in range(8)))
+
+    pool.start_loading().result(timeout=30)
+    results = asyncio.run(calls())
+
+    # Прогрев идет в инициализаторе процесса, поэтому ни одна задача не видит непрогретый экстрактор
+    assert [warmups for warmups, _ in results] == [1] * 8
+    pool.shutdown()
+
+
+def test_failed_load_is_reported_and_retried():
+    attempts = []
+
+    def flaky_factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("модель не найдена")
+        return WarmedExtractor()
+
+    pool = InferencePool(flaky_factory, lazy=True)
+
+    with pytest.raises(ModelNotReadyError):
+        asyncio.run(pool.run("extract_keywords", "mutex"))
+    assert pool.model_status() == {"state": "failed", "load_seconds": None, "warmup": False, "error": "модель не найдена"}
+    assert pool.stats()["in_flight"] == 0
+
+    result, _ = asyncio.run(pool.run("extract_keywords", "mutex"))
+    assert result == [("mutex", 10)]
+    assert len(attempts) == 2
+    pool.shutdown()
+
+
+def test_call_times_out_while_model_is_loading():
+    loaded = threading.Event()
+
+    def slow_factory():
+        loaded.wait(timeout=5)
+        return WarmedExtractor()
+
+    pool = InferencePool(slow_factory, lazy=True, load_timeout=0.05)
+    pool.start_loading()
+
+    with pytest.raises(ModelNotReadyError):
+        asyncio.run(pool.run("extract_keywords", "mutex"))
+    assert pool.model_status()["state"] == "loading"
+
+    loaded.set()
+    pool.start_loading().result(timeout=5)
+    assert pool.ready
+    pool.shutdown()
+
+
+class TracedExtractor:
+    """Заглушка экстрактора, которая записывает этап в трассу задачи"""
+
+    def extract_keywords(self, text, top_n=10):
+        with span("encode_words"):
+            count("words", 1)
+        return [(text, top_n)]
+
+
+def test_task_stages_are_merged_into_request_trace():
+    pool = InferencePool(TracedExtractor)
+
+    async def request():
+        with collect() as trace:
+            _, timing = await pool.run("extract_keywords", "mutex")
+        return trace, timing
+
+    trace, timing = asyncio.run(request())
+
+    assert set(trace.spans) == {"inference_queue", "encode_words"}
+    assert trace.counts == {"words": 1}
+    assert timing.trace.counts == {"words": 1}
+    assert "trace" not in timing.as_dict()
+    pool.shutdown()
@@ -0,0 +1,87 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from internal.database import Base, count_jobs, enqueue_jobs, get_job
+from internal.inference_pool import ModelNotReadyError
+from internal.job_worker import JobWorker
+from internal.models import JOB_DONE, JOB_FAILED, JOB_QUEUED
+
+
+def make_session_factory(tmp_path):
+    # Файл, а не база в памяти: воркер открывает свои сессии из пула потоков
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.sqlite'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+class FakeAnalyze:
+    """Заглушка analyze_articles: запоминает пакеты, статьи из failing завершаются ошибкой"""
+
+    def __init__(self, failing=(), error=None):
+        self.calls = []
+        self.failing = set(failing)
+        self.error = error
+
+    async def __call__(self, db, article_ids, force):
+        self.calls.append((list(article_ids), force))
+        if self.error is not None:
+            raise self.error
+        return {"errors": [
+            {"article_id": article_id, "detail": "Ошибка при получении статьи"}
+            for article_id in article_ids if article_id in self.failing
+        ]}
+
+
+def test_worker_analyzes_jobs_in_batches(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    with session_factory() as db:
+        failing_id = enqueue_jobs(db, [1, 2, 3, 4, 5])[2][0].id
+        enqueue_jobs(db, [6], force=True)
+    analyze = FakeAnalyze(failing=[3])
+    worker = JobWorker(analyze, session_factory, batch_size=10, max_attempts=1)
+
+    assert asyncio.run(worker.run_once()) == 6
+
+    # Статьи без force и с force анализируются разными пакетами
+    assert analyze.calls == [([1, 2, 3, 4, 5], False), ([6], True)]
+    with session_factory() as db:
+        assert count_jobs(db) == {JOB_DONE: 5, JOB_FAILED: 1}
+        assert get_job(db, failing_id).error == "Ошибка при получении статьи"
+    assert asyncio.run(worker.run_once()) == 0
+
+
+def test_transient_errors_release_jobs_without_spending_attempts(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    with session_factory() as db:
+        job_id = enqueue_jobs(db, [1])[0][0].id
+    worker = JobWorker(FakeAnalyze(error=ModelNotReadyError("Модель загружается")), session_factory,
+                       max_attempts=1, transient_errors=(ModelNotReadyError,))
+
+    assert asyncio.run(worker.run_once()) == 0
+
+    with session_factory() as db:
+        job = get_job(db, job_id)
+        assert (job.status, job.attempts) == (JOB_QUEUED, 0)
+
+
+def test_run_stops_after_current_batch(tmp_path):
+    session_factory = make_session_factory(tmp_path)
+    with session_factory() as db:
+        enqueue_jobs(db, [1, 2])
+    analyze = FakeAnalyze()
+    worker = JobWorker(analyze, session_factory, batch_size=1, poll_interval=0.01)
+
+    async def scenario():
+        task = asyncio.ensure_future(worker.run())
+        while len(analyze.calls) < 2:
+            await asyncio.sleep(0.01)
+        worker.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(scenario())
+
+    assert analyze.calls == [([1], False), ([2], False)]
+    with session_factory() as db:
+        assert count_jobs(db) == {JOB_DONE: 2}
@@ -1,6 +1,11 @@
 import pytest
 import sys
-from internal.keyword_extractor import KeywordExtractor
+import numpy as np
+from conftest import HashModel
+from internal.embedding_cache import EmbeddingCache
+from internal.keyword_extractor import (
+    KeywordExtractor, iter_sentence_windows, max_similarities, max_similarities_pairwise
+)
 
 # Выводим информацию перед импортом для отладки
 print("========== НАЧАЛО ВЫПОЛНЕНИЯ ФАЙЛА ТЕСТОВ ==========")
@@ -38,3 +43,115 @@ def test_extract_keywords():
     except Exception as e:
         print(f"Ошибка в тесте: {e}")
         raise
+
+
+def test_max_similarities_matches_pairwise():
+    # Матричный режим должен давать те же оценки, что и поштучный cosine_similarity
+    rng = np.random.default_rng(42)
+    words = rng.standard_normal((40, 16)).astype(np.float32)
+    sentences = rng.standard_normal((7, 16)).astype(np.float32)
+    words[3] = 0  # нулевой эмбеддинг не должен давать nan
+
+    expected = max_similarities_pairwise(words, sentences)
+    actual = max_similarities(words.copy(), sentences.copy())
+
+    assert actual.dtype == np.float32
+    assert np.allclose(actual, expected, atol=1e-5)
+
+
+def test_iter_sentence_windows():
+    text = "Первое. Второе! Третье? ... Четвертое"
+    assert list(iter_sentence_windows(text, 2)) == [["Первое", "Второе"], ["Третье", "Четвертое"]]
+    assert list(iter_sentence_windows("", 2)) == []
+
+
+def test_extract_keywords_streaming_single_window_matches_full():
+    # Если весь текст помещается в одно окно, потоковый режим совпадает с обычным
+    text = "Python язык программирования. Потоки и мьютексы в C++! Синхронизация потоков?"
+    extractor = KeywordExtractor(model=HashModel())
+
+    assert extractor.extract_keywords_streaming(text, top_n=5, window_sentences=10) == \
+        extractor.extract_keywords(text, top_n=5)
+
+
+def test_unknown_backend_is_rejected_before_loading_model():
+    with pytest.raises(ValueError):
+        KeywordExtractor(backend="tensorflow")
+
+
+def test_extract_keywords_batch_matches_per_text_and_encodes_shared_words_once():
+    texts = [
+        "Потоки и мьютексы в C++. Мьютекс защищает общие данные! Потоки ждут.",
+        "",
+        "Потоки в Java. Общие данные защищает synchronized. Мьютексы и потоки.",
+        "Сокеты Беркли. Сервер принимает соединения.",
+    ]
+    model = HashModel()
+    extractor = KeywordExtractor(model=model)
+
+    batch = extractor.extract_keywords_batch(texts, top_n=5, window_sentences=2)
+    encoded = list(model.encoded)
+    single = [extractor.extract_keywords_streaming(text, top_n=5, window_sentences=2) for text in texts]
+
+    assert batch == single
+    assert batch[1] == []
+    # Общие слова и предложения текстов кодируются один раз
+    assert len(encoded) == len(set(encoded))
+    assert encoded.count("потоки") == 1
+
+
+def test_extract_keywords_batch_in_groups_matches_single_group():
+    texts = [
+        "Потоки и мьютексы в C++. Мьютекс защищает общие данные! Потоки ждут.",
+        "",
+        "Потоки в Java. Общие данные защищает synchronized. Мьютексы и потоки.",
+        "Сокеты Беркли. Сервер принимает соединения.",
+        "Куча и стек. Аллокатор выделяет память. Потоки делят кучу. Стек растет вниз.",
+    ]
+    extractor = KeywordExtractor(model=HashModel())
+    encoded_sentences = []
+    encode = extractor._encode
+
+    def recording_encode(items, kind):
+        if kind == "sentences":
+            encoded_sentences.append(len(items))
+        return encode(items, kind)
+
+    extractor._encode = recording_encode
+    grouped = extractor.extract_keywords_batch(texts, top_n=5, window_sentences=2, max_group_sentences=4)
+
+    assert grouped == extractor.extract_keywords_batch(texts, top_n=5, window_sentences=2)
+    # Группы: тексты 0 (3 предложения), 2 (3), 3 и 4 вместе не помещаются - каждый отдельно
+    assert encoded_sentences[:4] == [3, 3, 2, 4]
+
+
+def test_extract_keywords_batch_slices_top_keywords_of_each_text():
+    texts = [
+        "Потоки и мьютексы в C++. Мьютекс защищает общие данные! Потоки ждут.",
+        "Сокеты Беркли. Сервер принимает соединения.",
+    ]
+    extractor = KeywordExtractor(model=HashModel())
+
+    batch = extractor.extract_keywords_batch(texts, top_n=3)
+
+    for text, keywords in zip(texts, batch):
+        assert len(keywords) == 3
+        assert [score for _, score in keywords] == sorted((score for _, score in keywords), reverse=True)
+        # Ключевые слова текста берутся только из него самого
+        assert all(word in text for word, _ in keywords)
+    assert batch[1] == extractor.extract_keywords(texts[1], top_n=3)
+
+
+def test_scores_do_not_depend_on_embedding_cache():
+    # Модель получает одну и ту же строку для слова в обоих режимах, поэтому оценки совпадают
+    texts = [
+        "Потоки и мьютексы в C++. Мьютекс защищает общие данные! Потоки ждут.",
+        "потоки в Java. Общие данные защищает synchronized. МЬЮТЕКСЫ и Потоки.",
+    ]
+    uncached = KeywordExtractor(model=HashModel())
+    cached = KeywordExtractor(model=HashModel(), cache=EmbeddingCache(100))
+
+    for text in texts:
+        assert cached.extract_keywords(text, top_n=5) == uncached.extract_keywords(text, top_n=5)
+    assert cached.extract_keywords_batch(texts, top_n=5, window_sentences=2) == \
+        uncached.extract_keywords_batch(texts, top_n=5, window_sentences=2)
@@ -0,0 +1,22 @@
+from internal.result_cache import ResultCache, content_hash
+
+
+def test_hits_depend_on_version_and_evict_least_recently_used():
+    cache = ResultCache(capacity=2)
+    cache.put("a", "v1", [{"keyword": "mutex", "score": 90}], b"\x00")
+    cache.put("b", "v1", [], None)
+
+    assert cache.get("a", "v2") is None
+    assert cache.get("a", "v1").keywords == [{"keyword": "mutex", "score": 90}]
+    cache.put("c", "v1", [], None)  # вытесняет "b": к "a" обращались позже
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1").embedding == b"\x00"
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_content_hash_includes_title():
+    assert content_hash("Потоки", "текст") == content_hash("Потоки", "текст")
+    assert content_hash("Потоки", "текст") != content_hash("Память", "текст")
+    assert content_hash("ab", "c") != content_hash("a", "bc")
@@ -0,0 +1,78 @@
+import numpy as np
+from prometheus_client import REGISTRY
+
+from internal import metrics
+from internal.keyword_extractor import KeywordExtractor
+from internal.tracing import Trace, collect, count, current_trace, span
+
+
+class ZeroModel:
+    """Заглушка модели: одинаковые эмбеддинги для всех строк"""
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+    def encode(self, items, **kwargs):
+        return np.ones((len(items), 8), dtype=np.float32)
+
+
+def test_spans_are_recorded_only_inside_trace():
+    with span("encode_words"):
+        pass
+    count("words", 3)
+    assert current_trace() is None
+
+    with collect() as trace:
+        with span("scrapper_fetch"):
+            pass
+        with span("scrapper_fetch"):
+            pass
+        count("words", 3)
+        count("words", 2)
+
+    assert len(trace.spans["scrapper_fetch"]) == 2
+    assert trace.counts == {"words": 5}
+    assert current_trace() is None
+
+
+def test_server_timing_sums_stage_calls():
+    trace = Trace()
+    trace.add("scrapper_fetch", 0.010)
+    trace.add("scrapper_fetch", 0.005)
+    trace.add("db_write", 0.002)
+
+    assert trace.server_timing() == 'scrapper_fetch;desc="2";dur=15.00, db_write;desc="1";dur=2.00'
+
+
+def test_extractor_records_encoding_and_similarity_stages():
+    extractor = KeywordExtractor(model=ZeroModel())
+
+    with collect() as trace:
+        extractor.extract_keywords_batch(["Потоки и мьютексы. Потоки ждут.", "Потоки в Java."], window_sentences=1)
+
+    assert set(trace.spans) == {"encode_sentences", "encode_words", "similarity"}
+    assert trace.counts["sentences"] == 3
+    # "Потоки" встречается в трех предложениях, но кодируется один раз
+    assert trace.counts["words"] == 6
+    assert trace.counts["encoded_words"] == 4
+
+
+def test_observe_trace_updates_metrics():
+    def sample(name, labels=None):
+        return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+    before_encode = sample("text_analyzer_encode_seconds_count", {"kind": "words"})
+    before_words = sample("text_analyzer_processed_items_total", {"kind": "words"})
+    before_encoded = sample("text_analyzer_encoded_items_total", {"kind": "words"})
+    trace = Trace()
+    trace.add("encode_words", 0.01)
+    trace.add("encode_words", 0.02)
+    trace.add("unknown_stage", 0.01)
+    trace.count("words", 10)
+    trace.count("encoded_words", 4)
+
+    metrics.observe_trace(trace)
+
+    assert sample("text_analyzer_encode_seconds_count", {"kind": "words"}) == before_encode + 2
+    assert sample("text_analyzer_processed_items_total", {"kind": "words"}) == before_words + 10
+    assert sample("text_analyzer_encoded_items_total", {"kind": "words"}) == before_encoded + 4